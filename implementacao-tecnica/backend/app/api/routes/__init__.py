@@ -1,5 +1,5 @@
 from fastapi import APIRouter
-from app.api.routes import email, example, score, category, auth
+from app.api.routes import email, example, score, category, auth, cleaning
 
 api_router = APIRouter()
 
@@ -8,3 +8,4 @@ api_router.include_router(email.router)
 api_router.include_router(example.router)
 api_router.include_router(score.router)
 api_router.include_router(category.router)
+api_router.include_router(cleaning.router)
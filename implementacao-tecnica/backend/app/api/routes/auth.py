@@ -1,10 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordRequestForm
 from supabase import Client
+from app.core.auth_cache import revoke_user
 from app.deps.auth import get_current_user
 from app.db.supabase import get_supabase_client
 from app.schemas.user import UserCreate, UserOut, Token
-from app.core.security import hash_password, verify_password, create_access_token
+from app.core.security import hash_password_async, verify_password_async, create_access_token
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
@@ -14,16 +16,16 @@ def get_me(current_user: UserOut = Depends(get_current_user)):
     return current_user
 
 @router.post("/register", response_model=UserOut, status_code=201)
-def register_user(
+async def register_user(
     payload: UserCreate,
     supabase: Client = Depends(get_supabase_client),
 ):
     # verifica se já existe
-    existing = (
+    existing = await run_in_threadpool(
         supabase.table("users")
         .select("id")
         .eq("email", payload.email)
-        .execute()
+        .execute
     )
 
     if existing.data:
@@ -32,12 +34,12 @@ def register_user(
             detail="E-mail já registrado",
         )
 
-    hashed = hash_password(payload.password)
+    hashed = await hash_password_async(payload.password)
 
-    resp = (
+    resp = await run_in_threadpool(
         supabase.table("users")
         .insert({"email": payload.email, "name": payload.name, "password": hashed})
-        .execute()
+        .execute
     )
 
     user = resp.data[0]
@@ -45,18 +47,18 @@ def register_user(
 
 
 @router.post("/token", response_model=Token)
-def login_for_access_token(
+async def login_for_access_token(
     form_data: OAuth2PasswordRequestForm = Depends(),
     supabase: Client = Depends(get_supabase_client),
 ):
     email = form_data.username
     password = form_data.password
 
-    resp = (
+    resp = await run_in_threadpool(
         supabase.table("users")
-        .select("id,email,password")
+        .select("id,name,email,password")
         .eq("email", email)
-        .execute()
+        .execute
     )
 
     if not resp.data:
@@ -67,12 +69,23 @@ def login_for_access_token(
 
     user = resp.data[0]
 
-    if not verify_password(password, user["password"]):
+    if not await verify_password_async(password, user["password"]):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="E-mail ou senha inválidos",
         )
 
-    access_token = create_access_token(user_id=str(user["id"]))
+    access_token = create_access_token(
+        user_id=str(user["id"]),
+        name=user["name"],
+        email=user["email"],
+    )
 
     return Token(access_token=access_token, token_type="bearer")
+
+
+@router.post("/logout", status_code=204)
+def logout(current_user: UserOut = Depends(get_current_user)):
+    # Recusa os tokens já emitidos para o usuário (até expirarem)
+    revoke_user(current_user.id)
+    return None
@@ -1,4 +1,5 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from app.core.http_cache import cached_list_response, invalidate_list
 from app.db.supabase import get_supabase_client
 from app.deps.auth import get_current_user
 from app.schemas.user import UserOut
@@ -6,19 +7,33 @@ from app.schemas.category import CategoryCreate, CategoryUpdate, CategoryOut, Ca
 from supabase import Client
 from postgrest.exceptions import APIError as PostgrestAPIError
 from app.utils.colors import pick_category_color
+from app.services.prompt_cache import invalidate_user_prompt
 
 router = APIRouter(prefix="/categories", tags=["categories"])
 
 
+def _cache_key(user_id: str) -> str:
+    return f"categories:{user_id}"
+
+
+def _invalidate(user_id: str) -> None:
+    # Escritas em categorias afetam o prompt compilado e a listagem em cache
+    invalidate_user_prompt(user_id)
+    invalidate_list(_cache_key(user_id))
+
+
 @router.get("/", response_model=CategoryList)
-def list_categories(supabase: Client = Depends(get_supabase_client), current_user: UserOut = Depends(get_current_user),):
-    try:
-        resp = supabase.table("categorias").select("*").eq("user_id", current_user.id).order("created_at").execute()
-        data = resp.data or []
-        items = [CategoryOut(**item) for item in data]
-        return CategoryList(items=items, total=len(items))
-    except PostgrestAPIError as e:
-        raise HTTPException(status_code=500, detail=str(e))
+def list_categories(request: Request, supabase: Client = Depends(get_supabase_client), current_user: UserOut = Depends(get_current_user),):
+    def build() -> CategoryList:
+        try:
+            resp = supabase.table("categorias").select("*").eq("user_id", current_user.id).order("created_at").execute()
+            data = resp.data or []
+            items = [CategoryOut(**item) for item in data]
+            return CategoryList(items=items, total=len(items))
+        except PostgrestAPIError as e:
+            raise HTTPException(status_code=500, detail=str(e))
+
+    return cached_list_response(request, _cache_key(current_user.id), build, private=True)
 
 
 @router.get("/{category_id}", response_model=CategoryOut)
@@ -57,6 +72,7 @@ def create_category(
         resp = supabase.table("categorias").insert(data).execute()
         if not resp.data or len(resp.data) == 0:
             raise HTTPException(status_code=500, detail="Failed to create category")
+        _invalidate(current_user.id)
         return CategoryOut(**resp.data[0])
     except PostgrestAPIError as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -86,6 +102,7 @@ def update_category(
                 detail="Category not found or unauthorized",
             )
 
+        _invalidate(current_user.id)
         return CategoryOut(**resp.data[0])
 
     except PostgrestAPIError as e:
@@ -114,6 +131,7 @@ def delete_category(
                 detail="Category not found or unauthorized",
             )
 
+        _invalidate(current_user.id)
         return None
 
     except PostgrestAPIError as e:
@@ -0,0 +1,143 @@
+import re
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from supabase import Client
+from postgrest.exceptions import APIError as PostgrestAPIError
+
+from app.core.config import get_settings
+from app.db.supabase import get_supabase_client
+from app.deps.auth import get_current_user
+from app.schemas.user import UserOut
+from app.schemas.cleaning import (
+    CleaningPatternCreate,
+    CleaningPatternOut,
+    CleaningPatternList,
+    CleaningPreviewIn,
+    CleaningPreviewOut,
+)
+from app.services.cleaning_patterns import fetch_user_patterns, invalidate_user_patterns
+from app.services.local_classifier import invalidate_user_classifier
+from app.services.near_duplicates import invalidate_user_near_duplicates
+from app.utils.text_processing import UnsafePatternError, clean_email, compile_user_pattern
+
+router = APIRouter(prefix="/cleaning-patterns", tags=["cleaning"])
+
+
+@router.get("/", response_model=CleaningPatternList)
+def list_cleaning_patterns(
+    supabase: Client = Depends(get_supabase_client),
+    current_user: UserOut = Depends(get_current_user),
+):
+    try:
+        resp = (
+            supabase.table("padroes_limpeza")
+            .select("*")
+            .eq("user_id", current_user.id)
+            .order("id")
+            .execute()
+        )
+    except PostgrestAPIError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    items = [CleaningPatternOut(**item) for item in (resp.data or [])]
+    return CleaningPatternList(items=items, total=len(items))
+
+
+@router.post("/", response_model=CleaningPatternOut, status_code=status.HTTP_201_CREATED)
+def create_cleaning_pattern(
+    payload: CleaningPatternCreate,
+    supabase: Client = Depends(get_supabase_client),
+    current_user: UserOut = Depends(get_current_user),
+):
+    settings = get_settings()
+
+    if len(payload.padrao) > settings.cleaning_pattern_max_length:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Padrão maior que {settings.cleaning_pattern_max_length} caracteres.",
+        )
+    try:
+        compile_user_pattern(payload.padrao)
+    except UnsafePatternError as e:
+        # Roda em todo e-mail do usuário, no threadpool compartilhado
+        raise HTTPException(status_code=400, detail=f"Expressão regular insegura (ReDoS): {e}")
+    except re.error as e:
+        raise HTTPException(status_code=400, detail=f"Expressão regular inválida: {e}")
+
+    try:
+        count_resp = (
+            supabase.table("padroes_limpeza")
+            .select("id", count="exact")
+            .eq("user_id", current_user.id)
+            .limit(1)
+            .execute()
+        )
+        if (count_resp.count or 0) >= settings.cleaning_patterns_max_per_user:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Máximo de {settings.cleaning_patterns_max_per_user} padrões por usuário.",
+            )
+
+        data = payload.dict()
+        data["user_id"] = current_user.id
+        resp = supabase.table("padroes_limpeza").insert(data).execute()
+        if not resp.data:
+            raise HTTPException(status_code=500, detail="Falha ao criar padrão")
+    except PostgrestAPIError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    invalidate_user_patterns(current_user.id)
+    # As assinaturas e o treino do classificador dependem dos padrões
+    invalidate_user_near_duplicates(current_user.id)
+    invalidate_user_classifier(current_user.id)
+    return CleaningPatternOut(**resp.data[0])
+
+
+@router.post("/preview", response_model=CleaningPreviewOut)
+def preview_cleaning(
+    payload: CleaningPreviewIn,
+    supabase: Client = Depends(get_supabase_client),
+    current_user: UserOut = Depends(get_current_user),
+):
+    # Mostra o texto que seria enviado ao modelo, sem salvar nada
+    try:
+        patterns = fetch_user_patterns(supabase, current_user.id)
+    except PostgrestAPIError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    result = clean_email(payload.conteudo, patterns, get_settings().email_cleaning_steps)
+    return CleaningPreviewOut(
+        conteudo=result.text,
+        bytes_saved=result.bytes_saved,
+        tokens_saved=result.tokens_saved,
+    )
+
+
+@router.delete("/{pattern_id}", status_code=status.HTTP_204_NO_CONTENT)
+def delete_cleaning_pattern(
+    pattern_id: int,
+    supabase: Client = Depends(get_supabase_client),
+    current_user: UserOut = Depends(get_current_user),
+):
+    try:
+        resp = (
+            supabase.table("padroes_limpeza")
+            .delete()
+            .eq("id", pattern_id)
+            .eq("user_id", current_user.id)
+            .execute()
+        )
+    except PostgrestAPIError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    if resp.data == []:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Padrão não encontrado",
+        )
+
+    invalidate_user_patterns(current_user.id)
+    # As assinaturas e o treino do classificador dependem dos padrões
+    invalidate_user_near_duplicates(current_user.id)
+    invalidate_user_classifier(current_user.id)
+    return None
@@ -1,6 +1,12 @@
 # app/api/routes/email.py
-from fastapi import APIRouter, Depends, HTTPException, Query, UploadFile, File, Form
-from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, UploadFile, File, Form
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from typing import Any, Dict, List, Literal, Optional, Sequence, Union
+from datetime import datetime
+import asyncio
+import itertools
+import json
 
 from supabase import Client
 from postgrest.exceptions import APIError as PostgrestAPIError
@@ -8,25 +14,88 @@ from postgrest.exceptions import APIError as PostgrestAPIError
 from app.db.supabase import get_supabase_client
 from app.deps.auth import get_current_user
 from app.schemas.user import UserOut
-from app.schemas.email import EmailCreate, EmailUpdate, EmailOut, EmailList
-from app.utils.text_processing import basic_clean, guess_and_extract
-from app.services.email_ai_service import process_email_with_ai
+from app.schemas.email import (
+    EmailCreate,
+    EmailUpdate,
+    EmailOut,
+    EmailCreateOut,
+    EmailList,
+    EmailExpandedOut,
+    EmailExpandedList,
+    EmailSummaryOut,
+    EmailSummaryList,
+    EmailBatchItem,
+    EmailBatchOut,
+    EmailStats,
+    MAX_EMAIL_CONTENT_LENGTH,
+)
+from app.schemas.job import JobOut
+from app.utils.text_processing import (
+    CleanResult,
+    ExtractionTimeout,
+    UploadTooLarge,
+    clean_email,
+    extract_upload_async,
+    stored_content,
+)
+from app.utils.tokens import CHARS_PER_TOKEN
+from app.utils.pagination import InvalidCursor, count_method, paginate, split_page
+from app.utils.projection import (
+    InvalidFields,
+    embed_alias,
+    parse_expand,
+    parse_fields,
+    project_row,
+    select_columns,
+)
+from app.utils.export import MEDIA_TYPES, encode_export, iter_keyset_pages
+from app.services.email_ai_service import (
+    build_email_row,
+    get_compiled_prompt_async,
+    process_email_with_ai_async,
+    stream_email_with_ai,
+)
+from app.services.local_classifier import classifier_remove_email, classifier_sync_email
+from app.services.job_queue import get_job_queue, notify_job_workers
+from app.services.cleaning_patterns import fetch_user_patterns_async
+from app.services.search import MAX_QUERY_LENGTH, search_rows
+from app.services.near_duplicates import (
+    near_duplicate_add_emails,
+    near_duplicate_remove_email,
+    near_duplicate_sync_email,
+)
+from app.services.email_stats import (
+    fetch_email_stats,
+    get_stats_cache,
+    invalidate_user_stats,
+    stats_cache_key,
+)
 from app.core.config import get_settings
+from app.core.http_cache import cached_list_response
+from app.core.metrics import STAGE_CLEAN, STAGE_EXTRACT, STAGE_INSERT
 
 router = APIRouter(prefix="/emails", tags=["emails"])
 
 
 # Função auxiliar para extrair e limpar conteúdo
-def extract_and_clean_content(
+async def extract_and_clean_content(
     conteudo: str = Form(None),
     file: UploadFile = File(None),
-) -> str:
+    patterns: Sequence[str] = (),
+) -> CleanResult:
+    settings = get_settings()
+
     # Conteúdo não enviado
     if not conteudo and not file:
         raise HTTPException(
             status_code=400,
             detail="Envie 'conteudo' OU 'file' (.pdf/.txt).",
         )
+    if conteudo and len(conteudo) > MAX_EMAIL_CONTENT_LENGTH:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Conteúdo maior que {MAX_EMAIL_CONTENT_LENGTH} caracteres.",
+        )
 
     # Se veio arquivo
     if file:
@@ -37,7 +106,22 @@ def extract_and_clean_content(
                 detail="Apenas .pdf ou .txt são aceitos.",
             )
 
-        extracted = guess_and_extract(file)
+        try:
+            with STAGE_EXTRACT.time():
+                extracted = await extract_upload_async(
+                    file,
+                    max_bytes=settings.upload_max_bytes,
+                    max_pages=settings.pdf_max_pages,
+                    # Só o necessário para o orçamento de tokens (com folga para a limpeza)
+                    max_chars=int(settings.max_email_tokens * CHARS_PER_TOKEN * 2),
+                    timeout=settings.pdf_extract_timeout_seconds,
+                    workers=settings.pdf_workers,
+                )
+        except UploadTooLarge as e:
+            raise HTTPException(status_code=413, detail=str(e))
+        except ExtractionTimeout as e:
+            raise HTTPException(status_code=422, detail=str(e))
+
         if not extracted:
             raise HTTPException(
                 status_code=400,
@@ -46,64 +130,332 @@ def extract_and_clean_content(
 
         conteudo = extracted
 
-    # Limpeza final
-    clean = basic_clean(conteudo or "")
-    if not clean.strip():
+    # Limpeza final: histórico citado, assinatura, avisos legais e padrões do usuário
+    with STAGE_CLEAN.time():
+        cleaned = await run_in_threadpool(
+            clean_email, conteudo or "", patterns, settings.email_cleaning_steps
+        )
+    if not cleaned.text.strip():
         raise HTTPException(
             status_code=400,
             detail="Conteúdo vazio após limpeza.",
         )
 
-    return clean
+    return cleaned
+
+
+async def _clean_for_user(
+    conteudo: Optional[str],
+    file: Optional[UploadFile],
+    supabase: Client,
+    user_id: str,
+) -> CleanResult:
+    try:
+        patterns = await fetch_user_patterns_async(supabase, user_id)
+    except PostgrestAPIError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return await extract_and_clean_content(conteudo, file, patterns)
+
+
+def _create_out(row: Dict[str, Any], ai_data: Dict[str, Any], cleaned: CleanResult) -> EmailCreateOut:
+    return EmailCreateOut(
+        **row,
+        cache_hit=ai_data["cache_hit"],
+        classified_locally=ai_data["classified_locally"],
+        near_duplicate_of=ai_data.get("near_duplicate_of"),
+        bytes_saved=cleaned.bytes_saved,
+        tokens_saved=cleaned.tokens_saved,
+    )
 
-@router.get("/", response_model=EmailList)
+
+# Relações que podem vir embutidas na mesma consulta (expand=)
+EMAIL_EMBEDS = {
+    "categoria": "categoria:categorias(id,nome,cor)",
+    "score": "score:scores(id,classificacao)",
+}
+# Colunas aceitas em `fields=` e as usadas por view=summary
+EMAIL_FIELDS = tuple(f for f in EmailSummaryOut.model_fields if f not in EMAIL_EMBEDS)
+EMAIL_SUMMARY_FIELDS = ("assunto", "categoria_id", "score_id")
+# Colunas de EmailOut, no lugar de "*" (que traria também a coluna de busca)
+EMAIL_COLUMNS = ",".join(EmailOut.model_fields)
+
+
+@router.get(
+    "/",
+    response_model=Union[EmailList, EmailExpandedList, EmailSummaryList],
+    response_model_exclude_unset=True,
+)
 def list_emails(
     page: int = Query(1, ge=1),
     page_size: int = Query(10, ge=1, le=100),
+    cursor: Optional[str] = None,
+    count: Optional[Literal["exact", "planned", "estimated", "none"]] = None,
+    view: Literal["full", "summary"] = "full",
+    fields: Optional[str] = None,
+    preview: bool = False,
+    expand: Optional[str] = None,
     categoria_id: Optional[str] = None,
     score_id: Optional[str] = None,
+    q: Optional[str] = Query(None, max_length=MAX_QUERY_LENGTH),
     supabase: Client = Depends(get_supabase_client),
     current_user: UserOut = Depends(get_current_user),
 ):
-    from_ = (page - 1) * page_size
-    to = from_ + page_size - 1
-
-    query = (
-        supabase.table("emails")
-        .select("*", count="exact")
-        .eq("user_id", current_user.id)
-        .order("created_at", desc=True)
+    # view=summary / fields= buscam só as colunas necessárias (sem os corpos inteiros)
+    summary = view == "summary" or fields is not None or preview
+    try:
+        embeds = parse_expand(expand, EMAIL_EMBEDS)
+        columns = EMAIL_COLUMNS
+        if summary:
+            selected = parse_fields(fields, EMAIL_FIELDS) if fields else EMAIL_SUMMARY_FIELDS
+            columns = select_columns(selected, preview=preview or view == "summary")
+    except InvalidFields as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if q and q.strip():
+        # Busca textual: ordem por relevância, sem contagem
+        keep = columns.split(",") if summary else list(EmailOut.model_fields)
+        keep += [embed_alias(e) for e in embeds]
+        try:
+            rows, next_cursor = search_rows(
+                supabase,
+                "search_emails",
+                current_user.id,
+                q.strip(),
+                page=page,
+                page_size=page_size,
+                cursor=cursor,
+                filters={"categoria_id": categoria_id, "score_id": score_id},
+            )
+        except InvalidCursor as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except PostgrestAPIError as e:
+            print("Erro Supabase:", e)
+            raise HTTPException(status_code=500, detail=str(e))
+        data = [project_row(row, keep) for row in rows]
+        total = None
+    else:
+        # Categoria/score resolvidos pelo PostgREST (sem idas extras a /categories e /scores)
+        columns = ",".join([columns, *embeds])
+
+        query = (
+            supabase.table("emails")
+            .select(columns, count=count_method(count, cursor))
+            .eq("user_id", current_user.id)
+        )
+
+        if categoria_id:
+            query = query.eq("categoria_id", categoria_id)
+        if score_id:
+            query = query.eq("score_id", score_id)
+
+        try:
+            query = paginate(query, page, page_size, cursor)
+        except InvalidCursor as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        try:
+            resp = query.execute()
+        except PostgrestAPIError as e:
+            print("Erro Supabase:", e)
+            raise HTTPException(status_code=500, detail=str(e))
+
+        data, next_cursor = split_page(resp.data or [], page_size)
+        total = resp.count
+
+    if summary:
+        return EmailSummaryList(
+            items=[EmailSummaryOut(**item) for item in data],
+            page=page,
+            page_size=page_size,
+            total=total,
+            next_cursor=next_cursor,
+        )
+
+    if embeds:
+        return EmailExpandedList(
+            items=[EmailExpandedOut(**item) for item in data],
+            page=page,
+            page_size=page_size,
+            total=total,
+            next_cursor=next_cursor,
+        )
+
+    items = [EmailOut(**item) for item in data]
+
+    return EmailList(
+        items=items,
+        page=page,
+        page_size=page_size,
+        total=total,
+        next_cursor=next_cursor,
     )
 
-    if categoria_id:
-        query = query.eq("categoria_id", categoria_id)
-    if score_id:
-        query = query.eq("score_id", score_id)
 
+# Colunas exportadas por padrão (as de EmailOut)
+EMAIL_EXPORT_FIELDS = tuple(EmailOut.model_fields)
+
+
+@router.get("/export")
+def export_emails(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    fields: Optional[str] = None,
+    categoria_id: Optional[str] = None,
+    score_id: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    gzip: bool = False,
+    supabase: Client = Depends(get_supabase_client),
+    current_user: UserOut = Depends(get_current_user),
+):
+    """
+    Exporta os e-mails do usuário em NDJSON ou CSV, em streaming: as linhas
+    são lidas do Supabase em páginas keyset (memória constante) e escritas
+    conforme chegam. `created_to` é exclusivo.
+    """
+    settings = get_settings()
     try:
-        resp = query.range(from_, to).execute()
+        selected = parse_fields(fields, EMAIL_EXPORT_FIELDS) if fields else EMAIL_EXPORT_FIELDS
+    except InvalidFields as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    columns = select_columns(selected).split(",")
+
+    def build_query():
+        query = (
+            supabase.table("emails")
+            .select(",".join(columns))
+            .eq("user_id", current_user.id)
+        )
+        if categoria_id:
+            query = query.eq("categoria_id", categoria_id)
+        if score_id:
+            query = query.eq("score_id", score_id)
+        if created_from:
+            query = query.gte("created_at", created_from.isoformat())
+        if created_to:
+            query = query.lt("created_at", created_to.isoformat())
+        return query
+
+    pages = iter_keyset_pages(build_query, settings.export_page_size)
+    # A primeira página é lida antes de responder: erros do banco ainda viram 500
+    try:
+        first = next(pages, None)
     except PostgrestAPIError as e:
-        print("Erro Supabase:", e)
         raise HTTPException(status_code=500, detail=str(e))
+    if first is not None:
+        pages = itertools.chain([first], pages)
+
+    filename = f"emails.{format}" + (".gz" if gzip else "")
+    return StreamingResponse(
+        encode_export(pages, format, columns, gzip=gzip),
+        media_type="application/gzip" if gzip else MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
 
-    data = resp.data or []
-    total = resp.count or len(data)
 
-    items = [EmailOut(**item) for item in data]
+@router.get("/stats", response_model=EmailStats)
+def get_email_stats(
+    request: Request,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    bucket: Literal["day", "week"] = "day",
+    supabase: Client = Depends(get_supabase_client),
+    current_user: UserOut = Depends(get_current_user),
+):
+    """
+    Contagens por categoria, por score e por dia/semana (agregadas no banco),
+    servidas de um cache curto por usuário. `created_to` é exclusivo.
+    """
+
+    def build() -> EmailStats:
+        try:
+            data = fetch_email_stats(supabase, current_user.id, created_from, created_to, bucket)
+        except PostgrestAPIError as e:
+            raise HTTPException(status_code=500, detail=str(e))
+        return EmailStats(
+            total=data.get("total", 0),
+            by_category=data.get("by_category") or [],
+            by_score=data.get("by_score") or [],
+            by_period=data.get("by_period") or [],
+            bucket=bucket,
+            created_from=created_from,
+            created_to=created_to,
+        )
+
+    key = stats_cache_key(current_user.id, created_from, created_to, bucket)
+    return cached_list_response(request, key, build, private=True, cache=get_stats_cache())
+
 
-    return EmailList(items=items, page=page, page_size=page_size, total=total)
+def _job_out(job: dict, email: Optional[EmailOut] = None) -> JobOut:
+    return JobOut(
+        id=job["id"],
+        status=job["status"],
+        attempts=job["attempts"],
+        error=job["error"],
+        created_at=job["created_at"],
+        updated_at=job["updated_at"],
+        email=email,
+    )
 
 
-@router.get("/{email_id}", response_model=EmailOut)
+@router.post("/jobs", response_model=JobOut, status_code=202)
+async def create_email_job(
+    conteudo: str = Form(None),
+    file: UploadFile = File(None),
+    supabase: Client = Depends(get_supabase_client),
+    current_user: UserOut = Depends(get_current_user),
+):
+    # Modo assíncrono: enfileira e responde na hora; o resultado sai em GET /emails/jobs/{id}
+    # O job guarda o corpo original; o worker refaz a limpeza antes do modelo
+    cleaned = await _clean_for_user(conteudo, file, supabase, current_user.id)
+    job = await run_in_threadpool(get_job_queue().enqueue, current_user.id, cleaned.original)
+    notify_job_workers()
+    return _job_out(job)
+
+
+@router.get("/jobs/{job_id}", response_model=JobOut)
+def get_email_job(
+    job_id: str,
+    supabase: Client = Depends(get_supabase_client),
+    current_user: UserOut = Depends(get_current_user),
+):
+    job = get_job_queue().get(job_id, user_id=current_user.id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job não encontrado")
+
+    email = None
+    if job["email_id"]:
+        try:
+            resp = (
+                supabase.table("emails")
+                .select(EMAIL_COLUMNS)
+                .eq("id", job["email_id"])
+                .eq("user_id", current_user.id)
+                .execute()
+            )
+        except PostgrestAPIError as e:
+            raise HTTPException(status_code=500, detail=str(e))
+        if resp.data:
+            email = EmailOut(**resp.data[0])
+
+    return _job_out(job, email)
+
+
+@router.get("/{email_id}", response_model=EmailExpandedOut, response_model_exclude_unset=True)
 def get_email(
     email_id: str,
+    expand: Optional[str] = None,
     supabase: Client = Depends(get_supabase_client),
     current_user: UserOut = Depends(get_current_user),
 ):
+    try:
+        embeds = parse_expand(expand, EMAIL_EMBEDS)
+    except InvalidFields as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
     try:
         resp = (
             supabase.table("emails")
-            .select("*")
+            .select(",".join([EMAIL_COLUMNS, *embeds]))
             .eq("id", email_id)
             .eq("user_id", current_user.id)
             .single()
@@ -116,11 +468,11 @@ def get_email(
     if not resp.data:
         raise HTTPException(status_code=404, detail="E-mail não encontrado")
 
-    return EmailOut(**resp.data)
+    return EmailExpandedOut(**resp.data)
 
 
-@router.post("/", response_model=EmailOut, status_code=201)
-def create_email(
+@router.post("/", response_model=EmailCreateOut, status_code=201)
+async def create_email(
     conteudo: str = Form(None),
     file: UploadFile = File(None),
     supabase: Client = Depends(get_supabase_client),
@@ -129,11 +481,12 @@ def create_email(
     settings = get_settings()
 
     # 1) Extrai texto do arquivo ou usa texto direto
-    clean_content = extract_and_clean_content(conteudo, file)
+    cleaned = await _clean_for_user(conteudo, file, supabase, current_user.id)
+    clean_content = cleaned.text
 
     # 2) IA processa o e-mail (gera assunto + resposta + categoria_id)
     try:
-        ai_data = process_email_with_ai(
+        ai_data = await process_email_with_ai_async(
             conteudo_email=clean_content,
             supabase=supabase,
             user_id=current_user.id,
@@ -142,25 +495,192 @@ def create_email(
     except RuntimeError as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-    # 3) Salva no Supabase
-    to_insert = {
-        "conteudo": clean_content,
-        "assunto": ai_data["assunto"],
-        "resposta": ai_data["resposta"],
-        "categoria_id": ai_data["categoria_id"],
-        "score_id": None,
-        "user_id": current_user.id,
-    }
+    # 3) Salva no Supabase (o corpo original; a versão limpa só vai para o modelo)
+    to_insert = build_email_row(cleaned.original, ai_data, current_user.id)
 
     try:
-        resp = supabase.table("emails").insert(to_insert).execute()
+        with STAGE_INSERT.time():
+            resp = await run_in_threadpool(supabase.table("emails").insert(to_insert).execute)
     except PostgrestAPIError as e:
         raise HTTPException(status_code=500, detail=str(e))
 
     if not resp.data:
         raise HTTPException(status_code=500, detail="Falha ao criar e-mail")
 
-    return EmailOut(**resp.data[0])
+    invalidate_user_stats(current_user.id)
+    await run_in_threadpool(near_duplicate_add_emails, current_user.id, resp.data)
+    return _create_out(resp.data[0], ai_data, cleaned)
+
+
+def _sse(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+
+@router.post("/stream")
+async def create_email_stream(
+    conteudo: str = Form(None),
+    file: UploadFile = File(None),
+    supabase: Client = Depends(get_supabase_client),
+    current_user: UserOut = Depends(get_current_user),
+):
+    """
+    Igual a POST /emails/, mas responde com server-sent events:
+      - `delta`: trechos da resposta sugerida conforme o modelo gera
+      - `done`: o e-mail salvo (EmailOut)
+      - `error`: falha ao gerar, validar ou salvar
+    """
+    settings = get_settings()
+
+    # Erros de entrada ainda saem como 400 normal, antes de abrir o stream
+    cleaned = await _clean_for_user(conteudo, file, supabase, current_user.id)
+    clean_content = cleaned.text
+
+    async def event_stream():
+        try:
+            ai_data = None
+            async for kind, payload in stream_email_with_ai(
+                conteudo_email=clean_content,
+                supabase=supabase,
+                user_id=current_user.id,
+                settings=settings,
+            ):
+                if kind == "delta":
+                    yield _sse("delta", {"texto": payload})
+                else:
+                    ai_data = payload
+
+            to_insert = build_email_row(cleaned.original, ai_data, current_user.id)
+            with STAGE_INSERT.time():
+                resp = await run_in_threadpool(supabase.table("emails").insert(to_insert).execute)
+            if not resp.data:
+                raise RuntimeError("Falha ao criar e-mail")
+        except (RuntimeError, PostgrestAPIError) as e:
+            yield _sse("error", {"detail": str(e)})
+            return
+
+        invalidate_user_stats(current_user.id)
+        await run_in_threadpool(near_duplicate_add_emails, current_user.id, resp.data)
+
+        email = _create_out(resp.data[0], ai_data, cleaned)
+        yield _sse("done", email.model_dump(mode="json"))
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _batch_row_key(row: Dict[str, Any]) -> tuple:
+    return tuple(
+        None if row.get(k) is None else str(row[k])
+        for k in ("conteudo", "assunto", "resposta", "categoria_id")
+    )
+
+
+@router.post("/batch", response_model=EmailBatchOut)
+async def create_emails_batch(
+    conteudos: Optional[List[str]] = Form(None),
+    files: Optional[List[UploadFile]] = File(None),
+    supabase: Client = Depends(get_supabase_client),
+    current_user: UserOut = Depends(get_current_user),
+):
+    settings = get_settings()
+
+    sources: List[tuple] = [(c, None) for c in (conteudos or [])]
+    sources += [(None, f) for f in (files or [])]
+
+    if not sources:
+        raise HTTPException(
+            status_code=400,
+            detail="Envie ao menos um 'conteudos' ou 'files' (.pdf/.txt).",
+        )
+    if len(sources) > settings.batch_max_items:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Máximo de {settings.batch_max_items} e-mails por lote.",
+        )
+
+    # Categorias/exemplos buscados uma única vez para o lote inteiro
+    compiled = await get_compiled_prompt_async(supabase, current_user.id)
+    if not compiled.categories:
+        raise HTTPException(
+            status_code=500,
+            detail="Não há categorias cadastradas no banco para este usuário.",
+        )
+
+    try:
+        patterns = await fetch_user_patterns_async(supabase, current_user.id)
+    except PostgrestAPIError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    semaphore = asyncio.Semaphore(settings.batch_concurrency)
+
+    async def _process(conteudo: Optional[str], file: Optional[UploadFile]) -> Dict[str, Any]:
+        async with semaphore:
+            try:
+                cleaned = await extract_and_clean_content(conteudo, file, patterns)
+                ai_data = await process_email_with_ai_async(
+                    conteudo_email=cleaned.text,
+                    supabase=supabase,
+                    user_id=current_user.id,
+                    settings=settings,
+                    compiled=compiled,
+                )
+            except HTTPException as e:
+                return {"error": str(e.detail)}
+            except RuntimeError as e:
+                return {"error": str(e)}
+            return {
+                "row": build_email_row(cleaned.original, ai_data, current_user.id),
+                "ai_data": ai_data,
+                "cleaned": cleaned,
+            }
+
+    results = await asyncio.gather(*(_process(c, f) for c, f in sources))
+
+    # Um único insert em massa para todos os itens processados com sucesso
+    rows = [r["row"] for r in results if "row" in r]
+    inserted: List[Dict[str, Any]] = []
+    if rows:
+        try:
+            with STAGE_INSERT.time():
+                resp = await run_in_threadpool(supabase.table("emails").insert(rows).execute)
+        except PostgrestAPIError as e:
+            raise HTTPException(status_code=500, detail=str(e))
+        inserted = resp.data or []
+        if inserted:
+            invalidate_user_stats(current_user.id)
+            await run_in_threadpool(near_duplicate_add_emails, current_user.id, inserted)
+
+    # As linhas devolvidas são casadas com os itens pelo conteúdo gravado; um
+    # retorno parcial vira erro só nos itens sem linha (o resto já foi salvo)
+    returned: Dict[tuple, List[Dict[str, Any]]] = {}
+    for row in inserted:
+        returned.setdefault(_batch_row_key(row), []).append(row)
+
+    items: List[EmailBatchItem] = []
+    for index, result in enumerate(results):
+        if "row" not in result:
+            items.append(EmailBatchItem(index=index, error=result["error"]))
+            continue
+        matches = returned.get(_batch_row_key(result["row"]))
+        if not matches:
+            items.append(EmailBatchItem(
+                index=index,
+                error="E-mail não confirmado pelo banco; confira a listagem antes de reenviar.",
+            ))
+            continue
+        email = _create_out(matches.pop(0), result["ai_data"], result["cleaned"])
+        items.append(EmailBatchItem(index=index, email=email))
+
+    succeeded = sum(1 for item in items if item.email is not None)
+    return EmailBatchOut(
+        items=items,
+        total=len(items),
+        succeeded=succeeded,
+        failed=len(items) - succeeded,
+    )
 
 
 @router.put("/{email_id}", response_model=EmailOut)
@@ -171,8 +691,9 @@ def update_email(
     current_user: UserOut = Depends(get_current_user),
 ):
     data = {k: v for k, v in payload.dict().items() if v is not None}
-    if "conteudo" in data and data["conteudo"]:
-        data["conteudo"] = basic_clean(data["conteudo"])
+    # Mesmo formato salvo na criação (CleanResult.original), não o texto limpo do modelo
+    if data.get("conteudo"):
+        data["conteudo"] = stored_content(data["conteudo"])
 
     try:
         resp = (
@@ -191,6 +712,10 @@ def update_email(
             detail="E-mail não encontrado ou não pertence ao usuário",
         )
 
+    # E-mails avaliados (score + categoria) alimentam o classificador local
+    classifier_sync_email(current_user.id, resp.data[0])
+    near_duplicate_sync_email(current_user.id, resp.data[0])
+    invalidate_user_stats(current_user.id)
     return EmailOut(**resp.data[0])
 
 
@@ -218,4 +743,7 @@ def delete_email(
             detail="E-mail não encontrado ou não pertence ao usuário",
         )
 
+    classifier_remove_email(current_user.id, email_id)
+    near_duplicate_remove_email(current_user.id, email_id)
+    invalidate_user_stats(current_user.id)
     return None
@@ -1,6 +1,6 @@
 # app/api/routes/email.py
-from fastapi import APIRouter, Depends, HTTPException, Query
-from typing import Optional
+from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile
+from typing import Literal, Optional, Union
 
 from supabase import Client
 from postgrest.exceptions import APIError as PostgrestAPIError
@@ -8,45 +8,124 @@ from postgrest.exceptions import APIError as PostgrestAPIError
 from app.db.supabase import get_supabase_client
 from app.deps.auth import get_current_user
 from app.schemas.user import UserOut
-from app.schemas.example import ExampleCreate, ExampleOut, ExampleList
+from app.schemas.example import (
+    ExampleCreate,
+    ExampleOut,
+    ExampleList,
+    ExampleSummaryOut,
+    ExampleSummaryList,
+    ExampleImportOut,
+)
 from app.utils.text_processing import basic_clean
+from app.utils.pagination import InvalidCursor, count_method, paginate, split_page
+from app.utils.projection import InvalidFields, parse_fields, project_row, select_columns
+from app.services.email_ai_service import apply_example_created, apply_example_deleted
+from app.services.search import MAX_QUERY_LENGTH, search_rows
+from app.services.example_import import ImportFormatError, detect_format, import_examples
+from app.services.local_classifier import invalidate_user_classifier
+from app.services.prompt_cache import invalidate_user_prompt
+from app.core.config import get_settings
 
 router = APIRouter(prefix="/examples", tags=["examples"])
 
 
-@router.get("/", response_model=ExampleList)
+# Colunas aceitas em `fields=` e as usadas por view=summary
+EXAMPLE_FIELDS = tuple(ExampleSummaryOut.model_fields)
+EXAMPLE_SUMMARY_FIELDS = ("categoria_id",)
+# Colunas de ExampleOut, no lugar de "*" (que traria também a coluna de busca)
+EXAMPLE_COLUMNS = ",".join(ExampleOut.model_fields)
+
+
+@router.get(
+    "/",
+    response_model=Union[ExampleList, ExampleSummaryList],
+    response_model_exclude_unset=True,
+)
 def list_examples(
     page: int = Query(1, ge=1),
     page_size: int = Query(10, ge=1, le=100),
+    cursor: Optional[str] = None,
+    count: Optional[Literal["exact", "planned", "estimated", "none"]] = None,
+    view: Literal["full", "summary"] = "full",
+    fields: Optional[str] = None,
+    preview: bool = False,
     categoria_id: Optional[str] = None,
+    q: Optional[str] = Query(None, max_length=MAX_QUERY_LENGTH),
     supabase: Client = Depends(get_supabase_client),
     current_user: UserOut = Depends(get_current_user),
 ):
-    from_ = (page - 1) * page_size
-    to = from_ + page_size - 1
-
-    query = (
-        supabase.table("examples")
-        .select("*", count="exact")
-        .eq("user_id", current_user.id)
-        .order("created_at", desc=True)
-    )
-
-    if categoria_id:
-        query = query.eq("categoria_id", categoria_id)
-
-    try:
-        resp = query.range(from_, to).execute()
-    except PostgrestAPIError as e:
-        print("Erro Supabase:", e)
-        raise HTTPException(status_code=500, detail=str(e))
+    summary = view == "summary" or fields is not None or preview
+    columns = EXAMPLE_COLUMNS
+    if summary:
+        try:
+            selected = parse_fields(fields, EXAMPLE_FIELDS) if fields else EXAMPLE_SUMMARY_FIELDS
+        except InvalidFields as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        columns = select_columns(selected, preview=preview or view == "summary")
+
+    if q and q.strip():
+        # Busca textual: ordem por relevância, sem contagem
+        try:
+            rows, next_cursor = search_rows(
+                supabase,
+                "search_examples",
+                current_user.id,
+                q.strip(),
+                page=page,
+                page_size=page_size,
+                cursor=cursor,
+                filters={"categoria_id": categoria_id},
+            )
+        except InvalidCursor as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except PostgrestAPIError as e:
+            print("Erro Supabase:", e)
+            raise HTTPException(status_code=500, detail=str(e))
+        keep = columns.split(",") if summary else list(ExampleOut.model_fields)
+        data = [project_row(row, keep) for row in rows]
+        total = None
+    else:
+        query = (
+            supabase.table("examples")
+            .select(columns, count=count_method(count, cursor))
+            .eq("user_id", current_user.id)
+        )
 
-    data = resp.data or []
-    total = resp.count or len(data)
+        if categoria_id:
+            query = query.eq("categoria_id", categoria_id)
+
+        try:
+            query = paginate(query, page, page_size, cursor)
+        except InvalidCursor as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        try:
+            resp = query.execute()
+        except PostgrestAPIError as e:
+            print("Erro Supabase:", e)
+            raise HTTPException(status_code=500, detail=str(e))
+
+        data, next_cursor = split_page(resp.data or [], page_size)
+        total = resp.count
+
+    if summary:
+        return ExampleSummaryList(
+            items=[ExampleSummaryOut(**item) for item in data],
+            page=page,
+            page_size=page_size,
+            total=total,
+            next_cursor=next_cursor,
+        )
 
     items = [ExampleOut(**item) for item in data]
 
-    return ExampleList(items=items, page=page, page_size=page_size, total=total)
+    return ExampleList(
+        items=items,
+        page=page,
+        page_size=page_size,
+        total=total,
+        next_cursor=next_cursor,
+    )
 
 
 @router.get("/{example_id}", response_model=ExampleOut)
@@ -57,7 +136,7 @@ def get_email(
 ):
     resp = (
         supabase.table("examples")
-        .select("*")
+        .select(EXAMPLE_COLUMNS)
         .eq("id", example_id)
         .eq("user_id", current_user.id)
         .single()
@@ -85,9 +164,60 @@ def create_example(
     if not resp.data:
         raise HTTPException(status_code=500, detail="Falha ao criar exemplo")
 
+    apply_example_created(current_user.id, resp.data[0])
     return ExampleOut(**resp.data[0])
 
 
+@router.post("/import", response_model=ExampleImportOut)
+def import_examples_file(
+    file: UploadFile = File(...),
+    format: Optional[Literal["csv", "jsonl"]] = None,
+    supabase: Client = Depends(get_supabase_client),
+    current_user: UserOut = Depends(get_current_user),
+):
+    """
+    Importa exemplos de um CSV (com cabeçalho) ou JSONL com os campos
+    conteudo, resposta e categoria (nome) ou categoria_id.
+    """
+    settings = get_settings()
+
+    if file.size is not None and file.size > settings.examples_import_max_bytes:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Arquivo maior que o limite de {settings.examples_import_max_bytes} bytes.",
+        )
+
+    try:
+        fmt = detect_format(file.filename, format)
+        result = import_examples(
+            file.file,
+            fmt,
+            supabase,
+            current_user.id,
+            chunk_size=settings.examples_import_chunk_size,
+            max_rows=settings.examples_import_max_rows,
+        )
+    except ImportFormatError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except PostgrestAPIError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    inserted = len(result["inserted"])
+    if inserted:
+        # Prompt compilado, índice de exemplos e classificador local
+        # descartados uma única vez (reconstruídos no próximo uso)
+        invalidate_user_prompt(current_user.id)
+        invalidate_user_classifier(current_user.id)
+
+    return ExampleImportOut(
+        total=result["total"],
+        inserted=inserted,
+        failed=len(result["errors"]),
+        errors=result["errors"],
+        truncated=result["truncated"],
+    )
+
+
 @router.delete("/{example_id}", status_code=204)
 def delete_email(
     example_id: str,
@@ -109,4 +239,5 @@ def delete_email(
             detail="E-mail não encontrado ou não pertence ao usuário",
         )
 
+    apply_example_deleted(current_user.id, example_id)
     return None
@@ -1,5 +1,6 @@
 # app/api/routes/score.py
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
+from app.core.http_cache import cached_list_response, invalidate_list
 from app.db.supabase import get_supabase_client
 from app.schemas.score import ScoreCreate, ScoreUpdate, ScoreOut, ScoreList
 from supabase import Client
@@ -7,13 +8,19 @@ from postgrest.exceptions import APIError as PostgrestAPIError
 
 router = APIRouter(prefix="/scores", tags=["scores"])
 
+# Chave da listagem no cache de respostas (tabela global, igual para todos)
+SCORES_CACHE_KEY = "scores"
+
 
 @router.get("/", response_model=ScoreList)
-def list_scores(supabase: Client = Depends(get_supabase_client)):
-    resp = supabase.table("scores").select("*").order("created_at").execute()
-    data = resp.data or []
-    items = [ScoreOut(**item) for item in data]
-    return ScoreList(items=items, total=len(items))
+def list_scores(request: Request, supabase: Client = Depends(get_supabase_client)):
+    def build() -> ScoreList:
+        resp = supabase.table("scores").select("*").order("created_at").execute()
+        data = resp.data or []
+        items = [ScoreOut(**item) for item in data]
+        return ScoreList(items=items, total=len(items))
+
+    return cached_list_response(request, SCORES_CACHE_KEY, build, private=False)
 
 
 @router.get("/{score_id}", response_model=ScoreOut)
@@ -29,6 +36,7 @@ def create_score(
     supabase: Client = Depends(get_supabase_client),
 ):
     resp = supabase.table("scores").insert(payload.dict()).execute()
+    invalidate_list(SCORES_CACHE_KEY)
 
     return ScoreOut(**resp.data[0])
 
@@ -41,6 +49,7 @@ def update_score(
 ):
     data = {k: v for k, v in payload.dict().items() if v is not None}
     resp = supabase.table("scores").update(data).eq("id", score_id).execute()
+    invalidate_list(SCORES_CACHE_KEY)
 
     return ScoreOut(**resp.data[0])
 
@@ -48,4 +57,5 @@ def update_score(
 @router.delete("/{score_id}", status_code=204)
 def delete_score(score_id: str, supabase: Client = Depends(get_supabase_client)):
     resp = supabase.table("scores").delete().eq("id", score_id).execute()
+    invalidate_list(SCORES_CACHE_KEY)
 
@@ -0,0 +1,92 @@
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, Optional
+
+from app.core.config import get_settings
+from app.schemas.user import UserOut
+
+
+class VerifiedUserCache:
+    """
+    Cache em memória (TTL + LRU) dos usuários já verificados, e lista de
+    revogação (user_id -> momento da revogação): tokens emitidos antes de
+    `revoke` são recusados, consultada antes do cache e das claims.
+
+    Ambos são por processo. Revogações feitas pela API valem na hora neste
+    processo; mudanças feitas fora dela (usuário removido direto no banco,
+    nome/e-mail alterados) valem em até AUTH_CLAIMS_MAX_AGE_SECONDS +
+    AUTH_USER_CACHE_TTL_SECONDS.
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int, revocation_ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.revocation_ttl_seconds = revocation_ttl_seconds
+        self._users: "OrderedDict[str, tuple]" = OrderedDict()
+        self._revoked: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def get(self, user_id: str) -> Optional[UserOut]:
+        now = time.time()
+        with self._lock:
+            item = self._users.get(user_id)
+            if item is None:
+                return None
+            if item[0] <= now:
+                del self._users[user_id]
+                return None
+            self._users.move_to_end(user_id)
+            return item[1]
+
+    def put(self, user: UserOut) -> None:
+        with self._lock:
+            self._users[user.id] = (time.time() + self.ttl_seconds, user)
+            self._users.move_to_end(user.id)
+            while len(self._users) > self.max_entries:
+                self._users.popitem(last=False)
+
+    def invalidate(self, user_id: str) -> None:
+        with self._lock:
+            self._users.pop(user_id, None)
+
+    def revoke(self, user_id: str) -> None:
+        with self._lock:
+            self._users.pop(user_id, None)
+            self._revoked[user_id] = time.time()
+            self._purge_revoked()
+
+    def is_revoked(self, user_id: str, issued_at: Optional[float]) -> bool:
+        with self._lock:
+            revoked_at = self._revoked.get(user_id)
+        if revoked_at is None:
+            return False
+        # Tokens sem `iat` não têm como provar que são posteriores à revogação
+        return issued_at is None or issued_at <= revoked_at
+
+    def _purge_revoked(self) -> None:
+        # Depois da validade máxima do token, a entrada não protege mais nada
+        limit = time.time() - self.revocation_ttl_seconds
+        for user_id in [u for u, t in self._revoked.items() if t < limit]:
+            del self._revoked[user_id]
+
+
+@lru_cache
+def get_user_cache() -> VerifiedUserCache:
+    settings = get_settings()
+    return VerifiedUserCache(
+        ttl_seconds=settings.auth_user_cache_ttl_seconds,
+        max_entries=settings.auth_user_cache_max_entries,
+        revocation_ttl_seconds=settings.jwt_access_token_expires_minutes * 60,
+    )
+
+
+def invalidate_user(user_id: str) -> None:
+    """Força nova verificação no banco (ex.: nome ou e-mail alterados)."""
+    get_user_cache().invalidate(user_id)
+
+
+def revoke_user(user_id: str) -> None:
+    """Recusa imediatamente os tokens já emitidos para o usuário (ex.: logout, conta removida)."""
+    get_user_cache().revoke(user_id)
@@ -15,6 +15,96 @@ class Settings(BaseModel):
     jwt_secret_key: str
     jwt_algorithm: str = "HS256"
     jwt_access_token_expires_minutes: int = 60 * 24  # 1 dia
+    # Autenticação sem ida ao banco (claims do token + cache de usuários verificados).
+    # Claims valem por AUTH_CLAIMS_MAX_AGE_SECONDS após a emissão; revogações pela
+    # API (logout) valem na hora, mudanças direto no banco só após essa janela
+    auth_claims_max_age_seconds: int = 300
+    auth_user_cache_ttl_seconds: float = 60.0
+    auth_user_cache_max_entries: int = 10000
+    # Hash de senhas em pool de processos, com limite próprio de concorrência
+    auth_hash_workers: int = 2
+    auth_max_concurrency: int = 8
+    auth_queue_timeout_seconds: float = 5.0
+    # Threads do threadpool usado pelas rotas síncronas / chamadas ao Supabase
+    threadpool_size: int = 40
+    # Cliente OpenAI assíncrono (pool keep-alive compartilhado)
+    openai_timeout_seconds: float = 60.0
+    openai_max_connections: int = 200
+    openai_max_keepalive_connections: int = 50
+    # Extração de arquivos enviados
+    upload_max_bytes: int = 10 * 1024 * 1024  # 10 MB
+    pdf_max_pages: int = 50
+    pdf_extract_timeout_seconds: float = 15.0
+    pdf_workers: int = 2
+    # Classificação em lote
+    batch_max_items: int = 200
+    batch_concurrency: int = 8
+    # Fila de jobs em background (SQLite local). Fica em data/, que é um volume
+    # no Docker: jobs pendentes sobrevivem à recriação do container
+    job_db_path: str = "data/jobs.sqlite3"
+    job_workers: int = 4
+    job_max_attempts: int = 5
+    job_backoff_base_seconds: float = 2.0
+    job_poll_interval_seconds: float = 1.0
+    job_lease_seconds: float = 300.0
+    job_retention_seconds: float = 7 * 24 * 3600.0  # jobs finalizados
+    # Cache de respostas da IA por hash do conteúdo
+    response_cache_enabled: bool = True
+    response_cache_max_entries: int = 10000
+    response_cache_ttl_seconds: float = 7 * 24 * 3600  # 7 dias
+    response_cache_backend: str = "memory"  # memory | sqlite
+    response_cache_db_path: str = "response_cache.sqlite3"
+    # Pré-classificador local (naive Bayes), experimental: desligado por padrão
+    # (treina com os exemplos e os e-mails com score em NEAR_DUPLICATE_GOOD_SCORES)
+    local_classifier_mode: str = "off"  # off | hint | classify_only
+    local_classifier_threshold: float = 0.9
+    local_classifier_min_docs: int = 10
+    local_classifier_max_users: int = 512
+    local_classifier_max_emails: int = 2000
+    # Cache de prompts compilados por usuário
+    prompt_cache_max_entries: int = 256
+    prompt_cache_max_bytes: int = 64 * 1024 * 1024  # 64 MB
+    # Seleção de exemplos (few-shot) por similaridade
+    fewshot_top_k: int = 8
+    fewshot_per_category: int = 1
+    prompt_examples_token_budget: int = 3000
+    # Limites de tokens por chamada (estimativa local)
+    max_email_tokens: int = 6000
+    max_prompt_tokens: int = 12000
+    # Limpeza de e-mails (etapas: quotes, signature, disclaimers) e padrões por usuário
+    email_cleaning_steps: list[str] = ["quotes", "signature", "disclaimers"]
+    cleaning_patterns_max_per_user: int = 50
+    cleaning_pattern_max_length: int = 200
+    cleaning_patterns_cache_max_users: int = 1024
+    # Cache das listagens de categorias/scores (ETag + Cache-Control)
+    list_cache_ttl_seconds: float = 300.0
+    list_cache_max_entries: int = 4096
+    list_cache_max_age_seconds: int = 0
+    # Endpoint /metrics (formato Prometheus) e latência por rota. Os dados são do
+    # processo inteiro (todos os usuários): só responde com METRICS_TOKEN (Bearer)
+    metrics_enabled: bool = False
+    metrics_token: Optional[str] = None
+    # Saída do modelo: JSON schema (structured outputs) e uma correção em caso de JSON inválido
+    llm_structured_outputs: bool = True
+    llm_repair_enabled: bool = True
+    llm_repair_max_tokens: int = 1500
+    # Importação de exemplos (CSV/JSONL)
+    examples_import_max_bytes: int = 20 * 1024 * 1024  # 20 MB
+    examples_import_max_rows: int = 10000
+    examples_import_chunk_size: int = 500
+    # Exportação de e-mails: linhas lidas do Supabase por página
+    export_page_size: int = 1000
+    # Estatísticas do dashboard (cache curto por usuário)
+    stats_cache_ttl_seconds: int = 30
+    stats_cache_max_entries: int = 4096
+    # Quase duplicados (MinHash/LSH): reaproveita a categoria de e-mails recentes bem avaliados
+    # (vazio em NEAR_DUPLICATE_GOOD_SCORES desliga o reaproveitamento)
+    near_duplicate_enabled: bool = True
+    near_duplicate_mode: str = "hint"  # hint (modelo redige a resposta) | classify_only (sem modelo)
+    near_duplicate_threshold: float = 0.85
+    near_duplicate_max_emails: int = 1000
+    near_duplicate_max_users: int = 256
+    near_duplicate_good_scores: list[str] = ["satisfatorio", "excelente"]
 
     class Config:   
         arbitrary_types_allowed = True
@@ -30,6 +120,8 @@ def get_settings() -> Settings:
         raise RuntimeError("Configure SUPABASE_URL e SUPABASE_SERVICE_ROLE_KEY no .env")
 
     allowed_origins = [o.strip() for o in allowed_origins_raw.split(",") if o.strip()] or ["*"]
+    cleaning_steps_raw = os.getenv("EMAIL_CLEANING_STEPS", "quotes,signature,disclaimers")
+    good_scores_raw = os.getenv("NEAR_DUPLICATE_GOOD_SCORES", "satisfatorio,excelente")
 
     return Settings(
         supabase_url=supabase_url,
@@ -38,4 +130,68 @@ def get_settings() -> Settings:
         allowed_origins=allowed_origins,
         port=int(os.getenv("PORT", "8000")),
         jwt_secret_key=os.getenv("JWT_SECRET_KEY"),
+        auth_claims_max_age_seconds=int(os.getenv("AUTH_CLAIMS_MAX_AGE_SECONDS", "300")),
+        auth_user_cache_ttl_seconds=float(os.getenv("AUTH_USER_CACHE_TTL_SECONDS", "60")),
+        auth_user_cache_max_entries=int(os.getenv("AUTH_USER_CACHE_MAX_ENTRIES", "10000")),
+        auth_hash_workers=int(os.getenv("AUTH_HASH_WORKERS", "2")),
+        auth_max_concurrency=int(os.getenv("AUTH_MAX_CONCURRENCY", "8")),
+        auth_queue_timeout_seconds=float(os.getenv("AUTH_QUEUE_TIMEOUT_SECONDS", "5")),
+        threadpool_size=int(os.getenv("THREADPOOL_SIZE", "40")),
+        openai_timeout_seconds=float(os.getenv("OPENAI_TIMEOUT_SECONDS", "60")),
+        openai_max_connections=int(os.getenv("OPENAI_MAX_CONNECTIONS", "200")),
+        openai_max_keepalive_connections=int(os.getenv("OPENAI_MAX_KEEPALIVE_CONNECTIONS", "50")),
+        upload_max_bytes=int(os.getenv("UPLOAD_MAX_BYTES", str(10 * 1024 * 1024))),
+        pdf_max_pages=int(os.getenv("PDF_MAX_PAGES", "50")),
+        pdf_extract_timeout_seconds=float(os.getenv("PDF_EXTRACT_TIMEOUT_SECONDS", "15")),
+        pdf_workers=int(os.getenv("PDF_WORKERS", "2")),
+        batch_max_items=int(os.getenv("BATCH_MAX_ITEMS", "200")),
+        batch_concurrency=int(os.getenv("BATCH_CONCURRENCY", "8")),
+        job_db_path=os.getenv("JOB_DB_PATH", "data/jobs.sqlite3"),
+        job_workers=int(os.getenv("JOB_WORKERS", "4")),
+        job_max_attempts=int(os.getenv("JOB_MAX_ATTEMPTS", "5")),
+        job_backoff_base_seconds=float(os.getenv("JOB_BACKOFF_BASE_SECONDS", "2")),
+        job_poll_interval_seconds=float(os.getenv("JOB_POLL_INTERVAL_SECONDS", "1")),
+        job_lease_seconds=float(os.getenv("JOB_LEASE_SECONDS", "300")),
+        job_retention_seconds=float(os.getenv("JOB_RETENTION_SECONDS", "604800")),
+        response_cache_enabled=os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() in ("1", "true", "yes"),
+        response_cache_max_entries=int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "10000")),
+        response_cache_ttl_seconds=float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", str(7 * 24 * 3600))),
+        response_cache_backend=os.getenv("RESPONSE_CACHE_BACKEND", "memory"),
+        response_cache_db_path=os.getenv("RESPONSE_CACHE_DB_PATH", "response_cache.sqlite3"),
+        local_classifier_mode=os.getenv("LOCAL_CLASSIFIER_MODE", "off"),
+        local_classifier_threshold=float(os.getenv("LOCAL_CLASSIFIER_THRESHOLD", "0.9")),
+        local_classifier_min_docs=int(os.getenv("LOCAL_CLASSIFIER_MIN_DOCS", "10")),
+        local_classifier_max_users=int(os.getenv("LOCAL_CLASSIFIER_MAX_USERS", "512")),
+        local_classifier_max_emails=int(os.getenv("LOCAL_CLASSIFIER_MAX_EMAILS", "2000")),
+        prompt_cache_max_entries=int(os.getenv("PROMPT_CACHE_MAX_ENTRIES", "256")),
+        prompt_cache_max_bytes=int(os.getenv("PROMPT_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+        fewshot_top_k=int(os.getenv("FEWSHOT_TOP_K", "8")),
+        fewshot_per_category=int(os.getenv("FEWSHOT_PER_CATEGORY", "1")),
+        prompt_examples_token_budget=int(os.getenv("PROMPT_EXAMPLES_TOKEN_BUDGET", "3000")),
+        max_email_tokens=int(os.getenv("MAX_EMAIL_TOKENS", "6000")),
+        max_prompt_tokens=int(os.getenv("MAX_PROMPT_TOKENS", "12000")),
+        email_cleaning_steps=[s.strip() for s in cleaning_steps_raw.split(",") if s.strip()],
+        cleaning_patterns_max_per_user=int(os.getenv("CLEANING_PATTERNS_MAX_PER_USER", "50")),
+        cleaning_pattern_max_length=int(os.getenv("CLEANING_PATTERN_MAX_LENGTH", "200")),
+        cleaning_patterns_cache_max_users=int(os.getenv("CLEANING_PATTERNS_CACHE_MAX_USERS", "1024")),
+        list_cache_ttl_seconds=float(os.getenv("LIST_CACHE_TTL_SECONDS", "300")),
+        list_cache_max_entries=int(os.getenv("LIST_CACHE_MAX_ENTRIES", "4096")),
+        list_cache_max_age_seconds=int(os.getenv("LIST_CACHE_MAX_AGE_SECONDS", "0")),
+        metrics_enabled=os.getenv("METRICS_ENABLED", "false").lower() in ("1", "true", "yes"),
+        metrics_token=os.getenv("METRICS_TOKEN") or None,
+        llm_structured_outputs=os.getenv("LLM_STRUCTURED_OUTPUTS", "true").lower() in ("1", "true", "yes"),
+        llm_repair_enabled=os.getenv("LLM_REPAIR_ENABLED", "true").lower() in ("1", "true", "yes"),
+        llm_repair_max_tokens=int(os.getenv("LLM_REPAIR_MAX_TOKENS", "1500")),
+        examples_import_max_bytes=int(os.getenv("EXAMPLES_IMPORT_MAX_BYTES", str(20 * 1024 * 1024))),
+        examples_import_max_rows=int(os.getenv("EXAMPLES_IMPORT_MAX_ROWS", "10000")),
+        examples_import_chunk_size=int(os.getenv("EXAMPLES_IMPORT_CHUNK_SIZE", "500")),
+        export_page_size=int(os.getenv("EXPORT_PAGE_SIZE", "1000")),
+        stats_cache_ttl_seconds=int(os.getenv("STATS_CACHE_TTL_SECONDS", "30")),
+        stats_cache_max_entries=int(os.getenv("STATS_CACHE_MAX_ENTRIES", "4096")),
+        near_duplicate_enabled=os.getenv("NEAR_DUPLICATE_ENABLED", "true").lower() in ("1", "true", "yes"),
+        near_duplicate_mode=os.getenv("NEAR_DUPLICATE_MODE", "hint"),
+        near_duplicate_threshold=float(os.getenv("NEAR_DUPLICATE_THRESHOLD", "0.85")),
+        near_duplicate_max_emails=int(os.getenv("NEAR_DUPLICATE_MAX_EMAILS", "1000")),
+        near_duplicate_max_users=int(os.getenv("NEAR_DUPLICATE_MAX_USERS", "256")),
+        near_duplicate_good_scores=[s.strip() for s in good_scores_raw.split(",") if s.strip()],
     )
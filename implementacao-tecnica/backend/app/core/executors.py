@@ -0,0 +1,46 @@
+# Pools de processos compartilhados (trabalho CPU-bound fora do event loop e do GIL)
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict
+
+_pools: Dict[str, ProcessPoolExecutor] = {}
+_lock = threading.Lock()
+
+
+def get_process_pool(name: str, max_workers: int) -> ProcessPoolExecutor:
+    """Pool nomeado, criado na primeira chamada. Cada uso tem seu próprio limite."""
+    with _lock:
+        pool = _pools.get(name)
+        if pool is None:
+            # spawn: não herda threads/event loop do processo do uvicorn
+            pool = ProcessPoolExecutor(
+                max_workers=max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            _pools[name] = pool
+        return pool
+
+
+def shutdown_process_pools() -> None:
+    with _lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def recycle_process_pool(name: str, pool: ProcessPoolExecutor) -> None:
+    """
+    Descarta um pool com um processo travado: os processos são encerrados e
+    a próxima chamada de get_process_pool cria um pool novo. Tarefas em
+    andamento nele falham com BrokenProcessPool.
+    """
+    with _lock:
+        if _pools.get(name) is pool:
+            del _pools[name]
+    # ProcessPoolExecutor não expõe como matar os workers (antes do 3.14)
+    processes = list((getattr(pool, "_processes", None) or {}).values())
+    pool.shutdown(wait=False, cancel_futures=True)
+    for process in processes:
+        process.terminate()
@@ -0,0 +1,127 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Callable, Dict, Optional
+
+from fastapi import Request, Response
+from pydantic import BaseModel
+
+from app.core.config import get_settings
+
+
+@dataclass(frozen=True)
+class CachedBody:
+    body: bytes
+    etag: str
+    expires_at: float
+
+
+class ListResponseCache:
+    """
+    Cache em memória de respostas de listagem já serializadas (JSON), com
+    ETag forte (hash do corpo). Cada chave tem um contador de geração:
+    `invalidate` (chamado pelas rotas de escrita) avança a geração e `put`
+    ignora corpos montados antes disso. O TTL limita o tempo que outro
+    processo pode servir uma versão antiga.
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, CachedBody]" = OrderedDict()
+        self._generations: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def generation(self, key: str) -> int:
+        with self._lock:
+            return self._generations.get(key, 0)
+
+    def get(self, key: str) -> Optional[CachedBody]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: str, body: bytes, generation: int) -> CachedBody:
+        entry = CachedBody(
+            body=body,
+            etag=f'"{hashlib.sha1(body).hexdigest()}"',
+            expires_at=time.monotonic() + self.ttl_seconds,
+        )
+        with self._lock:
+            if self._generations.get(key, 0) == generation:
+                self._entries[key] = entry
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return entry
+
+    def invalidate(self, key: str) -> None:
+        with self._lock:
+            self._generations[key] = self._generations.get(key, 0) + 1
+            self._entries.pop(key, None)
+
+
+@lru_cache
+def get_list_cache() -> ListResponseCache:
+    settings = get_settings()
+    return ListResponseCache(
+        ttl_seconds=settings.list_cache_ttl_seconds,
+        max_entries=settings.list_cache_max_entries,
+    )
+
+
+def invalidate_list(key: str) -> None:
+    """Descarta a listagem em cache (chamar nas rotas de criação/edição/remoção)."""
+    get_list_cache().invalidate(key)
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match usa comparação fraca: W/"x" equivale a "x"
+    tags = [t.strip().removeprefix("W/") for t in if_none_match.split(",")]
+    return etag in tags
+
+
+def cached_list_response(
+    request: Request,
+    key: str,
+    build: Callable[[], BaseModel],
+    *,
+    private: bool,
+    cache: Optional[ListResponseCache] = None,
+) -> Response:
+    """
+    Responde uma listagem a partir do cache (montando com `build` se preciso).
+    Com `If-None-Match` igual ao ETag atual, responde 304 sem ir ao banco.
+    `cache` permite usar outra instância (ex.: TTL diferente); padrão: get_list_cache().
+    """
+    cache = cache or get_list_cache()
+    entry = cache.get(key)
+    if entry is None:
+        generation = cache.generation(key)
+        body = build().model_dump_json().encode("utf-8")
+        entry = cache.put(key, body, generation)
+
+    max_age = get_settings().list_cache_max_age_seconds
+    headers = {
+        "ETag": entry.etag,
+        "Cache-Control": f"{'private' if private else 'public'}, max-age={max_age}, must-revalidate",
+    }
+    if private:
+        headers["Vary"] = "Authorization"
+
+    if _etag_matches(request.headers.get("if-none-match"), entry.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry.body, media_type="application/json", headers=headers)
@@ -0,0 +1,309 @@
+"""
+Métricas em memória no formato texto do Prometheus (exposto em /metrics).
+
+Implementação mínima, sem dependências: contadores e histogramas com
+buckets fixos, séries filhas criadas uma vez por combinação de labels e
+reaproveitadas (no caminho quente, só soma sob um lock).
+"""
+import bisect
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+# Buckets de latência (segundos): de 1 ms a 60 s
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# Buckets de tamanho de prompt (tokens estimados)
+TOKEN_BUCKETS = (256, 512, 1000, 2000, 4000, 8000, 12000, 16000, 32000)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels_text(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _CounterChild:
+    __slots__ = ("_value", "_lock")
+
+    def __init__(self):
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self._value += amount
+
+
+class _Timer:
+    __slots__ = ("_child", "_start")
+
+    def __init__(self, child: "_HistogramChild"):
+        self._child = child
+
+    def __enter__(self) -> "_Timer":
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._child.observe(time.perf_counter() - self._start)
+
+
+class _HistogramChild:
+    __slots__ = ("_buckets", "_counts", "_sum", "_count", "_lock")
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self._buckets = buckets
+        self._counts = [0] * (len(buckets) + 1)
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        i = bisect.bisect_left(self._buckets, value)
+        with self._lock:
+            self._counts[i] += 1
+            self._sum += value
+            self._count += 1
+
+    def time(self) -> _Timer:
+        """Uso: `with hist.labels("x").time(): ...` (observa a duração em segundos)."""
+        return _Timer(self)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+        REGISTRY.register(self)
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values: str):
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def _snapshot(self) -> List[Tuple[Tuple[str, ...], object]]:
+        with self._lock:
+            return sorted(self._children.items())
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._render_samples())
+        return lines
+
+    def _render_samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self) -> _CounterChild:
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.labels().inc(amount)
+
+    def _render_samples(self) -> List[str]:
+        lines = []
+        for values, child in self._snapshot():
+            labels = _labels_text(self.labelnames, values)
+            lines.append(f"{self.name}{labels} {_format_value(child._value)}")
+        return lines
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self) -> _HistogramChild:
+        return _HistogramChild(self.buckets)
+
+    def _render_samples(self) -> List[str]:
+        lines = []
+        for values, child in self._snapshot():
+            with child._lock:
+                counts = list(child._counts)
+                total, count = child._sum, child._count
+            acc = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                acc += n
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_labels_text(self.labelnames, values, le)} {acc}")
+            labels = _labels_text(self.labelnames, values)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class FuncMetric(_Metric):
+    """
+    Métrica lida na hora do scrape: a função registrada com `set_function`
+    devolve [(valores dos labels, valor)]. Serve para estado que já existe
+    em outro lugar (profundidade da fila, tamanho de cache).
+    """
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), kind: str = "gauge"):
+        self.kind = kind
+        self._function: Callable[[], Iterable[Tuple[Tuple[str, ...], float]]] = lambda: ()
+        super().__init__(name, documentation, labelnames)
+
+    def set_function(self, function: Callable[[], Iterable[Tuple[Tuple[str, ...], float]]]) -> None:
+        self._function = function
+
+    def _render_samples(self) -> List[str]:
+        return [
+            f"{self.name}{_labels_text(self.labelnames, values)} {_format_value(value)}"
+            for values, value in self._function()
+        ]
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> None:
+        with self._lock:
+            self._metrics.append(metric)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics)
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+# ---- Métricas da aplicação ----
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "Latência das requisições HTTP por rota.",
+    ("method", "route", "status"),
+)
+
+PIPELINE_STAGE_SECONDS = Histogram(
+    "email_pipeline_stage_seconds",
+    "Duração de cada etapa do processamento de e-mails.",
+    ("stage",),
+)
+
+LLM_REQUESTS = Counter("llm_requests_total", "Chamadas ao modelo de IA.", ("model",))
+LLM_ERRORS = Counter("llm_errors_total", "Falhas na chamada ao modelo de IA.", ("model",))
+LLM_INVALID_JSON = Counter(
+    "llm_invalid_json_total",
+    "Respostas do modelo que não são um JSON válido no formato esperado.",
+    ("model",),
+)
+LLM_REPAIRS = Counter(
+    "llm_repairs_total",
+    "Tentativas de correção de saídas inválidas do modelo, por resultado (fixed/failed).",
+    ("model", "outcome"),
+)
+LLM_CALLS_AVOIDED = Counter(
+    "llm_calls_avoided_total",
+    "E-mails processados sem chamada ao modelo, por motivo"
+    " (response_cache/near_duplicate/local_classifier).",
+    ("reason",),
+)
+NEAR_DUPLICATE_LOOKUPS = Counter(
+    "near_duplicate_lookups_total",
+    "Buscas de e-mail quase idêntico já bem avaliado (hit = categoria reaproveitada).",
+    ("outcome",),
+)
+# Estado global do processo: só em /metrics (não nas rotas de usuário)
+RESPONSE_CACHE_LOOKUPS = FuncMetric(
+    "response_cache_lookups_total",
+    "Consultas ao cache de respostas da IA, por resultado (hit/miss).",
+    ("outcome",),
+    kind="counter",
+)
+RESPONSE_CACHE_ENTRIES = FuncMetric("response_cache_entries", "Entradas em memória no cache de respostas da IA.")
+EMAIL_JOBS = FuncMetric("email_jobs", "Jobs na fila de processamento, por status.", ("status",))
+LLM_TOKENS = Counter("llm_tokens_total", "Tokens consumidos no modelo de IA.", ("model", "kind"))
+LLM_PROMPT_TOKENS = Histogram(
+    "llm_prompt_tokens",
+    "Tamanho do prompt enviado ao modelo (tokens estimados localmente).",
+    ("model",),
+    buckets=TOKEN_BUCKETS,
+)
+
+# Séries das etapas criadas uma vez (sem lookup por requisição)
+STAGE_EXTRACT = PIPELINE_STAGE_SECONDS.labels("extract")
+STAGE_CLEAN = PIPELINE_STAGE_SECONDS.labels("clean")
+STAGE_FETCH_PROMPT = PIPELINE_STAGE_SECONDS.labels("fetch_categories_and_examples")
+STAGE_PROMPT_COMPILE = PIPELINE_STAGE_SECONDS.labels("prompt_compile")
+STAGE_PROMPT_BUILD = PIPELINE_STAGE_SECONDS.labels("prompt_build")
+STAGE_LLM_CALL = PIPELINE_STAGE_SECONDS.labels("llm_call")
+STAGE_JSON_PARSE = PIPELINE_STAGE_SECONDS.labels("json_parse")
+STAGE_INSERT = PIPELINE_STAGE_SECONDS.labels("insert")
+
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI que mede a latência por rota (modelo da rota, não o path
+    real, para não explodir a cardinalidade). Em respostas em streaming, o
+    tempo vai até o último byte.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = "500"
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            HTTP_REQUEST_SECONDS.labels(scope["method"], path, status).observe(
+                time.perf_counter() - start
+            )
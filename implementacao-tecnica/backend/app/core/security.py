@@ -1,10 +1,13 @@
+import asyncio
 from datetime import datetime, timedelta
 from typing import Optional
 
+from fastapi import HTTPException, status
 from jose import jwt
 from passlib.context import CryptContext
 
 from app.core.config import get_settings
+from app.core.executors import get_process_pool
 
 pwd_context = CryptContext(schemes=["bcrypt_sha256"], deprecated="auto")
 
@@ -16,13 +19,63 @@ def verify_password(plain_password: str, password: str) -> bool:
     return pwd_context.verify(plain_password, password)
 
 
-def create_access_token(user_id: str, expires_minutes: Optional[int] = None) -> str:
+# bcrypt é CPU-bound: roda num pool de processos próprio, com limite de
+# concorrência separado do threadpool usado pelas demais rotas
+_auth_semaphore: Optional[asyncio.Semaphore] = None
+
+
+def _get_auth_semaphore() -> asyncio.Semaphore:
+    global _auth_semaphore
+    if _auth_semaphore is None:
+        _auth_semaphore = asyncio.Semaphore(get_settings().auth_max_concurrency)
+    return _auth_semaphore
+
+
+async def _run_hashing(fn, *args):
+    settings = get_settings()
+    semaphore = _get_auth_semaphore()
+    try:
+        await asyncio.wait_for(semaphore.acquire(), timeout=settings.auth_queue_timeout_seconds)
+    except asyncio.TimeoutError:
+        # Fila de login cheia: falha rápido em vez de acumular requisições
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Muitas tentativas de autenticação simultâneas. Tente novamente.",
+            headers={"Retry-After": "1"},
+        )
+    try:
+        pool = get_process_pool("auth", settings.auth_hash_workers)
+        return await asyncio.get_running_loop().run_in_executor(pool, fn, *args)
+    finally:
+        semaphore.release()
+
+
+async def hash_password_async(password: str) -> str:
+    return await _run_hashing(hash_password, password)
+
+
+async def verify_password_async(plain_password: str, password: str) -> bool:
+    return await _run_hashing(verify_password, plain_password, password)
+
+
+def create_access_token(
+    user_id: str,
+    expires_minutes: Optional[int] = None,
+    *,
+    name: Optional[str] = None,
+    email: Optional[str] = None,
+) -> str:
     settings = get_settings()
     if expires_minutes is None:
         expires_minutes = settings.jwt_access_token_expires_minutes
 
-    expire = datetime.utcnow() + timedelta(minutes=expires_minutes)
-    to_encode = {"sub": user_id, "exp": expire}
+    now = datetime.utcnow()
+    expire = now + timedelta(minutes=expires_minutes)
+    to_encode = {"sub": user_id, "exp": expire, "iat": now}
+    # name/email no token permitem montar o UserOut sem consultar o banco
+    if name is not None and email is not None:
+        to_encode["name"] = name
+        to_encode["email"] = email
 
     encoded_jwt = jwt.encode(
         to_encode,
@@ -1,3 +1,4 @@
+import time
 from typing import Optional
 
 from fastapi import Depends, HTTPException, status
@@ -7,6 +8,7 @@ from jose import jwt, JWTError
 from supabase import Client
 
 from app.core.config import get_settings
+from app.core.auth_cache import get_user_cache
 from app.db.supabase import get_supabase_client
 from app.schemas.user import UserOut, TokenData
 
@@ -16,6 +18,15 @@ def get_current_user(
     token: str = Depends(oauth2_scheme),
     supabase: Client = Depends(get_supabase_client),
 ) -> UserOut:
+    """
+    Valida o JWT e devolve o usuário. Na maioria das requisições não há ida
+    ao banco:
+      - usuário verificado há menos de AUTH_USER_CACHE_TTL_SECONDS: vem do cache
+      - token recente (até AUTH_CLAIMS_MAX_AGE_SECONDS) com name/email: vem das claims
+      - caso contrário, consulta `users` e guarda no cache
+    Tokens de usuários revogados (revoke_user) são recusados antes de tudo.
+    Cache e revogação são por processo (ver VerifiedUserCache).
+    """
     settings = get_settings()
 
     credentials_exception = HTTPException(
@@ -37,6 +48,26 @@ def get_current_user(
     except JWTError:
         raise credentials_exception
 
+    cache = get_user_cache()
+    issued_at = payload.get("iat")
+    if cache.is_revoked(token_data.user_id, issued_at):
+        raise credentials_exception
+
+    user = cache.get(token_data.user_id)
+    if user is not None:
+        return user
+
+    name, email = payload.get("name"), payload.get("email")
+    if (
+        name is not None
+        and email is not None
+        and issued_at is not None
+        and time.time() - issued_at <= settings.auth_claims_max_age_seconds
+    ):
+        user = UserOut(id=token_data.user_id, name=name, email=email)
+        cache.put(user)
+        return user
+
     resp = (
         supabase.table("users")
         .select("id,name,email")
@@ -48,4 +79,6 @@ def get_current_user(
     if not resp.data:
         raise credentials_exception
 
-    return UserOut(id=str(resp.data["id"]), name=resp.data["name"], email=resp.data["email"])
+    user = UserOut(id=str(resp.data["id"]), name=resp.data["name"], email=resp.data["email"])
+    cache.put(user)
+    return user
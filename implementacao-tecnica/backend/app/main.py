@@ -1,14 +1,39 @@
 # app/main.py
-from fastapi import FastAPI
+import hmac
+from contextlib import asynccontextmanager
+
+import anyio.to_thread
+from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import get_settings
+from app.core.executors import shutdown_process_pools
+from app.core.metrics import CONTENT_TYPE, REGISTRY, MetricsMiddleware
 from app.api import api_router
+from app.services.email_ai_service import init_async_client, close_async_client
+from app.services.job_queue import start_job_workers, stop_job_workers
 
 settings = get_settings()
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Limite do threadpool das rotas síncronas (o hash de senha tem pool próprio)
+    anyio.to_thread.current_default_thread_limiter().total_tokens = settings.threadpool_size
+    # Um único AsyncOpenAI por processo, com pool de conexões keep-alive
+    init_async_client(settings)
+    # Workers da fila de jobs (jobs presos em "running" voltam para a fila após o lease)
+    if settings.job_workers > 0:
+        start_job_workers()
+    yield
+    await stop_job_workers()
+    await close_async_client()
+    shutdown_process_pools()
+
+
 app = FastAPI(
     title="AutoU Email Classifier API",
     version="0.2",
+    lifespan=lifespan,
 )
 
 # CORS
@@ -20,12 +45,27 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Latência por rota (histograma exposto em /metrics)
+if settings.metrics_enabled:
+    app.add_middleware(MetricsMiddleware)
+
 
 @app.get("/health")
 def health():
     return {"status": "ok"}
 
 
+@app.get("/metrics", include_in_schema=False)
+def metrics(request: Request):
+    # Sem token configurado o endpoint não existe (nunca fica aberto por engano)
+    if not settings.metrics_enabled or not settings.metrics_token:
+        return Response(status_code=404)
+    expected = f"Bearer {settings.metrics_token}"
+    if not hmac.compare_digest(request.headers.get("authorization", "").encode(), expected.encode()):
+        return Response(status_code=401, headers={"WWW-Authenticate": "Bearer"})
+    return Response(content=REGISTRY.render(), media_type=CONTENT_TYPE)
+
+
 # Rotas principais
 app.include_router(api_router)
 
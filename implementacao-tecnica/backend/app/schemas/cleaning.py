@@ -0,0 +1,31 @@
+from pydantic import BaseModel, Field
+from datetime import datetime
+from typing import Optional
+
+from app.schemas.email import MAX_EMAIL_CONTENT_LENGTH
+
+
+class CleaningPatternCreate(BaseModel):
+    # Expressão regular (sintaxe do módulo `re`, sem diferenciar maiúsculas)
+    padrao: str = Field(..., min_length=1, max_length=1000)
+    descricao: Optional[str] = Field(None, max_length=255)
+
+
+class CleaningPatternOut(CleaningPatternCreate):
+    id: int
+    created_at: datetime
+
+
+class CleaningPatternList(BaseModel):
+    items: list[CleaningPatternOut]
+    total: int
+
+
+class CleaningPreviewIn(BaseModel):
+    conteudo: str = Field(..., min_length=1, max_length=MAX_EMAIL_CONTENT_LENGTH)
+
+
+class CleaningPreviewOut(BaseModel):
+    conteudo: str
+    bytes_saved: int
+    tokens_saved: int
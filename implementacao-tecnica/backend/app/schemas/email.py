@@ -2,6 +2,10 @@ from pydantic import BaseModel, Field
 from datetime import datetime
 from typing import Optional
 
+# Tamanho máximo do conteúdo digitado de um e-mail (caracteres); acima do
+# orçamento de tokens o texto seria cortado antes do modelo de qualquer forma
+MAX_EMAIL_CONTENT_LENGTH = 50_000
+
 
 class EmailBase(BaseModel):
     conteudo: str
@@ -16,7 +20,7 @@ class EmailCreate(EmailBase):
 
 
 class EmailUpdate(BaseModel):
-    conteudo: Optional[str] = None
+    conteudo: Optional[str] = Field(None, max_length=MAX_EMAIL_CONTENT_LENGTH)
     assunto: Optional[str] = None
     resposta: Optional[str] = None
     categoria_id: Optional[int] = None
@@ -26,10 +30,118 @@ class EmailUpdate(BaseModel):
 class EmailOut(EmailBase):
     id: int
     created_at: datetime
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+
+
+class EmailCreateOut(EmailOut):
+    # True quando a resposta veio do cache (sem chamada ao modelo)
+    cache_hit: bool = False
+    # True quando a categoria foi definida pelo classificador local
+    classified_locally: bool = False
+    # ID do e-mail quase idêntico (bem avaliado) cuja categoria foi reaproveitada
+    near_duplicate_of: Optional[int] = None
+    # Economia da limpeza (histórico citado, assinatura, avisos legais) antes do modelo
+    bytes_saved: int = 0
+    tokens_saved: int = 0
 
 
 class EmailList(BaseModel):
     items: list[EmailOut]
     page: int
     page_size: int
+    # Só preenchido quando há contagem (por padrão, apenas na primeira página)
+    total: Optional[int] = None
+    # Cursor opaco da próxima página (None na última)
+    next_cursor: Optional[str] = None
+
+
+class EmailCategoryRef(BaseModel):
+    id: int
+    nome: str
+    cor: Optional[str] = None
+
+
+class EmailScoreRef(BaseModel):
+    id: int
+    classificacao: str
+
+
+class EmailExpandedOut(EmailOut):
+    # Relações embutidas na mesma consulta (expand=categoria,score)
+    categoria: Optional[EmailCategoryRef] = None
+    score: Optional[EmailScoreRef] = None
+
+
+class EmailExpandedList(BaseModel):
+    items: list[EmailExpandedOut]
+    page: int
+    page_size: int
+    total: Optional[int] = None
+    next_cursor: Optional[str] = None
+
+
+class EmailSummaryOut(BaseModel):
+    """
+    Versão leve de EmailOut para listagens (view=summary / fields=): só vêm
+    as colunas pedidas, e as não pedidas ficam fora do JSON.
+    """
+    id: int
+    created_at: datetime
+    assunto: Optional[str] = None
+    categoria_id: Optional[int] = None
+    score_id: Optional[int] = None
+    # Início do conteúdo, truncado no banco
+    preview: Optional[str] = None
+    conteudo: Optional[str] = None
+    resposta: Optional[str] = None
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+    categoria: Optional[EmailCategoryRef] = None
+    score: Optional[EmailScoreRef] = None
+
+
+class EmailSummaryList(BaseModel):
+    items: list[EmailSummaryOut]
+    page: int
+    page_size: int
+    total: Optional[int] = None
+    next_cursor: Optional[str] = None
+
+
+class EmailBatchItem(BaseModel):
+    index: int
+    email: Optional[EmailCreateOut] = None
+    error: Optional[str] = None
+
+
+class EmailBatchOut(BaseModel):
+    items: list[EmailBatchItem]
+    total: int
+    succeeded: int
+    failed: int
+
+
+class CategoryCount(BaseModel):
+    categoria_id: Optional[int] = None
+    count: int
+
+
+class ScoreCount(BaseModel):
+    score_id: Optional[int] = None
+    count: int
+
+
+class PeriodCount(BaseModel):
+    period: datetime
+    count: int
+
+
+class EmailStats(BaseModel):
     total: int
+    by_category: list[CategoryCount]
+    by_score: list[ScoreCount]
+    by_period: list[PeriodCount]
+    bucket: str
+    created_from: Optional[datetime] = None
+    created_to: Optional[datetime] = None
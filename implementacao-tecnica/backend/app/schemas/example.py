@@ -27,4 +27,39 @@ class ExampleList(BaseModel):
     items: list[ExampleOut]
     page: int
     page_size: int
+    # Só preenchido quando há contagem (por padrão, apenas na primeira página)
+    total: Optional[int] = None
+    # Cursor opaco da próxima página (None na última)
+    next_cursor: Optional[str] = None
+
+
+class ExampleSummaryOut(BaseModel):
+    # Versão leve de ExampleOut para listagens (view=summary / fields=)
+    id: int
+    created_at: datetime
+    categoria_id: Optional[int] = None
+    preview: Optional[str] = None
+    conteudo: Optional[str] = None
+    resposta: Optional[str] = None
+
+
+class ExampleSummaryList(BaseModel):
+    items: list[ExampleSummaryOut]
+    page: int
+    page_size: int
+    total: Optional[int] = None
+    next_cursor: Optional[str] = None
+
+
+class ExampleImportError(BaseModel):
+    line: int
+    error: str
+
+
+class ExampleImportOut(BaseModel):
     total: int
+    inserted: int
+    failed: int  # sempre len(errors): um erro por linha não inserida
+    errors: list[ExampleImportError]
+    # Arquivo acima de EXAMPLES_IMPORT_MAX_ROWS: linhas além do limite não foram lidas
+    truncated: bool = False
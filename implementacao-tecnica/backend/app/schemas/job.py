@@ -0,0 +1,16 @@
+# app/schemas/job.py
+from pydantic import BaseModel
+from datetime import datetime
+from typing import Optional
+
+from app.schemas.email import EmailOut
+
+
+class JobOut(BaseModel):
+    id: str
+    status: str  # pending | running | done | failed
+    attempts: int
+    error: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+    email: Optional[EmailOut] = None
@@ -0,0 +1,85 @@
+# app/services/cleaning_patterns.py
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Optional, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+from supabase import Client
+
+from app.core.config import get_settings
+
+
+class CleaningPatternsCache:
+    """
+    Cache LRU em memória dos padrões de limpeza de cada usuário (lidos a cada
+    e-mail criado). Invalidado pelas rotas de /cleaning-patterns.
+    """
+
+    def __init__(self, max_users: int):
+        self.max_users = max_users
+        self._entries: "OrderedDict[str, Tuple[str, ...]]" = OrderedDict()
+        self._generations: dict = {}
+        self._lock = threading.Lock()
+
+    def generation(self, user_id: str) -> int:
+        with self._lock:
+            return self._generations.get(user_id, 0)
+
+    def get(self, user_id: str) -> Optional[Tuple[str, ...]]:
+        with self._lock:
+            patterns = self._entries.get(user_id)
+            if patterns is not None:
+                self._entries.move_to_end(user_id)
+            return patterns
+
+    def put(self, user_id: str, patterns: Tuple[str, ...], generation: int) -> None:
+        with self._lock:
+            # Descartado se houve escrita entre a busca e o put
+            if self._generations.get(user_id, 0) != generation:
+                return
+            self._entries[user_id] = patterns
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_users:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: str) -> None:
+        with self._lock:
+            self._generations[user_id] = self._generations.get(user_id, 0) + 1
+            self._entries.pop(user_id, None)
+
+
+@lru_cache
+def get_cleaning_patterns_cache() -> CleaningPatternsCache:
+    return CleaningPatternsCache(get_settings().cleaning_patterns_cache_max_users)
+
+
+def fetch_user_patterns(supabase: Client, user_id: str) -> Tuple[str, ...]:
+    cache = get_cleaning_patterns_cache()
+    patterns = cache.get(user_id)
+    if patterns is not None:
+        return patterns
+
+    generation = cache.generation(user_id)
+    resp = (
+        supabase.table("padroes_limpeza")
+        .select("padrao")
+        .eq("user_id", user_id)
+        .order("id")
+        .execute()
+    )
+    patterns = tuple(row["padrao"] for row in (resp.data or []) if row.get("padrao"))
+    cache.put(user_id, patterns, generation)
+    return patterns
+
+
+async def fetch_user_patterns_async(supabase: Client, user_id: str) -> Tuple[str, ...]:
+    patterns = get_cleaning_patterns_cache().get(user_id)
+    if patterns is not None:
+        return patterns
+    return await run_in_threadpool(fetch_user_patterns, supabase, user_id)
+
+
+def invalidate_user_patterns(user_id: str) -> None:
+    """Descarta os padrões em cache do usuário (chamar após criar/remover padrões)."""
+    get_cleaning_patterns_cache().invalidate(user_id)
@@ -2,12 +2,42 @@
 from __future__ import annotations
 
 import json
-from typing import Any, Dict, List, Optional, Tuple
+import re
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 
-from openai import OpenAI
+import httpx
+from fastapi.concurrency import run_in_threadpool
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
 from supabase import Client
 
 from app.core.config import get_settings
+from app.core.metrics import (
+    LLM_ERRORS,
+    LLM_INVALID_JSON,
+    LLM_PROMPT_TOKENS,
+    LLM_CALLS_AVOIDED,
+    LLM_REPAIRS,
+    LLM_REQUESTS,
+    LLM_TOKENS,
+    NEAR_DUPLICATE_LOOKUPS,
+    STAGE_FETCH_PROMPT,
+    STAGE_JSON_PARSE,
+    STAGE_LLM_CALL,
+    STAGE_PROMPT_BUILD,
+    STAGE_PROMPT_COMPILE,
+)
+from app.services.prompt_cache import CompiledPrompt, get_prompt_cache
+from app.services.response_cache import get_response_cache, response_cache_key
+from app.services.local_classifier import (
+    classifier_add_example,
+    classifier_remove_example,
+    get_classifier_registry,
+    get_user_classifier,
+)
+from app.services.near_duplicates import find_near_duplicate, fetch_reusable_email
+from app.utils.json_stream import JsonStringFieldStreamer
+from app.utils.tokens import estimate_messages_tokens, estimate_tokens, truncate_head_tail
 from typing import TYPE_CHECKING
 
 if TYPE_CHECKING:
@@ -16,10 +46,38 @@ else:
     Settings = Any  # só para type hints
 
 
-def _get_client(settings: Settings) -> OpenAI:
+# Cliente assíncrono único por processo (pool de conexões keep-alive)
+_async_client: Optional[AsyncOpenAI] = None
+
+
+def init_async_client(settings: Settings) -> Optional[AsyncOpenAI]:
+    global _async_client
+    if _async_client is None and settings.openai_api_key:
+        _async_client = AsyncOpenAI(
+            api_key=settings.openai_api_key,
+            timeout=settings.openai_timeout_seconds,
+            http_client=DefaultAsyncHttpxClient(
+                limits=httpx.Limits(
+                    max_connections=settings.openai_max_connections,
+                    max_keepalive_connections=settings.openai_max_keepalive_connections,
+                ),
+            ),
+        )
+    return _async_client
+
+
+async def close_async_client() -> None:
+    global _async_client
+    if _async_client is not None:
+        await _async_client.close()
+        _async_client = None
+
+
+def get_async_client(settings: Settings) -> AsyncOpenAI:
     if not settings.openai_api_key:
         raise RuntimeError("OPENAI_API_KEY não configurada no .env")
-    return OpenAI(api_key=settings.openai_api_key)
+    # Normalmente criado no startup (app/main.py); cria sob demanda se não foi
+    return init_async_client(settings)
 
 
 def fetch_categories_and_examples(
@@ -185,69 +243,784 @@ Você deve responder SEMPRE com um único JSON válido, no formato:
     return prompt
 
 
-def process_email_with_ai(
+def get_compiled_prompt(supabase: Client, user_id: str) -> CompiledPrompt:
+    """
+    Retorna categorias, exemplos e system prompt do usuário, usando o cache
+    em memória. Em caso de miss busca no Supabase e compila o prompt.
+    """
+    cache = get_prompt_cache()
+    entry = cache.get(user_id)
+    if entry is not None:
+        return entry
+
+    generation = cache.generation(user_id)
+    with STAGE_FETCH_PROMPT.time():
+        categories, examples_by_category = fetch_categories_and_examples(
+            supabase=supabase,
+            user_id=user_id,
+        )
+    with STAGE_PROMPT_COMPILE.time():
+        entry = CompiledPrompt(
+            categories=categories,
+            examples_by_category=examples_by_category,
+            system_prompt=build_system_prompt(categories, examples_by_category),
+        )
+    cache.put(user_id, entry, generation)
+    return entry
+
+
+def _recompile(
+    entry: CompiledPrompt,
+    examples_by_category: Dict[str, List[Dict[str, Any]]],
+) -> CompiledPrompt:
+    # Reaproveita o índice já atualizado incrementalmente
+    return CompiledPrompt(
+        categories=entry.categories,
+        examples_by_category=examples_by_category,
+        system_prompt=build_system_prompt(entry.categories, examples_by_category),
+        index=entry.index,
+    )
+
+
+def apply_example_created(user_id: str, example: Dict[str, Any]) -> None:
+    """Inclui um exemplo recém-criado no prompt compilado e no índice do usuário."""
+
+    def _apply(entry: CompiledPrompt) -> CompiledPrompt:
+        entry.index.add(example)
+        examples_by_category = {k: list(v) for k, v in entry.examples_by_category.items()}
+        examples_by_category.setdefault(str(example["categoria_id"]), []).append(example)
+        return _recompile(entry, examples_by_category)
+
+    get_prompt_cache().update(user_id, _apply)
+    classifier_add_example(user_id, example)
+
+
+def apply_example_deleted(user_id: str, example_id: str) -> None:
+    """Remove um exemplo do prompt compilado e do índice do usuário."""
+
+    def _apply(entry: CompiledPrompt) -> CompiledPrompt:
+        entry.index.remove(example_id)
+        examples_by_category = {
+            k: [ex for ex in v if str(ex["id"]) != str(example_id)]
+            for k, v in entry.examples_by_category.items()
+        }
+        return _recompile(entry, examples_by_category)
+
+    get_prompt_cache().update(user_id, _apply)
+    classifier_remove_example(user_id, example_id)
+
+
+def select_system_prompt(
+    compiled: CompiledPrompt,
+    conteudo_email: str,
+    settings: Settings,
+    *,
+    token_budget: Optional[int] = None,
+    forced_category: Optional[str] = None,
+) -> str:
+    """
+    Usa o prompt completo (cacheado) quando todos os exemplos cabem no
+    orçamento; caso contrário, recupera os exemplos mais parecidos com o
+    e-mail (com quota por categoria) e monta o prompt só com eles.
+    Com `forced_category` (classificador local ou e-mail quase idêntico) só entram exemplos
+    dessa categoria e o modelo é instruído a apenas redigir a resposta.
+    """
+    if token_budget is None:
+        token_budget = settings.prompt_examples_token_budget
+
+    if forced_category is not None:
+        selected = compiled.index.select(
+            conteudo_email,
+            top_k=settings.fewshot_top_k,
+            per_category=settings.fewshot_top_k,
+            token_budget=token_budget,
+            only_category=forced_category,
+        )
+        return build_system_prompt(compiled.categories, selected) + (
+            "\n=========================\n"
+            "CATEGORIA JÁ DEFINIDA\n"
+            "=========================\n"
+            f"Este e-mail já foi classificado na categoria de ID {forced_category}.\n"
+            f'Use exatamente "{forced_category}" no campo "categoria_id" e concentre-se na resposta.\n'
+        )
+
+    if (
+        compiled.examples_tokens <= token_budget
+        and compiled.examples_count <= settings.fewshot_top_k
+    ):
+        return compiled.system_prompt
+
+    selected = compiled.index.select(
+        conteudo_email,
+        top_k=settings.fewshot_top_k,
+        per_category=settings.fewshot_per_category,
+        token_budget=token_budget,
+    )
+    return build_system_prompt(compiled.categories, selected)
+
+
+def build_email_row(conteudo: str, ai_data: Dict[str, Any], user_id: str) -> Dict[str, Any]:
+    """Monta a linha da tabela `emails` (corpo original + saída da IA)."""
+    return {
+        "conteudo": conteudo,
+        "assunto": ai_data["assunto"],
+        "resposta": ai_data["resposta"],
+        "categoria_id": ai_data["categoria_id"],
+        "score_id": None,
+        "user_id": user_id,
+        "prompt_tokens": ai_data.get("prompt_tokens"),
+        "completion_tokens": ai_data.get("completion_tokens"),
+    }
+
+
+def build_user_message(conteudo_email: str) -> Dict[str, str]:
+    return {
+        "role": "user",
+        "content": (
+            "Conteúdo do e-mail recebido (texto integral, sem edição):\n\n"
+            f"{conteudo_email}"
+        ),
+    }
+
+
+def build_response_format(category_ids: List[str]) -> Dict[str, Any]:
+    """
+    JSON schema (structured outputs) da resposta do modelo, com `categoria_id`
+    restrito aos IDs reais das categorias do usuário.
+    """
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": "email_classificado",
+            "strict": True,
+            "schema": {
+                "type": "object",
+                "properties": {
+                    "assunto": {"type": "string"},
+                    "resposta": {"type": "string"},
+                    "categoria_id": {"type": "string", "enum": category_ids},
+                },
+                "required": ["assunto", "resposta", "categoria_id"],
+                "additionalProperties": False,
+            },
+        },
+    }
+
+
+def _allowed_category_ids(compiled: CompiledPrompt, forced_category: Optional[str] = None) -> List[str]:
+    if forced_category is not None:
+        return [forced_category]
+    return [str(c["id"]) for c in compiled.categories]
+
+
+def _completion_kwargs(settings: Settings, allowed_ids: List[str]) -> Dict[str, Any]:
+    if not settings.llm_structured_outputs:
+        return {}
+    return {"response_format": build_response_format(allowed_ids)}
+
+
+_CODE_FENCE_RE = re.compile(r"^\s*```[a-zA-Z]*\s*|\s*```\s*$")
+
+
+def _first_json_object(text: str) -> Optional[str]:
+    # Primeiro objeto {...} balanceado (ignorando chaves dentro de strings)
+    start = text.find("{")
+    while start != -1:
+        depth, in_string, escaped = 0, False, False
+        for i in range(start, len(text)):
+            ch = text[i]
+            if in_string:
+                if escaped:
+                    escaped = False
+                elif ch == "\\":
+                    escaped = True
+                elif ch == '"':
+                    in_string = False
+            elif ch == '"':
+                in_string = True
+            elif ch == "{":
+                depth += 1
+            elif ch == "}":
+                depth -= 1
+                if depth == 0:
+                    return text[start:i + 1]
+        start = text.find("{", start + 1)
+    return None
+
+
+def _loads_tolerant(text: str) -> Any:
+    """json.loads que aceita cercas de markdown e texto em volta do objeto."""
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        pass
+    candidate = _first_json_object(_CODE_FENCE_RE.sub("", text))
+    if candidate is not None:
+        try:
+            return json.loads(candidate)
+        except json.JSONDecodeError:
+            pass
+    raise RuntimeError(f"IA não retornou JSON válido.\nConteúdo retornado: {text[:500]}")
+
+
+def parse_ai_response(
+    completion: Any,
+    allowed_ids: Optional[List[str]] = None,
+) -> Dict[str, Any]:
+    """Extrai e valida o JSON devolvido pelo modelo."""
+    try:
+        text = completion.choices[0].message.content
+        if not text:
+            raise RuntimeError("IA retornou resposta vazia.")
+    except Exception as e:
+        raise RuntimeError(f"Erro ao extrair texto da resposta da IA: {e}")
+
+    return parse_ai_text(text, allowed_ids)
+
+
+def parse_ai_text(text: str, allowed_ids: Optional[List[str]] = None) -> Dict[str, Any]:
+    data = _loads_tolerant(text)
+    if not isinstance(data, dict):
+        raise RuntimeError("IA não retornou um objeto JSON.")
+
+    # IDs numéricos são aceitos e normalizados para string
+    if isinstance(data.get("categoria_id"), int) and not isinstance(data["categoria_id"], bool):
+        data["categoria_id"] = str(data["categoria_id"])
+
+    for field in ["assunto", "resposta", "categoria_id"]:
+        if field not in data or not isinstance(data[field], str):
+            raise RuntimeError(f"Campo obrigatório ausente ou inválido: {field}")
+
+    if allowed_ids is not None and data["categoria_id"] not in allowed_ids:
+        raise RuntimeError(f"IA retornou categoria inexistente: {data['categoria_id']}")
+
+    return data
+
+
+def _repair_messages(
+    text: str,
+    compiled: CompiledPrompt,
+    allowed_ids: List[str],
+) -> List[Dict[str, str]]:
+    """
+    Pedido de correção barato: só a saída inválida e a lista de categorias,
+    sem os exemplos nem o e-mail original.
+    """
+    names = {str(c["id"]): c.get("nome") or "" for c in compiled.categories}
+    categorias = "\n".join(f"- ID: {cid} | Nome: {names.get(cid, '')}" for cid in allowed_ids)
+    return [
+        {
+            "role": "system",
+            "content": (
+                "Você corrige a saída de outro assistente. Devolva SOMENTE um JSON válido "
+                'no formato {"assunto": "...", "resposta": "...", "categoria_id": "..."}, '
+                "preservando o texto do assunto e da resposta. "
+                "categoria_id deve ser exatamente um destes IDs:\n" + categorias
+            ),
+        },
+        {"role": "user", "content": text[:20000]},
+    ]
+
+
+def _prepare_messages(
+    compiled: CompiledPrompt,
+    conteudo_email: str,
+    settings: Settings,
+    example_token_budget: Optional[int],
+    forced_category: Optional[str] = None,
+) -> List[Dict[str, str]]:
+    """
+    Monta as mensagens respeitando os limites de tokens:
+      - o e-mail é cortado (início + fim) acima de settings.max_email_tokens
+      - se prompt + e-mail passarem de settings.max_prompt_tokens, o
+        orçamento de exemplos é reduzido pelo excesso
+    """
+    if not compiled.categories:
+        raise RuntimeError("Não há categorias cadastradas no banco para este usuário.")
+
+    email_for_model = truncate_head_tail(conteudo_email, settings.max_email_tokens)
+    budget = example_token_budget or settings.prompt_examples_token_budget
+
+    system_prompt = select_system_prompt(
+        compiled,
+        conteudo_email,
+        settings,
+        token_budget=budget,
+        forced_category=forced_category,
+    )
+
+    overflow = (
+        estimate_tokens(system_prompt)
+        + estimate_tokens(email_for_model)
+        - settings.max_prompt_tokens
+    )
+    if overflow > 0:
+        system_prompt = select_system_prompt(
+            compiled,
+            conteudo_email,
+            settings,
+            token_budget=max(budget - overflow, 0),
+            forced_category=forced_category,
+        )
+
+    return [
+        {"role": "system", "content": system_prompt},
+        build_user_message(email_for_model),
+    ]
+
+
+def _token_usage(usage: Any, messages: List[Dict[str, str]], output_text: str) -> Dict[str, int]:
+    # Usa a contagem do provedor quando disponível; senão, a estimativa local
+    if usage is not None and getattr(usage, "prompt_tokens", None) is not None:
+        return {
+            "prompt_tokens": usage.prompt_tokens,
+            "completion_tokens": usage.completion_tokens,
+        }
+    return {
+        "prompt_tokens": estimate_messages_tokens(messages),
+        "completion_tokens": estimate_tokens(output_text or ""),
+    }
+
+
+def _observe_prompt(model: str, messages: List[Dict[str, str]]) -> None:
+    LLM_REQUESTS.labels(model).inc()
+    LLM_PROMPT_TOKENS.labels(model).observe(estimate_messages_tokens(messages))
+
+
+def _observe_tokens(model: str, data: Dict[str, Any]) -> None:
+    LLM_TOKENS.labels(model, "prompt").inc(data["prompt_tokens"])
+    LLM_TOKENS.labels(model, "completion").inc(data["completion_tokens"])
+
+
+def _parse_output(parse, payload: Any, model: str, allowed_ids: List[str]) -> Dict[str, Any]:
+    # parse_ai_response / parse_ai_text, contando saídas fora do formato
+    with STAGE_JSON_PARSE.time():
+        try:
+            return parse(payload, allowed_ids)
+        except RuntimeError:
+            LLM_INVALID_JSON.labels(model).inc()
+            raise
+
+
+def _completion_text(completion: Any) -> str:
+    try:
+        return completion.choices[0].message.content or ""
+    except (AttributeError, IndexError):
+        return ""
+
+
+def _should_repair(settings: Settings, text: str) -> bool:
+    # Sem texto não há o que corrigir
+    return settings.llm_repair_enabled and bool(text.strip())
+
+
+def _add_usage(data: Dict[str, Any], usage: Dict[str, int]) -> None:
+    data["prompt_tokens"] += usage["prompt_tokens"]
+    data["completion_tokens"] += usage["completion_tokens"]
+
+
+async def repair_ai_output_async(
+    client: AsyncOpenAI,
+    text: str,
+    compiled: CompiledPrompt,
+    allowed_ids: List[str],
+    settings: Settings,
+    model: str,
+) -> Tuple[Dict[str, Any], Dict[str, int]]:
+    """Uma única tentativa de corrigir uma saída inválida. Retorna (dados, uso de tokens)."""
+    messages = _repair_messages(text, compiled, allowed_ids)
+    _observe_prompt(model, messages)
+    try:
+        with STAGE_LLM_CALL.time():
+            completion = await client.chat.completions.create(
+                model=model,
+                temperature=0,
+                messages=messages,
+                max_tokens=settings.llm_repair_max_tokens,
+                **_completion_kwargs(settings, allowed_ids),
+            )
+    except Exception as e:
+        LLM_ERRORS.labels(model).inc()
+        LLM_REPAIRS.labels(model, "failed").inc()
+        raise RuntimeError(f"Erro ao chamar modelo de IA (correção): {e}") from e
+    return _finish_repair(completion, messages, allowed_ids, model)
+
+
+def _finish_repair(
+    completion: Any,
+    messages: List[Dict[str, str]],
+    allowed_ids: List[str],
+    model: str,
+) -> Tuple[Dict[str, Any], Dict[str, int]]:
+    try:
+        data = _parse_output(parse_ai_response, completion, model, allowed_ids)
+    except RuntimeError:
+        LLM_REPAIRS.labels(model, "failed").inc()
+        raise
+    LLM_REPAIRS.labels(model, "fixed").inc()
+    return data, _token_usage(completion.usage, messages, _completion_text(completion))
+
+
+def _from_cache(cached: Dict[str, Any]) -> Dict[str, Any]:
+    # Hit no cache não consome tokens do modelo
+    LLM_CALLS_AVOIDED.labels("response_cache").inc()
+    cached["cache_hit"] = True
+    cached.setdefault("classified_locally", False)
+    cached["prompt_tokens"] = 0
+    cached["completion_tokens"] = 0
+    return cached
+
+
+async def get_compiled_prompt_async(supabase: Client, user_id: str) -> CompiledPrompt:
+    # Hit no cache não bloqueia; o miss (Supabase síncrono) vai para o threadpool
+    entry = get_prompt_cache().get(user_id)
+    if entry is not None:
+        return entry
+    return await run_in_threadpool(get_compiled_prompt, supabase, user_id)
+
+
+def _cache_key(
+    compiled: CompiledPrompt,
+    conteudo_email: str,
+    settings: Settings,
+    *,
+    user_id: str,
+    model: str,
+    example_token_budget: Optional[int],
+) -> Optional[str]:
+    if not settings.response_cache_enabled:
+        return None
+    budget = example_token_budget or settings.prompt_examples_token_budget
+    return response_cache_key(user_id, f"{compiled.version}:{budget}", model, conteudo_email)
+
+
+async def predict_category_locally(
+    compiled: CompiledPrompt,
+    conteudo_email: str,
+    supabase: Client,
+    *,
+    user_id: str,
+    settings: Settings,
+) -> Optional[str]:
+    """
+    Classificação local (naive Bayes) antes do LLM. Retorna o ID da categoria
+    só quando o classificador está treinado e a confiança passa do limiar.
+    """
+    if settings.local_classifier_mode == "off" or not compiled.categories:
+        return None
+
+    clf = get_classifier_registry().get(user_id)
+    if clf is None:
+        examples = [ex for exs in compiled.examples_by_category.values() for ex in exs]
+        clf = await run_in_threadpool(get_user_classifier, supabase, user_id, examples)
+
+    if len(clf) < settings.local_classifier_min_docs or clf.n_classes < 2:
+        return None
+
+    prediction = clf.predict(conteudo_email)
+    if prediction is None:
+        return None
+    categoria_id, confidence = prediction
+    if confidence < settings.local_classifier_threshold:
+        return None
+    if categoria_id not in {str(c["id"]) for c in compiled.categories}:
+        return None
+    return categoria_id
+
+
+async def near_duplicate_category(
+    compiled: CompiledPrompt,
+    conteudo_email: str,
+    supabase: Client,
+    *,
+    user_id: str,
+    settings: Settings,
+) -> Optional[Tuple[str, Any]]:
+    """
+    Procura um e-mail recente quase idêntico (MinHash/LSH) e bem avaliado.
+    Retorna (categoria_id, id do e-mail); só a categoria é reaproveitada —
+    a resposta é sempre redigida pelo modelo para o e-mail atual.
+    """
+    if not settings.near_duplicate_enabled or not compiled.categories:
+        return None
+
+    match = await run_in_threadpool(
+        find_near_duplicate, supabase, user_id, conteudo_email, settings.near_duplicate_threshold
+    )
+    row = None
+    if match is not None:
+        row = await run_in_threadpool(fetch_reusable_email, supabase, user_id, match[0])
+    # A categoria precisa continuar existindo
+    if row is None or str(row.get("categoria_id")) not in {str(c["id"]) for c in compiled.categories}:
+        NEAR_DUPLICATE_LOOKUPS.labels("miss").inc()
+        return None
+
+    NEAR_DUPLICATE_LOOKUPS.labels("hit").inc()
+    return str(row["categoria_id"]), row["id"]
+
+
+async def _forced_category(
+    compiled: CompiledPrompt,
+    conteudo_email: str,
+    supabase: Client,
+    *,
+    user_id: str,
+    settings: Settings,
+) -> Tuple[Optional[str], Optional[Any]]:
+    """
+    Categoria definida antes do LLM: a de um quase idêntico bem avaliado ou,
+    na falta dele, a do classificador local. Retorna (categoria_id, near_duplicate_of).
+    """
+    near = await near_duplicate_category(
+        compiled, conteudo_email, supabase, user_id=user_id, settings=settings
+    )
+    if near is not None:
+        return near
+    forced_category = await predict_category_locally(
+        compiled, conteudo_email, supabase, user_id=user_id, settings=settings
+    )
+    return forced_category, None
+
+
+def _apply_forced_category(
+    data: Dict[str, Any],
+    forced_category: Optional[str],
+    near_duplicate_of: Optional[Any],
+) -> None:
+    data["classified_locally"] = forced_category is not None and near_duplicate_of is None
+    data["near_duplicate_of"] = near_duplicate_of
+    if forced_category is not None:
+        data["categoria_id"] = forced_category
+
+
+def _skip_model(settings: Settings, forced_category: Optional[str], near_duplicate_of: Optional[Any]) -> bool:
+    # Modo "classify_only" da origem da categoria (quase idêntico ou classificador local)
+    if forced_category is None:
+        return False
+    if near_duplicate_of is not None:
+        return settings.near_duplicate_mode == "classify_only"
+    return settings.local_classifier_mode == "classify_only"
+
+
+def _classify_only_result(categoria_id: str, near_duplicate_of: Optional[Any] = None) -> Dict[str, Any]:
+    # Modo "classify_only": nenhuma chamada ao modelo, sem resposta sugerida
+    LLM_CALLS_AVOIDED.labels("near_duplicate" if near_duplicate_of is not None else "local_classifier").inc()
+    return {
+        "assunto": None,
+        "resposta": None,
+        "categoria_id": categoria_id,
+        "cache_hit": False,
+        "classified_locally": near_duplicate_of is None,
+        "near_duplicate_of": near_duplicate_of,
+        "prompt_tokens": 0,
+        "completion_tokens": 0,
+    }
+
+
+async def process_email_with_ai_async(
     conteudo_email: str,
     supabase: Client,
     *,
     user_id: str,
     settings: Optional[Settings] = None,
     model: str = "gpt-4.1-mini",
+    example_token_budget: Optional[int] = None,
+    compiled: Optional[CompiledPrompt] = None,
 ) -> Dict[str, Any]:
     """
-    Processa o e-mail com IA usando SOMENTE categorias e exemplos do usuário.
+    Processa o e-mail com IA usando SOMENTE categorias e exemplos do usuário,
+    pelo AsyncOpenAI compartilhado pelo processo (não ocupa o threadpool
+    durante a chamada). Os exemplos enviados ao modelo respeitam
+    `example_token_budget` (padrão: settings.prompt_examples_token_budget) e
+    `compiled` permite reaproveitar o prompt já buscado (ex.: em lote).
+
+    E-mails idênticos (mesmo conteúdo limpo e mesma versão de prompt) são
+    servidos do cache de respostas; o retorno traz `cache_hit`. Quase
+    idênticos a um e-mail recente bem avaliado herdam a categoria dele
+    (`near_duplicate_of`); senão, se o classificador local tiver confiança
+    suficiente, a categoria vem dele (`classified_locally`). Nos dois casos
+    o modelo só redige a resposta — ou nem é chamado, no modo
+    "classify_only" (NEAR_DUPLICATE_MODE / LOCAL_CLASSIFIER_MODE).
     """
 
     if settings is None:
         settings = get_settings()
 
-    client = _get_client(settings)
+    if compiled is None:
+        compiled = await get_compiled_prompt_async(supabase, user_id)
 
-    categories, examples_by_category = fetch_categories_and_examples(
-        supabase=supabase,
+    cache = get_response_cache()
+    key = _cache_key(
+        compiled,
+        conteudo_email,
+        settings,
         user_id=user_id,
+        model=model,
+        example_token_budget=example_token_budget,
     )
+    if key is not None:
+        cached = await cache.aget(key)
+        if cached is not None:
+            return _from_cache(cached)
 
-    if not categories:
-        raise RuntimeError("Não há categorias cadastradas no banco para este usuário.")
+    forced_category, near_duplicate_of = await _forced_category(
+        compiled, conteudo_email, supabase, user_id=user_id, settings=settings
+    )
+    if _skip_model(settings, forced_category, near_duplicate_of):
+        return _classify_only_result(forced_category, near_duplicate_of)
+
+    client = get_async_client(settings)
+    with STAGE_PROMPT_BUILD.time():
+        messages = _prepare_messages(
+            compiled, conteudo_email, settings, example_token_budget, forced_category
+        )
 
-    system_prompt = build_system_prompt(categories, examples_by_category)
+    allowed_ids = _allowed_category_ids(compiled, forced_category)
+    _observe_prompt(model, messages)
+    try:
+        with STAGE_LLM_CALL.time():
+            completion = await client.chat.completions.create(
+                model=model,
+                temperature=0.1,
+                messages=messages,
+                **_completion_kwargs(settings, allowed_ids),
+            )
+    except Exception as e:
+        LLM_ERRORS.labels(model).inc()
+        raise RuntimeError(f"Erro ao chamar modelo de IA: {e}") from e
 
+    usage = _token_usage(completion.usage, messages, _completion_text(completion))
     try:
-        completion = client.chat.completions.create(
+        data = _parse_output(parse_ai_response, completion, model, allowed_ids)
+        data.update(usage)
+    except RuntimeError:
+        # Uma correção barata em vez de falhar (e o cliente repetir a chamada inteira)
+        if not _should_repair(settings, _completion_text(completion)):
+            raise
+        data, repair_usage = await repair_ai_output_async(
+            client, _completion_text(completion), compiled, allowed_ids, settings, model
+        )
+        data.update(usage)
+        _add_usage(data, repair_usage)
+    _observe_tokens(model, data)
+    _apply_forced_category(data, forced_category, near_duplicate_of)
+    if key is not None:
+        await cache.aput(key, data)
+    data["cache_hit"] = False
+    return data
+
+
+async def stream_email_with_ai(
+    conteudo_email: str,
+    supabase: Client,
+    *,
+    user_id: str,
+    settings: Optional[Settings] = None,
+    model: str = "gpt-4.1-mini",
+    example_token_budget: Optional[int] = None,
+) -> AsyncIterator[Tuple[str, Any]]:
+    """
+    Versão em streaming de process_email_with_ai_async. Produz:
+      - ("delta", texto): trechos do campo "resposta" à medida que o modelo gera
+      - ("result", dados): o JSON final já validado (último item)
+    Em hit no cache de respostas, a resposta inteira sai em um único delta.
+    """
+
+    if settings is None:
+        settings = get_settings()
+
+    compiled = await get_compiled_prompt_async(supabase, user_id)
+
+    cache = get_response_cache()
+    key = _cache_key(
+        compiled,
+        conteudo_email,
+        settings,
+        user_id=user_id,
+        model=model,
+        example_token_budget=example_token_budget,
+    )
+    if key is not None:
+        cached = await cache.aget(key)
+        if cached is not None:
+            cached = _from_cache(cached)
+            yield "delta", cached["resposta"]
+            yield "result", cached
+            return
+
+    forced_category, near_duplicate_of = await _forced_category(
+        compiled, conteudo_email, supabase, user_id=user_id, settings=settings
+    )
+    if _skip_model(settings, forced_category, near_duplicate_of):
+        yield "result", _classify_only_result(forced_category, near_duplicate_of)
+        return
+
+    client = get_async_client(settings)
+    with STAGE_PROMPT_BUILD.time():
+        messages = _prepare_messages(
+            compiled, conteudo_email, settings, example_token_budget, forced_category
+        )
+
+    allowed_ids = _allowed_category_ids(compiled, forced_category)
+    _observe_prompt(model, messages)
+    # Tempo da chamada medido até o último chunk do stream
+    llm_start = time.perf_counter()
+    try:
+        stream = await client.chat.completions.create(
             model=model,
             temperature=0.1,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {
-                    "role": "user",
-                    "content": (
-                        "Conteúdo do e-mail recebido (texto integral, sem edição):\n\n"
-                        f"{conteudo_email}"
-                    ),
-                },
-            ],
+            messages=messages,
+            stream=True,
+            stream_options={"include_usage": True},
+            **_completion_kwargs(settings, allowed_ids),
         )
     except Exception as e:
-        raise RuntimeError(f"Erro ao chamar modelo de IA: {e}")
+        LLM_ERRORS.labels(model).inc()
+        raise RuntimeError(f"Erro ao chamar modelo de IA: {e}") from e
 
+    streamer = JsonStringFieldStreamer("resposta")
+    parts: List[str] = []
+    usage = None
     try:
-        text = completion.choices[0].message.content
-        if not text:
-            raise RuntimeError("IA retornou resposta vazia.")
+        async for chunk in stream:
+            # Com include_usage, o último chunk traz só a contagem de tokens
+            if chunk.usage is not None:
+                usage = chunk.usage
+            if not chunk.choices:
+                continue
+            piece = chunk.choices[0].delta.content
+            if not piece:
+                continue
+            parts.append(piece)
+            delta = streamer.feed(piece)
+            if delta:
+                yield "delta", delta
     except Exception as e:
-        raise RuntimeError(f"Erro ao extrair texto da resposta da IA: {e}")
+        LLM_ERRORS.labels(model).inc()
+        raise RuntimeError(f"Erro ao ler stream do modelo de IA: {e}") from e
+    STAGE_LLM_CALL.observe(time.perf_counter() - llm_start)
 
+    text = "".join(parts)
+    if not text:
+        LLM_INVALID_JSON.labels(model).inc()
+        raise RuntimeError("IA retornou resposta vazia.")
+
+    token_usage = _token_usage(usage, messages, text)
     try:
-        data = json.loads(text)
-    except json.JSONDecodeError as e:
-        raise RuntimeError(
-            f"IA não retornou JSON válido: {e}\nConteúdo retornado: {text}"
+        data = _parse_output(parse_ai_text, text, model, allowed_ids)
+        data.update(token_usage)
+    except RuntimeError:
+        # Os deltas já enviados ficam; o resultado final vem da correção
+        if not _should_repair(settings, text):
+            raise
+        data, repair_usage = await repair_ai_output_async(
+            client, text, compiled, allowed_ids, settings, model
         )
-
-    for field in ["assunto", "resposta", "categoria_id"]:
-        if field not in data or not isinstance(data[field], str):
-            raise RuntimeError(f"Campo obrigatório ausente ou inválido: {field}")
-
-    return data
-
-
+        data.update(token_usage)
+        _add_usage(data, repair_usage)
+    _observe_tokens(model, data)
+    _apply_forced_category(data, forced_category, near_duplicate_of)
+    if key is not None:
+        await cache.aput(key, data)
+    data["cache_hit"] = False
+    yield "result", data
@@ -0,0 +1,82 @@
+"""
+Estatísticas agregadas dos e-mails do usuário (dashboard).
+
+A agregação roda no banco (função `email_stats` em scripts.sql) e a resposta
+fica num cache curto por usuário. Cada usuário tem uma versão que entra na
+chave do cache: escritas em `emails` avançam a versão, descartando de uma vez
+todas as combinações de filtros já cacheadas.
+
+As versões vêm de um contador global e só os STATS_CACHE_MAX_ENTRIES usuários
+com escrita mais recente guardam a sua; os demais usam uma versão base que
+avança a cada remoção, então uma versão nunca volta a um valor já usado.
+"""
+import itertools
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Dict, Optional
+
+from supabase import Client
+
+from app.core.config import get_settings
+from app.core.http_cache import ListResponseCache
+
+STATS_BUCKETS = ("day", "week")
+
+_versions: "OrderedDict[str, int]" = OrderedDict()
+_version_counter = itertools.count(1)
+_version_floor = 0
+_versions_lock = threading.Lock()
+
+
+@lru_cache
+def get_stats_cache() -> ListResponseCache:
+    settings = get_settings()
+    return ListResponseCache(
+        ttl_seconds=settings.stats_cache_ttl_seconds,
+        max_entries=settings.stats_cache_max_entries,
+    )
+
+
+def stats_cache_key(
+    user_id: str,
+    created_from: Optional[datetime],
+    created_to: Optional[datetime],
+    bucket: str,
+) -> str:
+    with _versions_lock:
+        version = _versions.get(user_id, _version_floor)
+    return f"email-stats:{user_id}:{version}:{created_from}:{created_to}:{bucket}"
+
+
+def invalidate_user_stats(user_id: str) -> None:
+    """Chamar após criar, editar ou apagar e-mails do usuário."""
+    global _version_floor
+    max_users = get_settings().stats_cache_max_entries
+    with _versions_lock:
+        _versions[user_id] = next(_version_counter)
+        _versions.move_to_end(user_id)
+        while len(_versions) > max_users:
+            _versions.popitem(last=False)
+            # Maior que qualquer versão removida: chaves antigas não voltam a valer
+            _version_floor = next(_version_counter)
+
+
+def fetch_email_stats(
+    supabase: Client,
+    user_id: str,
+    created_from: Optional[datetime],
+    created_to: Optional[datetime],
+    bucket: str,
+) -> Dict[str, Any]:
+    resp = supabase.rpc(
+        "email_stats",
+        {
+            "p_user_id": user_id,
+            "p_from": created_from.isoformat() if created_from else None,
+            "p_to": created_to.isoformat() if created_to else None,
+            "p_bucket": bucket,
+        },
+    ).execute()
+    return resp.data or {}
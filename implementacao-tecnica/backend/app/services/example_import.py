@@ -0,0 +1,189 @@
+"""
+Importação em massa de exemplos (CSV ou JSONL).
+
+O arquivo é lido linha a linha (sem carregar tudo em memória) e as linhas
+válidas são inseridas em blocos. Erros ficam por linha, sem abortar o resto.
+Colunas/campos aceitos: conteudo, resposta e categoria (nome) ou categoria_id.
+"""
+import csv
+import io
+import json
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+from pydantic import ValidationError
+from supabase import Client
+from postgrest.exceptions import APIError as PostgrestAPIError
+
+from app.schemas.example import ExampleCreate
+from app.utils.text_processing import basic_clean
+
+IMPORT_FORMATS = ("csv", "jsonl")
+
+
+class ImportFormatError(ValueError):
+    pass
+
+
+def detect_format(filename: Optional[str], declared: Optional[str] = None) -> str:
+    if declared:
+        return declared
+    name = (filename or "").lower()
+    if name.endswith(".csv"):
+        return "csv"
+    if name.endswith((".jsonl", ".ndjson")):
+        return "jsonl"
+    raise ImportFormatError("Formato não reconhecido: envie .csv ou .jsonl (ou informe format=).")
+
+
+def iter_rows(fileobj: BinaryIO, fmt: str) -> Iterator[Tuple[int, Any]]:
+    """
+    Percorre o arquivo sob demanda, devolvendo (linha, registro). Registros
+    ilegíveis vêm como ImportFormatError, para virarem erro da linha.
+    """
+    text = io.TextIOWrapper(fileobj, encoding="utf-8-sig", errors="replace", newline="")
+    try:
+        if fmt == "csv":
+            reader = csv.DictReader(text)
+            if not reader.fieldnames or "conteudo" not in reader.fieldnames:
+                raise ImportFormatError("CSV sem cabeçalho com a coluna 'conteudo'.")
+            for record in reader:
+                yield reader.line_num, record
+        else:
+            for line_no, line in enumerate(text, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    yield line_no, json.loads(line)
+                except json.JSONDecodeError as e:
+                    yield line_no, ImportFormatError(f"JSON inválido: {e.msg}")
+    finally:
+        # Não fecha o upload junto com o wrapper
+        text.detach()
+
+
+def fetch_category_ids(supabase: Client, user_id: str) -> Tuple[Dict[str, int], set]:
+    """Retorna ({nome normalizado: id}, {ids}) das categorias do usuário."""
+    resp = (
+        supabase.table("categorias")
+        .select("id,nome")
+        .eq("user_id", user_id)
+        .execute()
+    )
+    by_name: Dict[str, int] = {}
+    ids = set()
+    for cat in resp.data or []:
+        by_name[(cat.get("nome") or "").strip().casefold()] = cat["id"]
+        ids.add(str(cat["id"]))
+    return by_name, ids
+
+
+def build_example_row(
+    record: Any,
+    user_id: str,
+    categories_by_name: Dict[str, int],
+    category_ids: set,
+) -> Dict[str, Any]:
+    """Valida e normaliza um registro; levanta ValueError com a causa."""
+    if not isinstance(record, dict):
+        raise ValueError("Registro deve ser um objeto.")
+
+    categoria_id = record.get("categoria_id")
+    nome = record.get("categoria")
+    if categoria_id not in (None, ""):
+        if str(categoria_id).strip() not in category_ids:
+            raise ValueError(f"categoria_id inexistente: {categoria_id}")
+    elif nome not in (None, ""):
+        categoria_id = categories_by_name.get(str(nome).strip().casefold())
+        if categoria_id is None:
+            raise ValueError(f"Categoria não encontrada: {nome}")
+    else:
+        categoria_id = None
+
+    resposta = record.get("resposta")
+    try:
+        example = ExampleCreate(
+            conteudo=basic_clean(str(record.get("conteudo") or "")),
+            resposta=str(resposta) if resposta not in (None, "") else None,
+            categoria_id=categoria_id,
+        )
+    except ValidationError as e:
+        first = e.errors()[0]
+        field = ".".join(str(p) for p in first["loc"])
+        raise ValueError(f"{field}: {first['msg']}")
+
+    data = example.model_dump()
+    data["user_id"] = user_id
+    return data
+
+
+def _row_key(row: Dict[str, Any]) -> tuple:
+    return tuple(
+        None if row.get(k) is None else str(row[k])
+        for k in ("conteudo", "resposta", "categoria_id")
+    )
+
+
+def import_examples(
+    fileobj: BinaryIO,
+    fmt: str,
+    supabase: Client,
+    user_id: str,
+    *,
+    chunk_size: int,
+    max_rows: int,
+) -> Dict[str, Any]:
+    """
+    Importa os registros em blocos de `chunk_size`. Retorna o total lido, as
+    linhas inseridas, um erro por linha não inserida ({"line", "error"}) e
+    `truncated` quando o arquivo passou de `max_rows` (o restante é ignorado).
+    """
+    categories_by_name, category_ids = fetch_category_ids(supabase, user_id)
+
+    errors: List[Dict[str, Any]] = []
+    inserted: List[Dict[str, Any]] = []
+    pending: List[Tuple[int, Dict[str, Any]]] = []
+    total = 0
+    truncated = False
+
+    def _flush() -> None:
+        if not pending:
+            return
+        try:
+            resp = supabase.table("examples").insert([row for _, row in pending]).execute()
+        except PostgrestAPIError as e:
+            # Falha do bloco inteiro: todas as linhas dele ficam como erro
+            errors.extend({"line": line, "error": str(e)} for line, _ in pending)
+            pending.clear()
+            return
+        # Linhas que o banco não devolveu contam como erro (retorno parcial)
+        returned: Dict[tuple, List[Dict[str, Any]]] = {}
+        for row in resp.data or []:
+            returned.setdefault(_row_key(row), []).append(row)
+        for line, row in pending:
+            matches = returned.get(_row_key(row))
+            if matches:
+                inserted.append(matches.pop(0))
+            else:
+                errors.append({"line": line, "error": "Exemplo não confirmado pelo banco."})
+        pending.clear()
+
+    for line, record in iter_rows(fileobj, fmt):
+        if total >= max_rows:
+            # O que já foi lido é importado; o restante do arquivo é ignorado
+            truncated = True
+            break
+        total += 1
+        if isinstance(record, ImportFormatError):
+            errors.append({"line": line, "error": str(record)})
+            continue
+        try:
+            pending.append((line, build_example_row(record, user_id, categories_by_name, category_ids)))
+        except ValueError as e:
+            errors.append({"line": line, "error": str(e)})
+            continue
+        if len(pending) >= chunk_size:
+            _flush()
+    _flush()
+
+    errors.sort(key=lambda e: e["line"])
+    return {"total": total, "inserted": inserted, "errors": errors, "truncated": truncated}
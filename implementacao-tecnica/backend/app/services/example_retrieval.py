@@ -0,0 +1,186 @@
+# app/services/example_retrieval.py
+from __future__ import annotations
+
+import math
+import re
+import threading
+import unicodedata
+import zlib
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from app.utils.tokens import estimate_tokens
+
+# Tamanho do espaço de features (hashing trick)
+N_FEATURES = 1 << 18
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def _normalize(text: str) -> str:
+    text = unicodedata.normalize("NFKD", text.lower())
+    return "".join(ch for ch in text if not unicodedata.combining(ch))
+
+
+def hashed_features(text: str) -> Counter:
+    """Conta unigramas e bigramas de palavras, mapeados por hash para N_FEATURES."""
+    words = _WORD_RE.findall(_normalize(text or ""))
+    feats: Counter = Counter()
+    prev = None
+    for w in words:
+        feats[zlib.crc32(w.encode("utf-8")) % N_FEATURES] += 1
+        if prev is not None:
+            feats[zlib.crc32(f"{prev} {w}".encode("utf-8")) % N_FEATURES] += 1
+        prev = w
+    return feats
+
+
+def example_tokens(example: Dict[str, Any]) -> int:
+    # Conteúdo + resposta + rótulos do bloco no prompt
+    return (
+        estimate_tokens(example.get("conteudo") or "")
+        + estimate_tokens(example.get("resposta") or "")
+        + 12
+    )
+
+
+class ExampleIndex:
+    """
+    Índice TF-IDF (vetores esparsos com hashing) sobre os exemplos de um usuário.
+
+    Mantém um índice invertido feature -> {example_id: tf}, atualizado
+    incrementalmente com `add`/`remove`. As normas dos documentos dependem do
+    IDF global e são recalculadas sob demanda quando o índice muda.
+    """
+
+    def __init__(self, examples: Iterable[Dict[str, Any]] = ()):
+        self._docs: Dict[str, Dict[str, Any]] = {}
+        self._tfs: Dict[str, Counter] = {}
+        self._postings: Dict[int, Dict[str, int]] = {}
+        self._norms: Optional[Dict[str, float]] = None
+        self._lock = threading.Lock()
+        for ex in examples:
+            self._add(ex)
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def add(self, example: Dict[str, Any]) -> None:
+        with self._lock:
+            self._add(example)
+
+    def remove(self, example_id: Any) -> None:
+        with self._lock:
+            self._remove(str(example_id))
+
+    def _add(self, example: Dict[str, Any]) -> None:
+        eid = str(example["id"])
+        self._remove(eid)
+        tf = hashed_features(example.get("conteudo") or "")
+        self._docs[eid] = example
+        self._tfs[eid] = tf
+        for feat, count in tf.items():
+            self._postings.setdefault(feat, {})[eid] = count
+        self._norms = None
+
+    def _remove(self, eid: str) -> None:
+        tf = self._tfs.pop(eid, None)
+        if tf is None:
+            return
+        self._docs.pop(eid, None)
+        for feat in tf:
+            posting = self._postings.get(feat)
+            if posting is None:
+                continue
+            posting.pop(eid, None)
+            if not posting:
+                del self._postings[feat]
+        self._norms = None
+
+    def _idf(self, feat: int) -> float:
+        df = len(self._postings.get(feat, ()))
+        return math.log((len(self._docs) + 1) / (df + 1)) + 1.0
+
+    def _doc_norms(self) -> Dict[str, float]:
+        if self._norms is None:
+            norms: Dict[str, float] = {}
+            for eid, tf in self._tfs.items():
+                acc = 0.0
+                for feat, count in tf.items():
+                    w = count * self._idf(feat)
+                    acc += w * w
+                norms[eid] = math.sqrt(acc) or 1.0
+            self._norms = norms
+        return self._norms
+
+    def scores(self, text: str) -> Dict[str, float]:
+        """Similaridade de cosseno (TF-IDF) entre o texto e cada exemplo."""
+        query = hashed_features(text)
+        with self._lock:
+            norms = self._doc_norms()
+            acc: Dict[str, float] = {}
+            q_norm = 0.0
+            for feat, q_count in query.items():
+                idf = self._idf(feat)
+                q_w = q_count * idf
+                q_norm += q_w * q_w
+                for eid, d_count in self._postings.get(feat, {}).items():
+                    acc[eid] = acc.get(eid, 0.0) + q_w * d_count * idf
+            q_norm = math.sqrt(q_norm) or 1.0
+            return {eid: s / (q_norm * norms[eid]) for eid, s in acc.items()}
+
+    def select(
+        self,
+        text: str,
+        *,
+        top_k: int,
+        per_category: int,
+        token_budget: int,
+        only_category: Optional[str] = None,
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Escolhe os exemplos mais parecidos com `text`:
+          1) até `per_category` melhores exemplos de cada categoria (quota)
+          2) completa até `top_k` pelo ranking global
+        respeitando `token_budget` (descarta primeiro os de menor score).
+        Com `only_category`, considera apenas exemplos dessa categoria.
+        Retorna { categoria_id: [exemplos...] } no formato de build_system_prompt.
+        """
+        sims = self.scores(text)
+        with self._lock:
+            docs = {
+                eid: ex
+                for eid, ex in self._docs.items()
+                if only_category is None or str(ex.get("categoria_id")) == only_category
+            }
+        ranked: List[Tuple[float, str]] = sorted(
+            ((sims.get(eid, 0.0), eid) for eid in docs),
+            key=lambda t: (-t[0], t[1]),
+        )
+
+        chosen: List[Tuple[float, str]] = []
+        taken_by_cat: Dict[str, int] = {}
+        rest: List[Tuple[float, str]] = []
+        for score, eid in ranked:
+            cid = str(docs[eid].get("categoria_id"))
+            if taken_by_cat.get(cid, 0) < per_category:
+                taken_by_cat[cid] = taken_by_cat.get(cid, 0) + 1
+                chosen.append((score, eid))
+            else:
+                rest.append((score, eid))
+
+        # Quota primeiro (em ordem de score); o restante só se couber em top_k
+        chosen.sort(key=lambda t: (-t[0], t[1]))
+        slots = max(top_k - len(chosen), 0)
+        chosen.extend(rest[:slots])
+
+        selected: Dict[str, List[Dict[str, Any]]] = {}
+        used = 0
+        for _, eid in chosen:
+            ex = docs[eid]
+            cost = example_tokens(ex)
+            if used + cost > token_budget:
+                continue
+            used += cost
+            selected.setdefault(str(ex.get("categoria_id")), []).append(ex)
+        return selected
@@ -0,0 +1,369 @@
+# app/services/job_queue.py
+from __future__ import annotations
+
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+import httpx
+import openai
+from fastapi.concurrency import run_in_threadpool
+from postgrest.exceptions import APIError as PostgrestAPIError
+from supabase import Client
+
+from app.core.config import get_settings
+from app.core.metrics import EMAIL_JOBS, STAGE_INSERT
+from app.db.supabase import get_supabase_client
+from app.services.cleaning_patterns import fetch_user_patterns_async
+from app.services.email_ai_service import build_email_row, process_email_with_ai_async
+from app.services.email_stats import invalidate_user_stats
+from app.services.near_duplicates import near_duplicate_add_emails
+from app.utils.text_processing import clean_email
+
+JOB_PENDING = "pending"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+
+# Intervalo mínimo entre limpezas de jobs finalizados antigos
+PURGE_INTERVAL_SECONDS = 60.0
+
+_SCHEMA = """
+create table if not exists email_jobs (
+    id text primary key,
+    user_id text not null,
+    conteudo text not null,
+    status text not null,
+    attempts integer not null default 0,
+    max_attempts integer not null,
+    next_attempt_at real not null,
+    error text,
+    email_id text,
+    created_at real not null,
+    updated_at real not null
+);
+create index if not exists email_jobs_status_next
+    on email_jobs (status, next_attempt_at);
+"""
+
+
+class JobQueue:
+    """
+    Fila de jobs de processamento de e-mails persistida em SQLite.
+
+    O SQLite garante que os jobs sobrevivem a reinícios; `claim` usa uma
+    transação IMMEDIATE, então vários processos (workers do uvicorn) podem
+    consumir a mesma fila sem pegar o mesmo job.
+    """
+
+    def __init__(self, db_path: str, max_attempts: int, backoff_base_seconds: float):
+        self.max_attempts = max_attempts
+        self.backoff_base_seconds = backoff_base_seconds
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("pragma journal_mode=wal")
+            self._conn.executescript(_SCHEMA)
+
+    def enqueue(self, user_id: str, conteudo: str) -> Dict[str, Any]:
+        now = time.time()
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._conn.execute(
+                "insert into email_jobs (id, user_id, conteudo, status, max_attempts,"
+                " next_attempt_at, created_at, updated_at) values (?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, user_id, conteudo, JOB_PENDING, self.max_attempts, now, now, now),
+            )
+        return self.get(job_id)
+
+    def get(self, job_id: str, user_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        sql = "select * from email_jobs where id = ?"
+        params: List[Any] = [job_id]
+        if user_id is not None:
+            sql += " and user_id = ?"
+            params.append(user_id)
+        with self._lock:
+            row = self._conn.execute(sql, params).fetchone()
+        return dict(row) if row else None
+
+    def claim(self) -> Optional[Dict[str, Any]]:
+        """Pega o próximo job pendente cujo backoff já expirou."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("begin immediate")
+            try:
+                row = self._conn.execute(
+                    "select * from email_jobs where status = ? and next_attempt_at <= ?"
+                    " order by next_attempt_at limit 1",
+                    (JOB_PENDING, now),
+                ).fetchone()
+                if row is None:
+                    self._conn.execute("commit")
+                    return None
+                self._conn.execute(
+                    "update email_jobs set status = ?, attempts = attempts + 1, updated_at = ?"
+                    " where id = ?",
+                    (JOB_RUNNING, now, row["id"]),
+                )
+                self._conn.execute("commit")
+            except Exception:
+                self._conn.execute("rollback")
+                raise
+        job = dict(row)
+        job["status"] = JOB_RUNNING
+        job["attempts"] += 1
+        return job
+
+    def complete(self, job_id: str, email_id: str) -> None:
+        # O conteúdo já está na tabela `emails`; não precisa ficar duplicado na fila
+        with self._lock:
+            self._conn.execute(
+                "update email_jobs set status = ?, email_id = ?, error = null, conteudo = '',"
+                " updated_at = ? where id = ?",
+                (JOB_DONE, str(email_id), time.time(), job_id),
+            )
+
+    def fail(self, job: Dict[str, Any], error: str, retry: bool = True) -> None:
+        """
+        Reagenda com backoff exponencial ou marca como falho após o limite.
+        Com `retry=False` (erro permanente) falha na hora.
+        """
+        now = time.time()
+        if not retry or job["attempts"] >= job["max_attempts"]:
+            status, next_at = JOB_FAILED, now
+        else:
+            status = JOB_PENDING
+            next_at = now + self.backoff_base_seconds * (2 ** (job["attempts"] - 1))
+        with self._lock:
+            self._conn.execute(
+                "update email_jobs set status = ?, error = ?, next_attempt_at = ?, updated_at = ?"
+                " where id = ?",
+                (status, error, next_at, now, job["id"]),
+            )
+
+    def recover(self, lease_seconds: float) -> int:
+        """
+        Devolve para a fila os jobs "running" há mais de `lease_seconds`
+        (worker caiu ou foi reiniciado no meio do processamento).
+        """
+        now = time.time()
+        with self._lock:
+            cur = self._conn.execute(
+                "update email_jobs set status = ?, next_attempt_at = ?, updated_at = ?"
+                " where status = ? and updated_at < ?",
+                (JOB_PENDING, now, now, JOB_RUNNING, now - lease_seconds),
+            )
+        return cur.rowcount
+
+    def purge(self, retention_seconds: float) -> int:
+        """Apaga jobs concluídos ou falhos há mais de `retention_seconds`."""
+        with self._lock:
+            cur = self._conn.execute(
+                "delete from email_jobs where status in (?, ?) and updated_at < ?",
+                (JOB_DONE, JOB_FAILED, time.time() - retention_seconds),
+            )
+        return cur.rowcount
+
+    def depth(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute(
+                "select status, count(*) as n from email_jobs group by status"
+            ).fetchall()
+        counts = {JOB_PENDING: 0, JOB_RUNNING: 0, JOB_DONE: 0, JOB_FAILED: 0}
+        for row in rows:
+            counts[row["status"]] = row["n"]
+        return counts
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+@lru_cache
+def get_job_queue() -> JobQueue:
+    settings = get_settings()
+    return JobQueue(
+        db_path=settings.job_db_path,
+        max_attempts=settings.job_max_attempts,
+        backoff_base_seconds=settings.job_backoff_base_seconds,
+    )
+
+
+def _collect_depth():
+    # Só lê a fila se ela já foi aberta neste processo
+    if not get_job_queue.cache_info().currsize:
+        return []
+    return [((status,), n) for status, n in get_job_queue().depth().items()]
+
+
+EMAIL_JOBS.set_function(_collect_depth)
+
+
+def is_transient_error(exc: BaseException) -> bool:
+    """
+    Erros que valem nova tentativa: rede, timeout, 429/5xx da OpenAI e falhas
+    do Supabase que não são de dados/esquema. Validação, categoria removida,
+    4xx da OpenAI e saída inválida do modelo falham na hora.
+    """
+    cause = exc.__cause__ or exc
+    if isinstance(cause, (openai.APIConnectionError, openai.RateLimitError, openai.InternalServerError)):
+        return True
+    if isinstance(cause, openai.APIStatusError):
+        return cause.status_code in (408, 409) or cause.status_code >= 500
+    if isinstance(cause, (httpx.TransportError, ConnectionError, TimeoutError, asyncio.TimeoutError)):
+        return True
+    if isinstance(cause, PostgrestAPIError):
+        # 22xxx/23xxx/42xxx: dado inválido, FK/unique, esquema; PGRST: requisição inválida
+        return not str(cause.code or "").startswith(("22", "23", "42", "PGRST"))
+    return False
+
+
+def fetch_job_email_id(supabase: Client, job: Dict[str, Any]) -> Optional[str]:
+    """Id do e-mail já gravado por uma tentativa anterior do mesmo job, se houver."""
+    resp = (
+        supabase.table("emails")
+        .select("id")
+        .eq("job_id", job["id"])
+        .eq("user_id", job["user_id"])
+        .limit(1)
+        .execute()
+    )
+    return str(resp.data[0]["id"]) if resp.data else None
+
+
+async def process_job(job: Dict[str, Any]) -> str:
+    """
+    Roda a IA para o job e grava o resultado em `emails`. Retorna o id do e-mail.
+    A linha leva o id do job (`emails.job_id`, único): uma nova tentativa
+    depois de um insert bem-sucedido devolve o e-mail existente.
+    """
+    supabase = get_supabase_client()
+    settings = get_settings()
+    existing = await run_in_threadpool(fetch_job_email_id, supabase, job)
+    if existing is not None:
+        return existing
+
+    patterns = await fetch_user_patterns_async(supabase, job["user_id"])
+    cleaned = await run_in_threadpool(
+        clean_email, job["conteudo"], patterns, settings.email_cleaning_steps
+    )
+    ai_data = await process_email_with_ai_async(
+        conteudo_email=cleaned.text,
+        supabase=supabase,
+        user_id=job["user_id"],
+    )
+    row = build_email_row(job["conteudo"], ai_data, job["user_id"])
+    row["job_id"] = job["id"]
+    try:
+        with STAGE_INSERT.time():
+            resp = await run_in_threadpool(supabase.table("emails").insert(row).execute)
+    except PostgrestAPIError as e:
+        # Outro worker gravou o mesmo job entre a verificação e o insert
+        existing = await run_in_threadpool(fetch_job_email_id, supabase, job) if e.code == "23505" else None
+        if existing is None:
+            raise
+        return existing
+    if not resp.data:
+        raise RuntimeError("Falha ao criar e-mail")
+    invalidate_user_stats(job["user_id"])
+    await run_in_threadpool(near_duplicate_add_emails, job["user_id"], resp.data)
+    return str(resp.data[0]["id"])
+
+
+class JobWorkerPool:
+    """Workers assíncronos no próprio processo que consomem a fila de jobs."""
+
+    def __init__(
+        self,
+        queue: JobQueue,
+        workers: int,
+        poll_interval: float,
+        lease_seconds: float,
+        retention_seconds: float,
+    ):
+        self.queue = queue
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.retention_seconds = retention_seconds
+        self._last_purge = 0.0
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+
+    def start(self) -> None:
+        self.queue.recover(self.lease_seconds)
+        self._tasks = [asyncio.create_task(self._run()) for _ in range(self.workers)]
+
+    def notify(self) -> None:
+        self._wakeup.set()
+
+    async def stop(self) -> None:
+        self._stopping = True
+        self._wakeup.set()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            job = await run_in_threadpool(self.queue.claim)
+            if job is None:
+                await run_in_threadpool(self.queue.recover, self.lease_seconds)
+                if time.time() - self._last_purge >= PURGE_INTERVAL_SECONDS:
+                    self._last_purge = time.time()
+                    await run_in_threadpool(self.queue.purge, self.retention_seconds)
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            try:
+                email_id = await process_job(job)
+            except asyncio.CancelledError:
+                # Desligando: o job volta para a fila quando o lease expirar
+                raise
+            except Exception as e:
+                await run_in_threadpool(self.queue.fail, job, str(e), is_transient_error(e))
+            else:
+                await run_in_threadpool(self.queue.complete, job["id"], email_id)
+
+
+_worker_pool: Optional[JobWorkerPool] = None
+
+
+def start_job_workers() -> JobWorkerPool:
+    global _worker_pool
+    settings = get_settings()
+    if _worker_pool is None:
+        _worker_pool = JobWorkerPool(
+            get_job_queue(),
+            workers=settings.job_workers,
+            poll_interval=settings.job_poll_interval_seconds,
+            lease_seconds=settings.job_lease_seconds,
+            retention_seconds=settings.job_retention_seconds,
+        )
+        _worker_pool.start()
+    return _worker_pool
+
+
+async def stop_job_workers() -> None:
+    global _worker_pool
+    if _worker_pool is not None:
+        await _worker_pool.stop()
+        _worker_pool = None
+
+
+def notify_job_workers() -> None:
+    if _worker_pool is not None:
+        _worker_pool.notify()
@@ -0,0 +1,236 @@
+# app/services/local_classifier.py
+from __future__ import annotations
+
+import math
+import threading
+from collections import Counter, OrderedDict
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Optional, Sequence, Set, Tuple
+
+from supabase import Client
+
+from app.core.config import get_settings
+from app.services.cleaning_patterns import fetch_user_patterns
+from app.services.example_retrieval import hashed_features
+from app.services.near_duplicates import fetch_good_score_ids
+from app.utils.text_processing import clean_email
+
+
+class NaiveBayesClassifier:
+    """
+    Naive Bayes multinomial sobre n-gramas com hashing (mesmas features do
+    índice de exemplos). Suporta inclusão e remoção incremental de documentos.
+    O texto de treino passa pela mesma limpeza do e-mail classificado, com os
+    `patterns` do usuário; só e-mails com score em `good_score_ids` entram.
+    """
+
+    def __init__(
+        self,
+        alpha: float = 1.0,
+        good_score_ids: Set[str] = frozenset(),
+        patterns: Sequence[str] = (),
+    ):
+        self.alpha = alpha
+        self.good_score_ids = good_score_ids
+        self.patterns = tuple(patterns)
+        self._docs: Dict[str, Tuple[str, Counter]] = {}
+        self._class_docs: Counter = Counter()
+        self._class_tokens: Counter = Counter()
+        self._feature_counts: Dict[str, Counter] = {}
+        self._vocab: Counter = Counter()  # feature -> nº de documentos que a usam
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    @property
+    def n_classes(self) -> int:
+        return len(self._class_docs)
+
+    def is_good(self, score_id: Any) -> bool:
+        # Sem scores configurados, nenhum e-mail serve de treino
+        if score_id is None or not self.good_score_ids:
+            return False
+        return str(score_id) in self.good_score_ids
+
+    def add_training(self, doc_id: str, label: Any, conteudo: str) -> None:
+        """Inclui um documento de treino a partir do conteúdo bruto armazenado."""
+        text = clean_email(conteudo or "", self.patterns, get_settings().email_cleaning_steps).text
+        self.add(doc_id, label, text)
+
+    def add(self, doc_id: str, label: Any, text: str) -> None:
+        feats = hashed_features(text)
+        with self._lock:
+            self._remove(doc_id)
+            label = str(label)
+            self._docs[doc_id] = (label, feats)
+            self._class_docs[label] += 1
+            self._class_tokens[label] += sum(feats.values())
+            self._feature_counts.setdefault(label, Counter()).update(feats)
+            self._vocab.update(feats.keys())
+
+    def remove(self, doc_id: str) -> None:
+        with self._lock:
+            self._remove(doc_id)
+
+    def _remove(self, doc_id: str) -> None:
+        item = self._docs.pop(doc_id, None)
+        if item is None:
+            return
+        label, feats = item
+        self._class_docs[label] -= 1
+        self._class_tokens[label] -= sum(feats.values())
+        self._feature_counts[label].subtract(feats)
+        self._vocab.subtract(feats.keys())
+        if self._class_docs[label] <= 0:
+            del self._class_docs[label]
+            del self._class_tokens[label]
+            del self._feature_counts[label]
+        for feat in feats:
+            if self._vocab[feat] <= 0:
+                del self._vocab[feat]
+
+    def predict(self, text: str) -> Optional[Tuple[str, float]]:
+        """Retorna (categoria_id, probabilidade posterior) ou None se não treinado."""
+        feats = hashed_features(text)
+        with self._lock:
+            if not self._class_docs:
+                return None
+            n_docs = sum(self._class_docs.values())
+            vocab_size = max(len(self._vocab), 1)
+            log_probs: Dict[str, float] = {}
+            for label, n in self._class_docs.items():
+                counts = self._feature_counts[label]
+                denom = math.log(self._class_tokens[label] + self.alpha * vocab_size)
+                lp = math.log(n / n_docs)
+                for feat, c in feats.items():
+                    lp += c * (math.log(counts.get(feat, 0) + self.alpha) - denom)
+                log_probs[label] = lp
+
+        best = max(log_probs, key=log_probs.get)
+        top = log_probs[best]
+        norm = sum(math.exp(lp - top) for lp in log_probs.values())
+        return best, 1.0 / norm
+
+
+def fetch_scored_emails(
+    supabase: Client, user_id: str, good_score_ids: Set[str], limit: int
+) -> list:
+    """E-mails bem avaliados (score em `good_score_ids`) e categorizados, usados como treino."""
+    if not good_score_ids:
+        return []
+    resp = (
+        supabase.table("emails")
+        .select("id,conteudo,categoria_id")
+        .eq("user_id", user_id)
+        .in_("score_id", sorted(good_score_ids))
+        .not_.is_("categoria_id", "null")
+        .order("created_at", desc=True)
+        .limit(limit)
+        .execute()
+    )
+    return resp.data or []
+
+
+class ClassifierRegistry:
+    """Classificadores por usuário em memória (LRU limitado por nº de usuários)."""
+
+    def __init__(self, max_users: int):
+        self.max_users = max_users
+        self._items: "OrderedDict[str, NaiveBayesClassifier]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id: str) -> Optional[NaiveBayesClassifier]:
+        with self._lock:
+            clf = self._items.get(user_id)
+            if clf is not None:
+                self._items.move_to_end(user_id)
+            return clf
+
+    def put(self, user_id: str, clf: NaiveBayesClassifier) -> None:
+        with self._lock:
+            self._items[user_id] = clf
+            self._items.move_to_end(user_id)
+            while len(self._items) > self.max_users:
+                self._items.popitem(last=False)
+
+    def invalidate(self, user_id: str) -> None:
+        with self._lock:
+            self._items.pop(user_id, None)
+
+
+@lru_cache
+def get_classifier_registry() -> ClassifierRegistry:
+    return ClassifierRegistry(max_users=get_settings().local_classifier_max_users)
+
+
+def train_classifier(
+    examples: Iterable[Dict[str, Any]],
+    emails: Iterable[Dict[str, Any]],
+    good_score_ids: Set[str] = frozenset(),
+    patterns: Sequence[str] = (),
+) -> NaiveBayesClassifier:
+    clf = NaiveBayesClassifier(good_score_ids=good_score_ids, patterns=patterns)
+    for ex in examples:
+        if ex.get("categoria_id") is not None:
+            clf.add_training(f"ex:{ex['id']}", ex["categoria_id"], ex.get("conteudo") or "")
+    for em in emails:
+        clf.add_training(f"em:{em['id']}", em["categoria_id"], em.get("conteudo") or "")
+    return clf
+
+
+def get_user_classifier(
+    supabase: Client,
+    user_id: str,
+    examples: Iterable[Dict[str, Any]],
+) -> NaiveBayesClassifier:
+    """Classificador do usuário; treina a partir de exemplos + e-mails avaliados no miss."""
+    registry = get_classifier_registry()
+    clf = registry.get(user_id)
+    if clf is None:
+        settings = get_settings()
+        good_score_ids = fetch_good_score_ids(supabase, settings.near_duplicate_good_scores)
+        emails = fetch_scored_emails(
+            supabase, user_id, good_score_ids, settings.local_classifier_max_emails
+        )
+        clf = train_classifier(
+            examples, emails, good_score_ids, fetch_user_patterns(supabase, user_id)
+        )
+        registry.put(user_id, clf)
+    return clf
+
+
+# Atualizações incrementais (só mexem em classificadores já carregados)
+
+def classifier_add_example(user_id: str, example: Dict[str, Any]) -> None:
+    clf = get_classifier_registry().get(user_id)
+    if clf is not None and example.get("categoria_id") is not None:
+        clf.add_training(f"ex:{example['id']}", example["categoria_id"], example.get("conteudo") or "")
+
+
+def classifier_remove_example(user_id: str, example_id: Any) -> None:
+    clf = get_classifier_registry().get(user_id)
+    if clf is not None:
+        clf.remove(f"ex:{example_id}")
+
+
+def classifier_sync_email(user_id: str, email: Dict[str, Any]) -> None:
+    """Inclui/atualiza um e-mail como treino se estiver bem avaliado e categorizado."""
+    clf = get_classifier_registry().get(user_id)
+    if clf is None:
+        return
+    doc_id = f"em:{email['id']}"
+    if clf.is_good(email.get("score_id")) and email.get("categoria_id") is not None:
+        clf.add_training(doc_id, email["categoria_id"], email.get("conteudo") or "")
+    else:
+        clf.remove(doc_id)
+
+
+def classifier_remove_email(user_id: str, email_id: Any) -> None:
+    clf = get_classifier_registry().get(user_id)
+    if clf is not None:
+        clf.remove(f"em:{email_id}")
+
+
+def invalidate_user_classifier(user_id: str) -> None:
+    get_classifier_registry().invalidate(user_id)
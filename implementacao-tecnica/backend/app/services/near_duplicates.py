@@ -0,0 +1,354 @@
+# app/services/near_duplicates.py
+"""
+Detecção de e-mails quase idênticos (MinHash + LSH) para reaproveitar a
+categoria de e-mails já bem avaliados. A resposta nunca é reaproveitada:
+o modelo sempre a redige para o e-mail atual.
+
+Cada usuário tem um índice em memória com os e-mails mais recentes
+(assinatura MinHash + bandas LSH), limitado por nº de e-mails e de usuários.
+Números são normalizados antes do shingling, então e-mails que só mudam em
+nº de pedido, datas ou valores caem nas mesmas bandas.
+
+O índice de um usuário é montado em segundo plano (uma thread dedicada) na
+primeira busca; até ficar pronto, a busca responde "sem quase idêntico".
+"""
+from __future__ import annotations
+
+import random
+import re
+import threading
+import unicodedata
+import zlib
+from array import array
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from supabase import Client
+
+from app.core.config import get_settings
+from app.services.cleaning_patterns import fetch_user_patterns
+from app.utils.text_processing import clean_email
+
+# 64 permutações em 16 bandas de 4 linhas: pares com Jaccard >= ~0.5
+# tendem a colidir em alguma banda; a similaridade exata filtra o resto
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 3
+
+_MERSENNE = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+_rng = random.Random(1)
+_PERMS = [(_rng.randrange(1, _MERSENNE), _rng.randrange(0, _MERSENNE)) for _ in range(NUM_PERM)]
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+_DIGITS_RE = re.compile(r"\d+")
+
+
+def _normalize(text: str) -> str:
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return _DIGITS_RE.sub("0", text)
+
+
+def shingles(text: str) -> Set[int]:
+    """Hashes dos n-gramas de palavras (SHINGLE_SIZE) do texto normalizado."""
+    words = _WORD_RE.findall(_normalize(text or ""))
+    if len(words) < SHINGLE_SIZE:
+        grams = [" ".join(words)] if words else []
+    else:
+        grams = [" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)]
+    return {zlib.crc32(g.encode("utf-8")) for g in grams}
+
+
+def minhash(text: str) -> Optional[array]:
+    """Assinatura MinHash (NUM_PERM valores de 32 bits) ou None para texto vazio."""
+    hashes = shingles(text)
+    if not hashes:
+        return None
+    return array(
+        "I",
+        (min(((a * h + b) % _MERSENNE) & _MAX_HASH for h in hashes) for a, b in _PERMS),
+    )
+
+
+def similarity(sig_a: array, sig_b: array) -> float:
+    """Estimativa da similaridade de Jaccard entre os dois textos."""
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / NUM_PERM
+
+
+def _bands(sig: array) -> List[int]:
+    return [hash((i, tuple(sig[i * ROWS:(i + 1) * ROWS]))) for i in range(BANDS)]
+
+
+def stored_signature(conteudo: str, patterns: Sequence[str] = ()) -> Optional[array]:
+    """
+    Assinatura de um e-mail salvo. O banco guarda o corpo original; a busca
+    usa o texto limpo enviado ao modelo, então a mesma limpeza (com os padrões
+    do usuário) é refeita aqui.
+    """
+    return minhash(clean_email(conteudo or "", patterns, get_settings().email_cleaning_steps).text)
+
+
+def _normalize_score(name: str) -> str:
+    return _normalize(name).strip()
+
+
+class MinHashIndex:
+    """
+    Índice LSH dos e-mails de um usuário. Guarda só a assinatura e se o
+    e-mail está bem avaliado; a categoria reaproveitada é lida do banco no hit.
+    Acima de `max_docs`, os e-mails indexados há mais tempo saem primeiro.
+    `patterns` são os padrões de limpeza do usuário usados nas assinaturas.
+    """
+
+    def __init__(self, max_docs: int, good_score_ids: Set[str], patterns: Sequence[str] = ()):
+        self.max_docs = max_docs
+        self.good_score_ids = good_score_ids
+        self.patterns = tuple(patterns)
+        # id -> (assinatura, bem avaliado, ordem de inserção)
+        self._docs: "OrderedDict[str, Tuple[array, bool, int]]" = OrderedDict()
+        self._buckets: Dict[int, List[str]] = {}
+        self._seq = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def is_good(self, score_id: Any) -> bool:
+        # Sem scores configurados, nenhum e-mail conta como bem avaliado
+        if score_id is None or not self.good_score_ids:
+            return False
+        return str(score_id) in self.good_score_ids
+
+    def add(self, email_id: Any, sig: array, good: bool) -> None:
+        email_id = str(email_id)
+        with self._lock:
+            self._remove(email_id)
+            self._seq += 1
+            self._docs[email_id] = (sig, good, self._seq)
+            for band in _bands(sig):
+                self._buckets.setdefault(band, []).append(email_id)
+            while len(self._docs) > self.max_docs:
+                self._remove(next(iter(self._docs)))
+
+    def set_good(self, email_id: Any, good: bool) -> bool:
+        """Atualiza a avaliação de um e-mail indexado. Retorna False se não estiver no índice."""
+        email_id = str(email_id)
+        with self._lock:
+            item = self._docs.get(email_id)
+            if item is None:
+                return False
+            self._docs[email_id] = (item[0], good, item[2])
+            return True
+
+    def remove(self, email_id: Any) -> None:
+        with self._lock:
+            self._remove(str(email_id))
+
+    def _remove(self, email_id: str) -> None:
+        item = self._docs.pop(email_id, None)
+        if item is None:
+            return
+        for band in _bands(item[0]):
+            ids = self._buckets.get(band)
+            if ids is not None:
+                ids.remove(email_id)
+                if not ids:
+                    del self._buckets[band]
+
+    def query(self, sig: array, threshold: float) -> Optional[Tuple[str, float]]:
+        """E-mail bem avaliado mais parecido, se a similaridade passar de `threshold`."""
+        with self._lock:
+            candidates = {eid for band in _bands(sig) for eid in self._buckets.get(band, ())}
+            best: Optional[Tuple[float, int, str]] = None
+            for eid in candidates:
+                other, good, seq = self._docs[eid]
+                if not good:
+                    continue
+                score = similarity(sig, other)
+                # Empate: o mais recente (maior ordem de inserção)
+                if score >= threshold and (best is None or (score, seq) > best[:2]):
+                    best = (score, seq, eid)
+            return (best[2], best[0]) if best is not None else None
+
+
+def fetch_recent_emails(supabase: Client, user_id: str, limit: int) -> list:
+    resp = (
+        supabase.table("emails")
+        .select("id,conteudo,score_id")
+        .eq("user_id", user_id)
+        .order("created_at", desc=True)
+        .limit(limit)
+        .execute()
+    )
+    return resp.data or []
+
+
+def fetch_good_score_ids(supabase: Client, names: Iterable[str]) -> Set[str]:
+    """IDs dos scores cujos nomes estão em `names` (sem acento/maiúsculas)."""
+    wanted = {_normalize_score(n) for n in names if n.strip()}
+    if not wanted:
+        return set()
+    resp = supabase.table("scores").select("id,classificacao").execute()
+    return {
+        str(s["id"]) for s in resp.data or []
+        if _normalize_score(s.get("classificacao") or "") in wanted
+    }
+
+
+class NearDuplicateRegistry:
+    """Índices por usuário em memória (LRU limitado por nº de usuários)."""
+
+    def __init__(self, max_users: int):
+        self.max_users = max_users
+        self._items: "OrderedDict[str, MinHashIndex]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id: str) -> Optional[MinHashIndex]:
+        with self._lock:
+            index = self._items.get(user_id)
+            if index is not None:
+                self._items.move_to_end(user_id)
+            return index
+
+    def put(self, user_id: str, index: MinHashIndex) -> None:
+        with self._lock:
+            self._items[user_id] = index
+            self._items.move_to_end(user_id)
+            while len(self._items) > self.max_users:
+                self._items.popitem(last=False)
+
+    def invalidate(self, user_id: str) -> None:
+        with self._lock:
+            self._items.pop(user_id, None)
+
+
+@lru_cache
+def get_near_duplicate_registry() -> NearDuplicateRegistry:
+    return NearDuplicateRegistry(max_users=get_settings().near_duplicate_max_users)
+
+
+@lru_cache
+def get_index_builder() -> ThreadPoolExecutor:
+    # Thread própria: a montagem (busca + MinHash em Python) não ocupa o threadpool das rotas
+    return ThreadPoolExecutor(max_workers=1, thread_name_prefix="near-dup-index")
+
+
+_building: Set[str] = set()
+_building_lock = threading.Lock()
+
+
+def build_user_index(supabase: Client, user_id: str) -> MinHashIndex:
+    """Indexa os e-mails mais recentes do usuário e registra o índice."""
+    settings = get_settings()
+    index = MinHashIndex(
+        max_docs=settings.near_duplicate_max_emails,
+        good_score_ids=fetch_good_score_ids(supabase, settings.near_duplicate_good_scores),
+        patterns=fetch_user_patterns(supabase, user_id),
+    )
+    # Do mais antigo para o mais recente: a ordem de inserção é a de despejo
+    for email in reversed(fetch_recent_emails(supabase, user_id, settings.near_duplicate_max_emails)):
+        sig = stored_signature(email.get("conteudo") or "", index.patterns)
+        if sig is not None:
+            index.add(email["id"], sig, index.is_good(email.get("score_id")))
+    get_near_duplicate_registry().put(user_id, index)
+    return index
+
+
+def _build_in_background(supabase: Client, user_id: str) -> None:
+    try:
+        build_user_index(supabase, user_id)
+    except Exception as e:
+        print("Erro ao indexar quase duplicados:", e)
+    finally:
+        with _building_lock:
+            _building.discard(user_id)
+
+
+def schedule_index_build(supabase: Client, user_id: str) -> None:
+    """Agenda a montagem do índice do usuário (uma por vez por usuário)."""
+    with _building_lock:
+        if user_id in _building:
+            return
+        _building.add(user_id)
+    get_index_builder().submit(_build_in_background, supabase, user_id)
+
+
+def find_near_duplicate(
+    supabase: Client,
+    user_id: str,
+    conteudo: str,
+    threshold: float,
+) -> Optional[Tuple[str, float]]:
+    """
+    (id do e-mail, similaridade) do quase idêntico bem avaliado, se houver.
+    Sem índice pronto, agenda a montagem e responde None (não bloqueia).
+    """
+    index = get_near_duplicate_registry().get(user_id)
+    if index is None:
+        schedule_index_build(supabase, user_id)
+        return None
+    sig = minhash(conteudo)
+    if sig is None:
+        return None
+    return index.query(sig, threshold)
+
+
+def fetch_reusable_email(
+    supabase: Client,
+    user_id: str,
+    email_id: str,
+) -> Optional[Dict[str, Any]]:
+    """Linha do e-mail encontrado, se ainda existir e continuar bem avaliado."""
+    resp = (
+        supabase.table("emails")
+        .select("id,categoria_id,score_id")
+        .eq("id", email_id)
+        .eq("user_id", user_id)
+        .limit(1)
+        .execute()
+    )
+    if not resp.data:
+        return None
+    row = resp.data[0]
+    index = get_near_duplicate_registry().get(user_id)
+    if index is None or not index.is_good(row.get("score_id")):
+        return None
+    return row
+
+
+# Atualizações incrementais (só mexem em índices já carregados)
+
+def near_duplicate_add_emails(user_id: str, emails: Iterable[Dict[str, Any]]) -> None:
+    index = get_near_duplicate_registry().get(user_id)
+    if index is None:
+        return
+    for email in emails:
+        sig = stored_signature(email.get("conteudo") or "", index.patterns)
+        if sig is not None:
+            index.add(email["id"], sig, index.is_good(email.get("score_id")))
+
+
+def near_duplicate_sync_email(user_id: str, email: Dict[str, Any]) -> None:
+    """Após edição: atualiza a avaliação (e a assinatura, se o conteúdo mudou)."""
+    index = get_near_duplicate_registry().get(user_id)
+    if index is None:
+        return
+    if "conteudo" in email:
+        near_duplicate_add_emails(user_id, [email])
+    else:
+        index.set_good(email["id"], index.is_good(email.get("score_id")))
+
+
+def invalidate_user_near_duplicates(user_id: str) -> None:
+    """Descarta o índice do usuário (ex.: padrões de limpeza alterados)."""
+    get_near_duplicate_registry().invalidate(user_id)
+
+
+def near_duplicate_remove_email(user_id: str, email_id: Any) -> None:
+    index = get_near_duplicate_registry().get(user_id)
+    if index is not None:
+        index.remove(email_id)
@@ -0,0 +1,167 @@
+# app/services/prompt_cache.py
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional
+
+from app.core.config import get_settings
+from app.services.example_retrieval import ExampleIndex, example_tokens
+
+
+@dataclass
+class CompiledPrompt:
+    """
+    Resultado compilado do contexto de IA de um usuário:
+      - categorias e exemplos (como vieram do banco)
+      - system prompt já renderizado (com todos os exemplos)
+      - índice de recuperação dos exemplos (few-shot por similaridade)
+      - versão do conteúdo (hash estável de categorias + exemplos)
+    """
+    categories: List[Dict[str, Any]]
+    examples_by_category: Dict[str, List[Dict[str, Any]]]
+    system_prompt: str
+    index: Optional[ExampleIndex] = field(default=None, repr=False)
+    version: str = ""
+    examples_count: int = 0
+    examples_tokens: int = 0
+    size: int = field(default=0, repr=False)
+
+    def __post_init__(self) -> None:
+        all_examples = [ex for exs in self.examples_by_category.values() for ex in exs]
+        if self.index is None:
+            self.index = ExampleIndex(all_examples)
+        self.examples_count = len(all_examples)
+        self.examples_tokens = sum(example_tokens(ex) for ex in all_examples)
+        if not self.version:
+            self.version = content_version(self.categories, self.examples_by_category)
+        if not self.size:
+            self.size = _estimate_size(self)
+
+
+def content_version(
+    categories: List[Dict[str, Any]],
+    examples_by_category: Dict[str, List[Dict[str, Any]]],
+) -> str:
+    payload = json.dumps(
+        {"categories": categories, "examples": examples_by_category},
+        sort_keys=True,
+        default=str,
+        ensure_ascii=False,
+    )
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def _estimate_size(entry: CompiledPrompt) -> int:
+    # Aproximação em bytes: o prompt + textos dos exemplos dominam o tamanho
+    size = len(entry.system_prompt.encode("utf-8"))
+    for exs in entry.examples_by_category.values():
+        for ex in exs:
+            size += len((ex.get("conteudo") or "").encode("utf-8"))
+            size += len((ex.get("resposta") or "").encode("utf-8"))
+    return size
+
+
+class PromptCache:
+    """
+    Cache LRU em memória de prompts compilados por usuário.
+
+    Limitado por número de entradas e por bytes aproximados. Cada usuário tem
+    um contador de geração: `invalidate` incrementa a geração e descarta a
+    entrada, e `put` ignora entradas montadas com uma geração antiga (evita
+    gravar no cache um prompt buscado antes de uma escrita concorrente).
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, CompiledPrompt]" = OrderedDict()
+        self._generations: Dict[str, int] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def generation(self, user_id: str) -> int:
+        with self._lock:
+            return self._generations.get(user_id, 0)
+
+    def get(self, user_id: str) -> Optional[CompiledPrompt]:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None:
+                self._entries.move_to_end(user_id)
+            return entry
+
+    def put(self, user_id: str, entry: CompiledPrompt, generation: int) -> None:
+        with self._lock:
+            if self._generations.get(user_id, 0) != generation:
+                return
+            # Entradas maiores que o limite total nunca são cacheadas
+            if entry.size > self.max_bytes:
+                return
+            self._pop(user_id)
+            self._entries[user_id] = entry
+            self._bytes += entry.size
+            self._evict()
+
+    def update(
+        self,
+        user_id: str,
+        fn: Callable[[CompiledPrompt], CompiledPrompt],
+    ) -> None:
+        """
+        Aplica uma alteração incremental na entrada do usuário (se houver).
+        Sempre avança a geração, para que buscas concorrentes não gravem
+        um estado anterior à escrita. `fn` (recompila o prompt) roda fora do
+        lock; a nova entrada só é gravada se nenhuma outra escrita do usuário
+        aconteceu nesse meio-tempo (senão é descartada e remontada no próximo uso).
+        """
+        with self._lock:
+            generation = self._generations.get(user_id, 0) + 1
+            self._generations[user_id] = generation
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return
+            self._pop(user_id)
+        self.put(user_id, fn(entry), generation)
+
+    def invalidate(self, user_id: str) -> None:
+        with self._lock:
+            self._generations[user_id] = self._generations.get(user_id, 0) + 1
+            self._pop(user_id)
+
+    def clear(self) -> None:
+        with self._lock:
+            for user_id in list(self._entries):
+                self._generations[user_id] = self._generations.get(user_id, 0) + 1
+            self._entries.clear()
+            self._bytes = 0
+
+    def _pop(self, user_id: str) -> None:
+        old = self._entries.pop(user_id, None)
+        if old is not None:
+            self._bytes -= old.size
+
+    def _evict(self) -> None:
+        while self._entries and (
+            len(self._entries) > self.max_entries or self._bytes > self.max_bytes
+        ):
+            _, old = self._entries.popitem(last=False)
+            self._bytes -= old.size
+
+
+@lru_cache
+def get_prompt_cache() -> PromptCache:
+    settings = get_settings()
+    return PromptCache(
+        max_entries=settings.prompt_cache_max_entries,
+        max_bytes=settings.prompt_cache_max_bytes,
+    )
+
+
+def invalidate_user_prompt(user_id: str) -> None:
+    """Descarta o prompt compilado do usuário (chamar após escrever categorias/exemplos)."""
+    get_prompt_cache().invalidate(user_id)
@@ -0,0 +1,167 @@
+# app/services/response_cache.py
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+
+from app.core.config import get_settings
+from app.core.metrics import RESPONSE_CACHE_ENTRIES, RESPONSE_CACHE_LOOKUPS
+
+
+def response_cache_key(user_id: str, prompt_version: str, model: str, clean_content: str) -> str:
+    digest = hashlib.sha256(clean_content.encode("utf-8")).hexdigest()
+    return f"{user_id}:{prompt_version}:{model}:{digest}"
+
+
+class SqliteResponseStore:
+    """Backend persistente opcional do cache de respostas (sobrevive a reinícios)."""
+
+    def __init__(self, db_path: str):
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("pragma journal_mode=wal")
+            self._conn.execute(
+                "create table if not exists response_cache ("
+                " key text primary key, data text not null, expires_at real not null)"
+            )
+
+    def get(self, key: str) -> Optional[Tuple[float, Dict[str, Any]]]:
+        with self._lock:
+            row = self._conn.execute(
+                "select expires_at, data from response_cache where key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        return row[0], json.loads(row[1])
+
+    def put(self, key: str, expires_at: float, data: Dict[str, Any]) -> None:
+        with self._lock:
+            self._conn.execute(
+                "insert or replace into response_cache (key, data, expires_at) values (?, ?, ?)",
+                (key, json.dumps(data, ensure_ascii=False), expires_at),
+            )
+
+    def purge_expired(self) -> None:
+        with self._lock:
+            self._conn.execute("delete from response_cache where expires_at < ?", (time.time(),))
+
+
+class ResponseCache:
+    """
+    Cache das saídas validadas da IA, por (usuário, versão do prompt, modelo,
+    hash do conteúdo limpo). LRU em memória com TTL e, opcionalmente, um
+    backend SQLite consultado nos misses da memória.
+    """
+
+    def __init__(
+        self,
+        max_entries: int,
+        ttl_seconds: float,
+        store: Optional[SqliteResponseStore] = None,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._store = store
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        with self._lock:
+            item = self._entries.get(key)
+            if item is not None:
+                if item[0] > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return dict(item[1])
+                del self._entries[key]
+
+        if self._store is not None:
+            item = self._store.get(key)
+            if item is not None and item[0] > now:
+                with self._lock:
+                    self._remember(key, item)
+                    self.hits += 1
+                return dict(item[1])
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: str, data: Dict[str, Any]) -> None:
+        item = (time.time() + self.ttl_seconds, dict(data))
+        with self._lock:
+            self._remember(key, item)
+        if self._store is not None:
+            self._store.put(key, item[0], item[1])
+
+    async def aget(self, key: str) -> Optional[Dict[str, Any]]:
+        # Só o backend SQLite bloqueia; a memória responde direto no event loop
+        if self._store is None:
+            return self.get(key)
+        return await run_in_threadpool(self.get, key)
+
+    async def aput(self, key: str, data: Dict[str, Any]) -> None:
+        if self._store is None:
+            self.put(key, data)
+        else:
+            await run_in_threadpool(self.put, key, data)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / total) if total else 0.0,
+                "entries": len(self._entries),
+            }
+
+    def _remember(self, key: str, item: Tuple[float, Dict[str, Any]]) -> None:
+        self._entries[key] = item
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+@lru_cache
+def get_response_cache() -> ResponseCache:
+    settings = get_settings()
+    store = None
+    if settings.response_cache_backend == "sqlite":
+        store = SqliteResponseStore(settings.response_cache_db_path)
+        store.purge_expired()
+    return ResponseCache(
+        max_entries=settings.response_cache_max_entries,
+        ttl_seconds=settings.response_cache_ttl_seconds,
+        store=store,
+    )
+
+
+def _collect_lookups():
+    # Só lê o cache se ele já foi criado neste processo
+    if not get_response_cache.cache_info().currsize:
+        return []
+    stats = get_response_cache().stats()
+    return [(("hit",), stats["hits"]), (("miss",), stats["misses"])]
+
+
+def _collect_entries():
+    if not get_response_cache.cache_info().currsize:
+        return []
+    return [((), get_response_cache().stats()["entries"])]
+
+
+RESPONSE_CACHE_LOOKUPS.set_function(_collect_lookups)
+RESPONSE_CACHE_ENTRIES.set_function(_collect_entries)
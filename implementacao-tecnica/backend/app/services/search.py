@@ -0,0 +1,49 @@
+"""
+Busca textual (full-text search do Postgres) em e-mails e exemplos.
+
+As funções `search_emails` / `search_examples` (scripts.sql) filtram pela
+coluna `busca` (tsvector em português, com índice GIN), ordenam por
+relevância e paginam por keyset em (rank, created_at, id). Cada linha vem
+como JSON com a linha inteira mais `rank` e `preview`.
+"""
+from typing import Any, Dict, List, Optional, Tuple
+
+from supabase import Client
+
+from app.utils.pagination import decode_search_cursor, split_search_page
+
+# Tamanho máximo do termo de busca (q=)
+MAX_QUERY_LENGTH = 200
+
+
+def search_rows(
+    supabase: Client,
+    function: str,
+    user_id: str,
+    q: str,
+    *,
+    page: int,
+    page_size: int,
+    cursor: Optional[str],
+    filters: Optional[Dict[str, Any]] = None,
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Executa a busca e devolve (linhas da página, próximo cursor). Sem cursor,
+    `page` > 1 continua por offset, como nas listagens.
+    """
+    params: Dict[str, Any] = {
+        "p_user_id": user_id,
+        "p_query": q,
+        "p_limit": page_size + 1,
+        "p_offset": 0 if cursor else (page - 1) * page_size,
+        "p_rank": None,
+        "p_created_at": None,
+        "p_id": None,
+    }
+    if cursor:
+        params["p_rank"], params["p_created_at"], params["p_id"] = decode_search_cursor(cursor)
+    for key, value in (filters or {}).items():
+        params[f"p_{key}"] = value
+
+    resp = supabase.rpc(function, params).execute()
+    return split_search_page(resp.data or [], page_size)
@@ -0,0 +1,76 @@
+# Exportação em streaming (NDJSON/CSV, opcionalmente gzip) sobre páginas keyset
+import csv
+import io
+import json
+import zlib
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence
+
+from app.utils.pagination import apply_keyset, encode_cursor
+
+EXPORT_FORMATS = ("ndjson", "csv")
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+
+def iter_keyset_pages(
+    build_query: Callable[[], Any],
+    page_size: int,
+) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Percorre todas as linhas em páginas de `page_size` (created_at, id desc).
+    Só uma página fica em memória por vez.
+    """
+    cursor: Optional[str] = None
+    while True:
+        rows = apply_keyset(build_query(), cursor).limit(page_size).execute().data or []
+        if rows:
+            yield rows
+        if len(rows) < page_size:
+            return
+        last = rows[-1]
+        cursor = encode_cursor(last["created_at"], last["id"])
+
+
+def _ndjson_chunks(pages: Iterable[List[Dict[str, Any]]]) -> Iterator[str]:
+    for rows in pages:
+        yield "".join(
+            json.dumps(row, ensure_ascii=False, default=str) + "\n" for row in rows
+        )
+
+
+def _csv_chunks(pages: Iterable[List[Dict[str, Any]]], columns: Sequence[str]) -> Iterator[str]:
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=list(columns), extrasaction="ignore")
+    writer.writeheader()
+    for rows in pages:
+        writer.writerows(rows)
+        yield buf.getvalue()
+        buf.seek(0)
+        buf.truncate()
+    # Sem linhas: ainda assim devolve o cabeçalho
+    if buf.tell():
+        yield buf.getvalue()
+
+
+def _gzip(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        out = compressor.compress(chunk)
+        if out:
+            yield out
+    yield compressor.flush()
+
+
+def encode_export(
+    pages: Iterable[List[Dict[str, Any]]],
+    fmt: str,
+    columns: Sequence[str],
+    gzip: bool = False,
+) -> Iterator[bytes]:
+    """Serializa as páginas no formato pedido, em blocos prontos para o StreamingResponse."""
+    chunks = _csv_chunks(pages, columns) if fmt == "csv" else _ndjson_chunks(pages)
+    encoded = (chunk.encode("utf-8") for chunk in chunks)
+    return _gzip(encoded) if gzip else encoded
@@ -0,0 +1,76 @@
+# Extração incremental de um campo string de um JSON que chega em pedaços
+import json
+import re
+
+_SIMPLE_ESCAPES = {
+    '"': '"',
+    "\\": "\\",
+    "/": "/",
+    "b": "\b",
+    "f": "\f",
+    "n": "\n",
+    "r": "\r",
+    "t": "\t",
+}
+
+
+class JsonStringFieldStreamer:
+    """
+    Recebe o texto de um objeto JSON em pedaços (stream do modelo) e devolve,
+    a cada `feed`, o trecho já decodificado do valor de `field`.
+    Escapes incompletos ficam pendentes até o próximo pedaço.
+    """
+
+    def __init__(self, field: str):
+        self._key_re = re.compile(r'"%s"\s*:\s*"' % re.escape(field))
+        self._buf = ""
+        self._pos = -1  # posição do próximo caractere do valor em _buf
+        self.done = False
+
+    def feed(self, chunk: str) -> str:
+        self._buf += chunk
+        if self.done:
+            return ""
+        if self._pos < 0:
+            m = self._key_re.search(self._buf)
+            if not m:
+                return ""
+            self._pos = m.end()
+
+        out = []
+        buf, i, n = self._buf, self._pos, len(self._buf)
+        while i < n:
+            ch = buf[i]
+            if ch == '"':
+                self.done = True
+                i += 1
+                break
+            if ch != "\\":
+                out.append(ch)
+                i += 1
+                continue
+            if i + 1 >= n:
+                break
+            esc = buf[i + 1]
+            if esc in _SIMPLE_ESCAPES:
+                out.append(_SIMPLE_ESCAPES[esc])
+                i += 2
+                continue
+            if esc == "u":
+                seq_end = i + 6
+                if seq_end > n:
+                    break
+                code = int(buf[i + 2:seq_end], 16)
+                # Par de surrogates: espera o segundo \\uXXXX
+                if 0xD800 <= code <= 0xDBFF:
+                    if seq_end + 6 > n:
+                        break
+                    seq_end += 6
+                out.append(json.loads('"%s"' % buf[i:seq_end]))
+                i = seq_end
+                continue
+            # Escape inválido: mantém literal
+            out.append(esc)
+            i += 2
+        self._pos = i
+        return "".join(out)
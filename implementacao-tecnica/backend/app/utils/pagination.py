@@ -0,0 +1,100 @@
+# Paginação por cursor (keyset) em (created_at, id)
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+# Valores aceitos em `count=` nas rotas de listagem ("none" = não contar)
+COUNT_MODES = ("exact", "planned", "estimated", "none")
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(created_at: Any, row_id: Any) -> str:
+    payload = json.dumps({"c": str(created_at), "i": row_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        data = json.loads(raw)
+        # Os valores vão para o filtro da consulta: só timestamp e id inteiro
+        created_at = datetime.fromisoformat(str(data["c"])).isoformat()
+        return created_at, int(data["i"])
+    except (ValueError, KeyError, TypeError):
+        raise InvalidCursor("Cursor inválido.")
+
+
+def apply_keyset(query, cursor: Optional[str]):
+    """
+    Ordena por (created_at, id) decrescente e, com `cursor`, pula para depois
+    da última linha da página anterior. Com o índice (user_id, created_at, id)
+    a página custa o mesmo em qualquer profundidade.
+    """
+    query = query.order("created_at", desc=True).order("id", desc=True)
+    if not cursor:
+        return query
+    created_at, row_id = decode_cursor(cursor)
+    # Valores entre aspas: o timestamp tem '.', ':' e '+', reservados no filtro or=
+    ts = json.dumps(created_at)
+    return query.or_(f"created_at.lt.{ts},and(created_at.eq.{ts},id.lt.{row_id})")
+
+
+def split_page(rows: List[Dict[str, Any]], page_size: int) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    # A consulta busca page_size + 1 linhas; a extra só indica que há próxima página
+    if len(rows) <= page_size:
+        return rows, None
+    rows = rows[:page_size]
+    last = rows[-1]
+    return rows, encode_cursor(last["created_at"], last["id"])
+
+
+def count_method(count: Optional[str], cursor: Optional[str]) -> Optional[str]:
+    """
+    Sem `count=` explícito, só a primeira página conta (estimado: exato em
+    conjuntos pequenos, estatística do planner nos grandes); páginas seguintes
+    não contam.
+    """
+    mode = count or ("none" if cursor else "estimated")
+    return None if mode == "none" else mode
+
+
+def paginate(query, page: int, page_size: int, cursor: Optional[str]):
+    """
+    Aplica a paginação de uma listagem, sempre buscando page_size + 1 linhas.
+    Com `cursor` (ou na primeira página) usa keyset; `page` > 1 sem cursor
+    continua por offset, por compatibilidade com clientes antigos.
+    """
+    if cursor or page == 1:
+        return apply_keyset(query, cursor).limit(page_size + 1)
+    from_ = (page - 1) * page_size
+    query = query.order("created_at", desc=True).order("id", desc=True)
+    return query.range(from_, from_ + page_size)
+
+
+# Busca textual: ordem por relevância, com keyset em (rank, created_at, id)
+
+def encode_search_cursor(rank: Any, created_at: Any, row_id: Any) -> str:
+    payload = json.dumps({"r": rank, "c": str(created_at), "i": row_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_search_cursor(cursor: str) -> Tuple[float, str, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        data = json.loads(raw)
+        created_at = datetime.fromisoformat(str(data["c"])).isoformat()
+        return float(data["r"]), created_at, int(data["i"])
+    except (ValueError, KeyError, TypeError):
+        raise InvalidCursor("Cursor inválido.")
+
+
+def split_search_page(rows: List[Dict[str, Any]], page_size: int) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    if len(rows) <= page_size:
+        return rows, None
+    rows = rows[:page_size]
+    last = rows[-1]
+    return rows, encode_search_cursor(last["rank"], last["created_at"], last["id"])
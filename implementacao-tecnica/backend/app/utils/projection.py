@@ -0,0 +1,55 @@
+# Projeção de colunas nas rotas de listagem (fields= / view=summary)
+from typing import Dict, Iterable, List, Optional
+
+# Colunas sempre presentes: identificam a linha e alimentam o cursor
+BASE_COLUMNS = ("id", "created_at")
+
+# Coluna calculada no banco (função preview(tabela) em scripts.sql)
+PREVIEW_COLUMN = "preview"
+
+
+class InvalidFields(ValueError):
+    pass
+
+
+def parse_fields(fields: Optional[str], allowed: Iterable[str]) -> List[str]:
+    requested = [f.strip() for f in (fields or "").split(",") if f.strip()]
+    allowed = set(allowed)
+    unknown = [f for f in requested if f not in allowed]
+    if unknown:
+        raise InvalidFields(
+            f"Campos inválidos: {', '.join(unknown)}. Permitidos: {', '.join(sorted(allowed))}."
+        )
+    return requested
+
+
+def select_columns(columns: Iterable[str], preview: bool = False) -> str:
+    """Monta o `select` do PostgREST (sem duplicatas, na ordem pedida)."""
+    out = list(BASE_COLUMNS)
+    for col in columns:
+        if col not in out:
+            out.append(col)
+    if preview and PREVIEW_COLUMN not in out:
+        out.append(PREVIEW_COLUMN)
+    return ",".join(out)
+
+
+def parse_expand(expand: Optional[str], embeds: Dict[str, str]) -> List[str]:
+    """Converte `expand=a,b` nos recursos embutidos do PostgREST correspondentes."""
+    requested = [e.strip() for e in (expand or "").split(",") if e.strip()]
+    unknown = [e for e in requested if e not in embeds]
+    if unknown:
+        raise InvalidFields(
+            f"Expansões inválidas: {', '.join(unknown)}. Permitidas: {', '.join(sorted(embeds))}."
+        )
+    return [embeds[e] for e in dict.fromkeys(requested)]
+
+
+def embed_alias(embed: str) -> str:
+    # "categoria:categorias(id,nome,cor)" -> "categoria"
+    return embed.split(":", 1)[0].split("(", 1)[0]
+
+
+def project_row(row: Dict, columns: Iterable[str]) -> Dict:
+    """Mantém só as colunas pedidas (para linhas que não vêm de um `select`, ex.: rpc)."""
+    return {col: row.get(col) for col in columns}
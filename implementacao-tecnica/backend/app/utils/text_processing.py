@@ -1,36 +1,386 @@
 # Limpeza e extração de texto
+import asyncio
+import codecs
+import os
 import re
+import signal
+import tempfile
+from concurrent.futures.process import BrokenProcessPool
 from pypdf import PdfReader
 from fastapi import UploadFile
-from typing import Optional
+from fastapi.concurrency import run_in_threadpool
+from functools import lru_cache
+from typing import Iterable, NamedTuple, Optional, Sequence
+
+try:
+    from re import _parser as _sre_parse  # Python 3.11+
+except ImportError:  # pragma: no cover
+    import sre_parse as _sre_parse
+
+from app.core.executors import get_process_pool, recycle_process_pool
+from app.utils.tokens import estimate_tokens
 
 FOOTER_PATTERNS = [
     r"Enviado do meu iPhone",
     r"Enviado do meu Android",
 ]
 
+_FOOTER_RES = [re.compile(p, re.IGNORECASE) for p in FOOTER_PATTERNS]
+_TRAILING_SPACE_RE = re.compile(r"\s+\n")
+_BLANK_LINES_RE = re.compile(r"\n{3,}")
+
+# Rodapés de clientes de e-mail / celular
+_CLIENT_FOOTER_RE = re.compile(
+    r"^[ \t]*(?:Enviado (?:do|de) meu [^\n]{1,40}|Sent from my [^\n]{1,40}"
+    r"|(?:Obter|Baixe) o Outlook para [^\n]{1,20}|Get Outlook for [^\n]{1,20})[ \t]*$",
+    re.IGNORECASE | re.MULTILINE,
+)
+
+# Início do histórico citado: "Em ... escreveu:", "On ... wrote:", cabeçalhos De:/Enviado:
+_REPLY_HEADER_RES = [
+    re.compile(r"^[ \t]*Em [^\n]{0,300}?(?:\n[^\n]{0,300}?)?escreveu:[ \t]*$", re.IGNORECASE | re.MULTILINE),
+    re.compile(r"^[ \t]*On [^\n]{0,300}?(?:\n[^\n]{0,300}?)?wrote:[ \t]*$", re.IGNORECASE | re.MULTILINE),
+    re.compile(
+        r"^[ \t]*-{2,}[ \t]*(?:Mensagem original|Original Message|Mensagem encaminhada"
+        r"|Forwarded message)[ \t]*-{2,}",
+        re.IGNORECASE | re.MULTILINE,
+    ),
+    re.compile(
+        r"^[ \t]*\*?(?:De|From):\*?[ \t][^\n]*\n(?:[^\n]*\n){0,3}?[ \t]*\*?"
+        r"(?:Enviad[oa](?: em)?|Data|Sent|Date):",
+        re.IGNORECASE | re.MULTILINE,
+    ),
+    re.compile(r"^_{20,}[ \t]*$", re.MULTILINE),
+]
+_QUOTED_LINE_RE = re.compile(r"^[ \t]*>[^\n]*(?:\n|$)", re.MULTILINE)
+_SIGNATURE_DELIM_RE = re.compile(r"^-- ?$", re.MULTILINE)
+_PARAGRAPH_SPLIT_RE = re.compile(r"\n[ \t]*\n")
+# Avisos legais: o parágrafo precisa COMEÇAR com a fórmula típica do aviso
+_DISCLAIMER_RES = [
+    re.compile(
+        r"^\W*(?:esta mensagem|este e-?mail|this (?:e-?mail|message))\b.{0,300}?"
+        r"(?:confidencia|destinat[aá]rio|intended (?:solely )?(?:only )?for|privileged|sigilos)",
+        re.IGNORECASE | re.DOTALL,
+    ),
+    re.compile(r"^\W*(?:aviso legal|aviso de confidencialidade|disclaimer)\b", re.IGNORECASE),
+]
+# Avisos maiores que isso não são tratados como rodapé
+DISCLAIMER_MAX_CHARS = 1500
+
+# Trecho mínimo que precisa sobrar antes de um corte (e-mail só com encaminhamento
+# não pode virar vazio)
+MIN_KEPT_CHARS = 20
+
+CLEANING_STEPS = ("quotes", "signature", "disclaimers")
+
+# Tamanho dos blocos lidos do upload (o arquivo nunca é carregado inteiro)
+READ_CHUNK_SIZE = 64 * 1024
+
+# Folga para o próprio worker abortar antes de o processo ser encerrado
+PDF_KILL_GRACE_SECONDS = 1.0
+
+
+class UploadTooLarge(ValueError):
+    pass
+
+
+class ExtractionTimeout(RuntimeError):
+    pass
+
+
 def basic_clean(text: str) -> str:
     t = text.strip()
-    t = re.sub(r"\s+\n", "\n", t)
-    for pat in FOOTER_PATTERNS:
-        t = re.sub(pat, "", t, flags=re.IGNORECASE)
-    t = re.sub(r"\n{3,}", "\n\n", t)
+    t = _TRAILING_SPACE_RE.sub("\n", t)
+    for pat in _FOOTER_RES:
+        t = pat.sub("", t)
+    t = _BLANK_LINES_RE.sub("\n\n", t)
     return t.strip()
 
-def extract_from_pdf(upload: UploadFile) -> str:
-    reader = PdfReader(upload.file)
+
+def stored_content(text: str) -> str:
+    """Forma em que o conteúdo de um e-mail é salvo (criação e edição)."""
+    return basic_clean(text)
+
+
+class CleanResult(NamedTuple):
+    # `text` vai para o modelo; `original` (stored_content) é o que fica salvo
+    text: str
+    original: str
+    bytes_saved: int
+    tokens_saved: int
+
+
+def _has_content(text: str) -> bool:
+    return len(text.strip()) >= MIN_KEPT_CHARS
+
+
+def strip_quoted_thread(text: str) -> str:
+    # Corta no primeiro cabeçalho de resposta com conteúdo real antes dele;
+    # cabeçalhos anteriores (ex.: "Forwarded message") não contam como conteúdo
+    spans = sorted(m.span() for pat in _REPLY_HEADER_RES for m in pat.finditer(text))
+    kept, pos = 0, 0
+    for start, end in spans:
+        if start < pos:
+            continue
+        kept += len(text[pos:start].strip())
+        if kept >= MIN_KEPT_CHARS:
+            text = text[:start]
+            break
+        pos = end
+    without_quotes = _QUOTED_LINE_RE.sub("", text)
+    return without_quotes if _has_content(without_quotes) else text
+
+
+def strip_signature(text: str) -> str:
+    for m in _SIGNATURE_DELIM_RE.finditer(text):
+        if _has_content(text[:m.start()]):
+            text = text[:m.start()]
+            break
+    return _CLIENT_FOOTER_RE.sub("", text)
+
+
+def _is_disclaimer(paragraph: str) -> bool:
+    p = paragraph.strip()
+    return len(p) <= DISCLAIMER_MAX_CHARS and any(r.search(p) for r in _DISCLAIMER_RES)
+
+
+def strip_disclaimers(text: str) -> str:
+    # Só os parágrafos do fim (rodapé); o primeiro nunca é tratado como aviso legal
+    paragraphs = _PARAGRAPH_SPLIT_RE.split(text)
+    end = len(paragraphs)
+    while end > 1 and (not paragraphs[end - 1].strip() or _is_disclaimer(paragraphs[end - 1])):
+        end -= 1
+    return "\n\n".join(paragraphs[:end])
+
+
+class UnsafePatternError(re.error):
+    pass
+
+
+_REPEATS = {_sre_parse.MAX_REPEAT, _sre_parse.MIN_REPEAT}
+_REPEATS |= {getattr(_sre_parse, "POSSESSIVE_REPEAT", _sre_parse.MAX_REPEAT)}
+
+
+def _check_backtracking(items, in_repeat: bool = False) -> None:
+    # Recusa as construções com backtracking exponencial: repetição de tamanho
+    # variável dentro de outra repetição ((a+)+, (a*b?)*) e alternância
+    # repetida ((a|ab)+). Referências a grupos também ficam de fora.
+    for op, av in items:
+        if op in _REPEATS:
+            lo, hi, sub = av
+            if in_repeat and lo != hi:
+                raise UnsafePatternError("quantificadores aninhados não são permitidos")
+            _check_backtracking(sub, in_repeat or hi > 1)
+        elif op is _sre_parse.BRANCH:
+            if in_repeat:
+                raise UnsafePatternError(
+                    "alternância dentro de repetição não é permitida (use uma classe [..])"
+                )
+            for branch in av[1]:
+                _check_backtracking(branch, in_repeat)
+        elif op is _sre_parse.SUBPATTERN:
+            _check_backtracking(av[-1], in_repeat)
+        elif op in (_sre_parse.ASSERT, _sre_parse.ASSERT_NOT):
+            _check_backtracking(av[1], in_repeat)
+        elif op in (_sre_parse.GROUPREF, _sre_parse.GROUPREF_EXISTS):
+            raise UnsafePatternError("referências a grupos não são permitidas")
+        elif op is getattr(_sre_parse, "ATOMIC_GROUP", None):
+            _check_backtracking(av, in_repeat)
+
+
+@lru_cache(maxsize=1024)
+def compile_user_pattern(pattern: str) -> "re.Pattern[str]":
+    """
+    Compila um padrão de usuário. O `re` do Python não pode ser interrompido,
+    então padrões sujeitos a backtracking catastrófico (ReDoS) são recusados
+    com UnsafePatternError (subclasse de re.error).
+    """
+    _check_backtracking(_sre_parse.parse(pattern, re.IGNORECASE | re.MULTILINE))
+    return re.compile(pattern, re.IGNORECASE | re.MULTILINE)
+
+
+class CleaningPipeline:
+    """
+    Limpeza de e-mails antes do LLM: histórico citado, assinatura, avisos
+    legais e padrões extras do usuário, seguida de basic_clean. Todos os
+    padrões fixos são pré-compilados no import.
+    """
+
+    def __init__(self, steps: Iterable[str] = CLEANING_STEPS, extra_patterns: Sequence[str] = ()):
+        self.steps = tuple(steps)
+        self.extra = []
+        for p in extra_patterns:
+            # Padrões inválidos ou inseguros (gravados fora da API) são ignorados
+            try:
+                self.extra.append(compile_user_pattern(p))
+            except re.error:
+                continue
+
+    def clean(self, text: str) -> CleanResult:
+        t = text.replace("\r\n", "\n")
+        if "quotes" in self.steps:
+            t = strip_quoted_thread(t)
+        if "signature" in self.steps:
+            t = strip_signature(t)
+        if "disclaimers" in self.steps:
+            t = strip_disclaimers(t)
+        for pat in self.extra:
+            t = pat.sub("", t)
+        t = basic_clean(t)
+        return CleanResult(
+            text=t,
+            original=stored_content(text),
+            bytes_saved=len(text.encode("utf-8")) - len(t.encode("utf-8")),
+            tokens_saved=estimate_tokens(text) - estimate_tokens(t),
+        )
+
+
+def clean_email(
+    text: str,
+    extra_patterns: Sequence[str] = (),
+    steps: Iterable[str] = CLEANING_STEPS,
+) -> CleanResult:
+    return CleaningPipeline(steps, extra_patterns).clean(text)
+
+
+def _check_size(upload: UploadFile, max_bytes: Optional[int]) -> None:
+    if max_bytes is not None and upload.size is not None and upload.size > max_bytes:
+        raise UploadTooLarge(f"Arquivo maior que o limite de {max_bytes} bytes.")
+
+
+def _extract_pdf(source, max_pages: Optional[int], max_chars: Optional[int]) -> str:
+    # Para em `max_pages` páginas ou assim que `max_chars` caracteres forem coletados
+    reader = PdfReader(source)
     out = []
-    for page in reader.pages:
-        out.append(page.extract_text() or "")
+    collected = 0
+    for i, page in enumerate(reader.pages):
+        if max_pages is not None and i >= max_pages:
+            break
+        text = page.extract_text() or ""
+        out.append(text)
+        collected += len(text)
+        if max_chars is not None and collected >= max_chars:
+            break
     return "\n".join(out).strip()
 
-def extract_from_txt(upload: UploadFile) -> str:
-    return upload.file.read().decode("utf-8", errors="ignore").strip()
 
-def guess_and_extract(upload: UploadFile) -> Optional[str]:
+def _raise_timeout(signum, frame):
+    raise ExtractionTimeout("Tempo limite excedido ao extrair texto do PDF.")
+
+
+def extract_pdf_file(
+    path: str,
+    max_pages: Optional[int] = None,
+    max_chars: Optional[int] = None,
+    timeout: Optional[float] = None,
+) -> str:
+    """
+    Extrai texto de um PDF em disco (executado no pool de processos). Com
+    `timeout`, o próprio worker aborta via SIGALRM (roda na thread principal
+    do processo), liberando-o para o próximo upload.
+    """
+    if not timeout or not hasattr(signal, "setitimer"):
+        return _extract_pdf(path, max_pages, max_chars)
+    previous = signal.signal(signal.SIGALRM, _raise_timeout)
+    signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        return _extract_pdf(path, max_pages, max_chars)
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+def spool_to_disk(upload: UploadFile, max_bytes: Optional[int] = None) -> str:
+    """Copia o upload em blocos para um arquivo temporário (respeitando `max_bytes`)."""
+    _check_size(upload, max_bytes)
+    upload.file.seek(0)
+    fd, path = tempfile.mkstemp(suffix=".pdf")
+    written = 0
+    try:
+        with os.fdopen(fd, "wb") as dst:
+            while True:
+                chunk = upload.file.read(READ_CHUNK_SIZE)
+                if not chunk:
+                    break
+                written += len(chunk)
+                if max_bytes is not None and written > max_bytes:
+                    raise UploadTooLarge(f"Arquivo maior que o limite de {max_bytes} bytes.")
+                dst.write(chunk)
+    except BaseException:
+        os.unlink(path)
+        raise
+    return path
+
+
+def extract_from_txt(
+    upload: UploadFile,
+    max_bytes: Optional[int] = None,
+    max_chars: Optional[int] = None,
+) -> str:
+    _check_size(upload, max_bytes)
+    upload.file.seek(0)
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+    out = []
+    read = collected = 0
+    while True:
+        chunk = upload.file.read(READ_CHUNK_SIZE)
+        if not chunk:
+            out.append(decoder.decode(b"", final=True))
+            break
+        read += len(chunk)
+        if max_bytes is not None and read > max_bytes:
+            raise UploadTooLarge(f"Arquivo maior que o limite de {max_bytes} bytes.")
+        text = decoder.decode(chunk)
+        out.append(text)
+        collected += len(text)
+        # Já há texto suficiente para o orçamento de tokens
+        if max_chars is not None and collected >= max_chars:
+            break
+    return "".join(out).strip()
+
+
+async def extract_upload_async(
+    upload: UploadFile,
+    *,
+    max_bytes: int,
+    max_pages: int,
+    max_chars: int,
+    timeout: float,
+    workers: int,
+) -> Optional[str]:
+    """
+    Extrai o texto de um upload (.txt ou .pdf) com CPU e memória limitados:
+      - .txt: lido em blocos no threadpool, até `max_chars`
+      - .pdf: copiado em blocos para disco e extraído no pool de processos
+        "pdf", com `max_pages`, parada antecipada em `max_chars` e `timeout`
+    O worker aborta sozinho no `timeout`; se nem assim responder (ex.: preso
+    em código C), o pool é reciclado para não ficar ocupado pelos próximos uploads.
+    """
     name = upload.filename.lower()
-    if name.endswith(".pdf"):
-        return extract_from_pdf(upload)
     if name.endswith(".txt"):
-        return extract_from_txt(upload)
-    return None
+        return await run_in_threadpool(extract_from_txt, upload, max_bytes, max_chars)
+    if not name.endswith(".pdf"):
+        return None
+
+    path = await run_in_threadpool(spool_to_disk, upload, max_bytes)
+    try:
+        loop = asyncio.get_running_loop()
+        pool = get_process_pool("pdf", workers)
+        future = loop.run_in_executor(
+            pool,
+            extract_pdf_file,
+            path,
+            max_pages,
+            max_chars,
+            timeout,
+        )
+        try:
+            return await asyncio.wait_for(future, timeout=timeout + PDF_KILL_GRACE_SECONDS)
+        except asyncio.TimeoutError:
+            recycle_process_pool("pdf", pool)
+            raise ExtractionTimeout("Tempo limite excedido ao extrair texto do PDF.")
+        except BrokenProcessPool:
+            # Pool reciclado por causa de outro upload enquanto este rodava
+            raise ExtractionTimeout("Extração do PDF interrompida; tente novamente.")
+    finally:
+        os.unlink(path)
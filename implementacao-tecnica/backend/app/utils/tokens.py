@@ -0,0 +1,31 @@
+# Estimativa local de tokens (sem rede)
+import math
+
+# Média observada de caracteres por token em textos em português
+CHARS_PER_TOKEN = 4.0
+
+TRUNCATION_MARKER = "\n\n[... trecho omitido ...]\n\n"
+
+
+def estimate_tokens(text: str) -> int:
+    if not text:
+        return 0
+    return int(math.ceil(len(text) / CHARS_PER_TOKEN))
+
+
+def estimate_messages_tokens(messages: list) -> int:
+    # ~4 tokens de overhead por mensagem no formato de chat
+    return sum(estimate_tokens(m.get("content") or "") + 4 for m in messages)
+
+
+def truncate_head_tail(text: str, max_tokens: int, head_ratio: float = 0.7) -> str:
+    """
+    Corta textos acima de `max_tokens` mantendo o começo e o fim (onde costumam
+    estar o pedido e a assinatura/contexto), com um marcador no meio.
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    max_chars = max(int(max_tokens * CHARS_PER_TOKEN) - len(TRUNCATION_MARKER), 0)
+    head = int(max_chars * head_ratio)
+    tail = max_chars - head
+    return text[:head].rstrip() + TRUNCATION_MARKER + (text[-tail:].lstrip() if tail else "")
@@ -0,0 +1,94 @@
+"""
+Benchmark de login sob carga.
+
+Dispara logins concorrentes em /auth/token e, ao mesmo tempo, mede a latência
+de uma rota de e-mails com um token válido. Serve para comparar o hash de senha
+no threadpool vs. no pool de processos dedicado.
+
+Uso (com a API rodando):
+    python -m benchmarks.bench_auth --base-url http://localhost:8000 \
+        --email user@exemplo.com --password segredo --concurrency 50 --duration 20
+"""
+import argparse
+import asyncio
+import json
+import time
+from typing import Dict, List
+
+import httpx
+
+from benchmarks.common import percentiles
+
+
+async def login_worker(client: httpx.AsyncClient, args, deadline: float, out: List[float], errors: List[int]):
+    form = {"username": args.email, "password": args.password}
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        resp = await client.post("/auth/token", data=form)
+        elapsed = time.perf_counter() - start
+        if resp.status_code == 200:
+            out.append(elapsed)
+        else:
+            errors.append(resp.status_code)
+
+
+async def probe_worker(client: httpx.AsyncClient, args, token: str, deadline: float, out: List[float]):
+    headers = {"Authorization": f"Bearer {token}"}
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        await client.get(args.probe_path, headers=headers)
+        out.append(time.perf_counter() - start)
+        await asyncio.sleep(args.probe_interval)
+
+
+async def main(args) -> Dict:
+    limits = httpx.Limits(max_connections=args.concurrency + 10)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=60) as client:
+        resp = await client.post(
+            "/auth/token", data={"username": args.email, "password": args.password}
+        )
+        resp.raise_for_status()
+        token = resp.json()["access_token"]
+
+        # Linha de base da rota de e-mails sem carga de login
+        baseline: List[float] = []
+        await probe_worker(client, args, token, time.perf_counter() + args.baseline, baseline)
+
+        logins: List[float] = []
+        errors: List[int] = []
+        under_load: List[float] = []
+        deadline = time.perf_counter() + args.duration
+        await asyncio.gather(
+            probe_worker(client, args, token, deadline, under_load),
+            *(login_worker(client, args, deadline, logins, errors) for _ in range(args.concurrency)),
+        )
+
+    return {
+        "concurrency": args.concurrency,
+        "duration_s": args.duration,
+        "login": {**percentiles(logins), "throughput_rps": len(logins) / args.duration},
+        "login_errors": {str(code): errors.count(code) for code in sorted(set(errors))},
+        "probe_baseline": percentiles(baseline),
+        "probe_under_login_load": percentiles(under_load),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--email", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--baseline", type=float, default=5.0)
+    parser.add_argument("--probe-path", default="/emails/?page_size=10")
+    parser.add_argument("--probe-interval", type=float, default=0.05)
+    parser.add_argument("--output", help="arquivo JSON para salvar o resultado")
+    args = parser.parse_args()
+
+    result = asyncio.run(main(args))
+    text = json.dumps(result, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
@@ -0,0 +1,92 @@
+"""
+Benchmark da limpeza de e-mails.
+
+Gera e-mails sintéticos com histórico citado, assinatura e aviso legal em
+tamanhos crescentes e mede o throughput (MB/s) de basic_clean e do pipeline
+completo (clean_email), além dos bytes/tokens economizados.
+
+Uso:
+    python -m benchmarks.bench_cleaning --sizes 10000,100000,1000000 --repeat 20
+"""
+import argparse
+import json
+import statistics
+import time
+from typing import Dict, List
+
+from app.utils.text_processing import basic_clean, clean_email
+
+BODY = (
+    "Olá, equipe de suporte.\n\n"
+    "Gostaria de saber o status do pedido 48213, que ainda não foi entregue. "
+    "Consegui acompanhar o rastreio até ontem, mas hoje não aparece nenhuma atualização.\n\n"
+    "Obrigado,\nMaria\n"
+)
+SIGNATURE = "-- \nMaria Souza | Compras\nEmpresa Exemplo Ltda.\nTel: (11) 5555-0000\n\n"
+DISCLAIMER = (
+    "AVISO LEGAL: Esta mensagem pode conter informação confidencial e é destinada "
+    "exclusivamente ao destinatário. Se você a recebeu por engano, apague-a.\n\n"
+)
+REPLY = (
+    "Em seg., 10 de nov. de 2025 às 09:12, Suporte <suporte@exemplo.com> escreveu:\n"
+    "> Prezada Maria, seu pedido foi despachado e deve chegar em até 5 dias úteis.\n"
+    "> Qualquer dúvida, estamos à disposição.\n>\n"
+)
+
+
+def build_email(size: int) -> str:
+    # Corpo + assinatura + aviso, seguidos de um histórico citado até `size` caracteres
+    parts = [BODY, SIGNATURE, DISCLAIMER]
+    total = sum(len(p) for p in parts)
+    while total < size:
+        parts.append(REPLY)
+        total += len(REPLY)
+    return "".join(parts)[:size]
+
+
+def measure(fn, text: str, repeat: int) -> Dict[str, float]:
+    samples: List[float] = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(text)
+        samples.append(time.perf_counter() - start)
+    mean = statistics.fmean(samples)
+    return {
+        "mean_ms": mean * 1000,
+        "min_ms": min(samples) * 1000,
+        "mb_per_s": len(text.encode("utf-8")) / mean / 1e6 if mean else 0.0,
+    }
+
+
+def main(args) -> Dict:
+    results = []
+    for size in args.sizes:
+        text = build_email(size)
+        cleaned = clean_email(text)
+        results.append({
+            "size_chars": len(text),
+            "basic_clean": measure(basic_clean, text, args.repeat),
+            "clean_email": measure(clean_email, text, args.repeat),
+            "bytes_saved": cleaned.bytes_saved,
+            "tokens_saved": cleaned.tokens_saved,
+        })
+    return {"repeat": args.repeat, "results": results}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        "--sizes",
+        type=lambda s: [int(x) for x in s.split(",") if x],
+        default=[10_000, 100_000, 1_000_000],
+    )
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--output", help="arquivo JSON para salvar o resultado")
+    args = parser.parse_args()
+
+    result = main(args)
+    text = json.dumps(result, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
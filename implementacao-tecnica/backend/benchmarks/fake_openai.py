@@ -0,0 +1,134 @@
+"""
+Servidor falso de chat completions (compatível com o SDK da OpenAI) para
+benchmarks, com latência e jitter configuráveis.
+
+Responde um JSON no formato esperado pela API (assunto/resposta/categoria_id),
+escolhendo a primeira categoria listada no system prompt. Suporta `stream`
+(com `include_usage`).
+
+Uso:
+    python -m benchmarks.fake_openai --port 8901 --latency-ms 400 --jitter-ms 150
+"""
+import argparse
+import asyncio
+import json
+import random
+import re
+import time
+import uuid
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+_CATEGORY_ID_RE = re.compile(r"ID: (\w+)")
+
+app = FastAPI()
+app.state.latency = 0.4
+app.state.jitter = 0.15
+app.state.rng = random.Random(0)
+
+
+def _pick_category(body: dict) -> str:
+    # Com JSON schema (structured outputs), usa o enum de IDs; senão, o prompt
+    fmt = body.get("response_format") or {}
+    schema = (fmt.get("json_schema") or {}).get("schema") or {}
+    enum = ((schema.get("properties") or {}).get("categoria_id") or {}).get("enum")
+    if enum:
+        return str(enum[0])
+    system = next((m["content"] for m in body.get("messages", []) if m["role"] == "system"), "")
+    match = _CATEGORY_ID_RE.search(system)
+    return match.group(1) if match else "1"
+
+
+def _usage(body: dict, content: str) -> dict:
+    prompt_chars = sum(len(m.get("content") or "") for m in body.get("messages", []))
+    prompt_tokens = prompt_chars // 4
+    completion_tokens = len(content) // 4
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+    }
+
+
+async def _delay() -> None:
+    jitter = app.state.rng.uniform(-app.state.jitter, app.state.jitter)
+    await asyncio.sleep(max(app.state.latency + jitter, 0.0))
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    content = json.dumps(
+        {
+            "assunto": "Re: sua solicitação",
+            "resposta": "Olá! Recebemos sua mensagem e vamos analisar o pedido. "
+                        "Retornaremos assim que possível com uma atualização.",
+            "categoria_id": _pick_category(body),
+        },
+        ensure_ascii=False,
+    )
+    completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+    created = int(time.time())
+    model = body.get("model", "fake")
+
+    if not body.get("stream"):
+        await _delay()
+        return JSONResponse({
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": _usage(body, content),
+        })
+
+    include_usage = (body.get("stream_options") or {}).get("include_usage", False)
+
+    async def events():
+        # Latência até o primeiro token e o restante espalhado pelos chunks
+        await _delay()
+        step = max(len(content) // 8, 1)
+        for i in range(0, len(content), step):
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": {"content": content[i:i + step]}, "finish_reason": None}],
+            }
+            yield f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+            await asyncio.sleep(0.005)
+        if include_usage:
+            usage_chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [],
+                "usage": _usage(body, content),
+            }
+            yield f"data: {json.dumps(usage_chunk)}\n\n"
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8901)
+    parser.add_argument("--latency-ms", type=float, default=400.0)
+    parser.add_argument("--jitter-ms", type=float, default=150.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    app.state.latency = args.latency_ms / 1000
+    app.state.jitter = args.jitter_ms / 1000
+    app.state.rng = random.Random(args.seed)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
@@ -0,0 +1,412 @@
+"""
+Camada de tabelas em memória com a mesma interface (parcial) do cliente
+Supabase/postgrest-py usada pela API: select/insert/update/delete, filtros
+eq/neq/gt/gte/lt/lte/is_/in_/not_/or_, order, limit, range, single,
+contagem, recursos embutidos ("alias:tabela(colunas)") e as funções (rpc)
+de scripts.sql usadas pela API, reimplementadas em Python.
+
+Só para benchmarks: sem índices, sem transações, sem RLS.
+"""
+import re
+import threading
+import uuid
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from postgrest.exceptions import APIError
+
+# Tabelas cuja chave primária é uuid (as demais usam inteiro sequencial)
+UUID_TABLES = {"users"}
+
+# Colunas calculadas (funções do banco expostas como coluna pelo PostgREST)
+COMPUTED_COLUMNS = {
+    "preview": lambda row: (row.get("conteudo") or "")[:200],
+}
+
+
+class FakeResponse:
+    def __init__(self, data: Any, count: Optional[int] = None):
+        self.data = data
+        self.count = count
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="microseconds")
+
+
+def _coerce(value: Any) -> Any:
+    if isinstance(value, (int, float)) or value is None:
+        return value
+    text = str(value)
+    try:
+        return int(text)
+    except ValueError:
+        pass
+    try:
+        return datetime.fromisoformat(text)
+    except ValueError:
+        return text
+
+
+def _compare(a: Any, b: Any) -> int:
+    a, b = _coerce(a), _coerce(b)
+    try:
+        return (a > b) - (a < b)
+    except TypeError:
+        a, b = str(a), str(b)
+        return (a > b) - (a < b)
+
+
+def _match(row: Dict[str, Any], column: str, op: str, value: Any) -> bool:
+    current = row.get(column)
+    if op == "is":
+        return current is None if str(value).lower() == "null" else current is _coerce(value)
+    if op == "in":
+        return any(_compare(current, v) == 0 for v in value)
+    if current is None:
+        return False
+    if op in ("like", "ilike"):
+        pattern = str(value).replace("%", "").replace("*", "")
+        if op == "ilike":
+            return pattern.lower() in str(current).lower()
+        return pattern in str(current)
+    cmp = _compare(current, value)
+    return {
+        "eq": cmp == 0,
+        "neq": cmp != 0,
+        "gt": cmp > 0,
+        "gte": cmp >= 0,
+        "lt": cmp < 0,
+        "lte": cmp <= 0,
+    }[op]
+
+
+def _split_top_level(text: str) -> List[str]:
+    parts, depth, quoted, buf = [], 0, False, []
+    for ch in text:
+        if ch == '"':
+            quoted = not quoted
+        elif not quoted and ch == "(":
+            depth += 1
+        elif not quoted and ch == ")":
+            depth -= 1
+        elif not quoted and ch == "," and depth == 0:
+            parts.append("".join(buf))
+            buf = []
+            continue
+        buf.append(ch)
+    if buf:
+        parts.append("".join(buf))
+    return parts
+
+
+def _parse_logic(expr: str):
+    """Converte a sintaxe de or=/and= do PostgREST em uma função row -> bool."""
+    expr = expr.strip()
+    for kind in ("and", "or"):
+        if expr.startswith(kind + "(") and expr.endswith(")"):
+            subs = [_parse_logic(p) for p in _split_top_level(expr[len(kind) + 1:-1])]
+            if kind == "and":
+                return lambda row: all(f(row) for f in subs)
+            return lambda row: any(f(row) for f in subs)
+    column, op, value = expr.split(".", 2)
+    negate = False
+    if op == "not":
+        negate = True
+        op, value = value.split(".", 1)
+    if value.startswith('"') and value.endswith('"'):
+        value = value[1:-1]
+
+    def _f(row):
+        result = _match(row, column, op, value)
+        return not result if negate else result
+
+    return _f
+
+
+class FakeQuery:
+    def __init__(self, db: "FakeSupabase", table: str):
+        self.db = db
+        self.table_name = table
+        self.op = "select"
+        self.columns = "*"
+        self.count_method: Optional[str] = None
+        self.payload: Any = None
+        self.filters: List = []
+        self.orders: List[Tuple[str, bool]] = []
+        self.limit_: Optional[int] = None
+        self.offset = 0
+        self.single_ = False
+        self.maybe_single_ = False
+        self._negate_next = False
+
+    # ---- operação ----
+    def select(self, *columns: str, count: Optional[str] = None) -> "FakeQuery":
+        self.columns = ",".join(columns) if columns else "*"
+        self.count_method = getattr(count, "value", count)
+        return self
+
+    def insert(self, rows: Any, **_) -> "FakeQuery":
+        self.op, self.payload = "insert", rows
+        return self
+
+    def update(self, data: Dict[str, Any], **_) -> "FakeQuery":
+        self.op, self.payload = "update", data
+        return self
+
+    def delete(self, **_) -> "FakeQuery":
+        self.op = "delete"
+        return self
+
+    # ---- filtros ----
+    @property
+    def not_(self) -> "FakeQuery":
+        self._negate_next = True
+        return self
+
+    def _filter(self, column: str, op: str, value: Any) -> "FakeQuery":
+        negate, self._negate_next = self._negate_next, False
+
+        def _f(row):
+            result = _match(row, column, op, value)
+            return not result if negate else result
+
+        self.filters.append(_f)
+        return self
+
+    def eq(self, column, value):
+        return self._filter(column, "eq", value)
+
+    def neq(self, column, value):
+        return self._filter(column, "neq", value)
+
+    def gt(self, column, value):
+        return self._filter(column, "gt", value)
+
+    def gte(self, column, value):
+        return self._filter(column, "gte", value)
+
+    def lt(self, column, value):
+        return self._filter(column, "lt", value)
+
+    def lte(self, column, value):
+        return self._filter(column, "lte", value)
+
+    def is_(self, column, value):
+        return self._filter(column, "is", value)
+
+    def in_(self, column, values):
+        return self._filter(column, "in", list(values))
+
+    def ilike(self, column, pattern):
+        return self._filter(column, "ilike", pattern)
+
+    def like(self, column, pattern):
+        return self._filter(column, "like", pattern)
+
+    def or_(self, filters: str, reference_table: Optional[str] = None) -> "FakeQuery":
+        self.filters.append(_parse_logic(f"or({filters})"))
+        return self
+
+    # ---- ordenação / paginação ----
+    def order(self, column: str, *, desc: bool = False, nullsfirst: bool = False, foreign_table=None):
+        self.orders.append((column, desc))
+        return self
+
+    def limit(self, size: int, *, foreign_table=None) -> "FakeQuery":
+        self.limit_ = size
+        return self
+
+    def range(self, start: int, end: int, foreign_table=None) -> "FakeQuery":
+        self.offset, self.limit_ = start, end - start + 1
+        return self
+
+    def single(self) -> "FakeQuery":
+        self.single_ = True
+        return self
+
+    def maybe_single(self) -> "FakeQuery":
+        self.maybe_single_ = True
+        return self
+
+    # ---- execução ----
+    def execute(self) -> FakeResponse:
+        with self.db.lock:
+            return getattr(self, f"_exec_{self.op}")()
+
+    def _matching(self) -> List[Dict[str, Any]]:
+        return [r for r in self.db.tables[self.table_name] if all(f(r) for f in self.filters)]
+
+    def _exec_select(self) -> FakeResponse:
+        rows = self._matching()
+        for column, desc in reversed(self.orders):
+            rows.sort(key=lambda r: (r.get(column) is None, _coerce(r.get(column))), reverse=desc)
+        count = len(rows) if self.count_method else None
+        end = None if self.limit_ is None else self.offset + self.limit_
+        rows = [self.db.project(self.table_name, r, self.columns) for r in rows[self.offset:end]]
+        if self.single_ or self.maybe_single_:
+            if len(rows) != 1:
+                if self.maybe_single_ and not rows:
+                    return FakeResponse(None, count)
+                raise APIError({
+                    "message": "JSON object requested, multiple (or no) rows returned",
+                    "code": "PGRST116",
+                })
+            return FakeResponse(rows[0], count)
+        return FakeResponse(rows, count)
+
+    def _exec_insert(self) -> FakeResponse:
+        rows = self.payload if isinstance(self.payload, list) else [self.payload]
+        created = []
+        for data in rows:
+            row = dict(data)
+            row.setdefault("id", self.db.next_id(self.table_name))
+            row.setdefault("created_at", _now())
+            row.setdefault("updated_at", row["created_at"])
+            self.db.tables[self.table_name].append(row)
+            created.append(dict(row))
+        return FakeResponse(created)
+
+    def _exec_update(self) -> FakeResponse:
+        rows = self._matching()
+        for row in rows:
+            row.update(self.payload)
+        return FakeResponse([dict(r) for r in rows])
+
+    def _exec_delete(self) -> FakeResponse:
+        rows = self._matching()
+        ids = {id(r) for r in rows}
+        self.db.tables[self.table_name] = [r for r in self.db.tables[self.table_name] if id(r) not in ids]
+        return FakeResponse([dict(r) for r in rows])
+
+
+def _in_range(row: Dict[str, Any], start: Optional[str], end: Optional[str]) -> bool:
+    created = _coerce(row.get("created_at"))
+    if start is not None and created < _coerce(start):
+        return False
+    if end is not None and created >= _coerce(end):
+        return False
+    return True
+
+
+def _rpc_email_stats(db: "FakeSupabase", params: Dict[str, Any]) -> Dict[str, Any]:
+    rows = [
+        r for r in db.tables["emails"]
+        if _compare(r.get("user_id"), params["p_user_id"]) == 0
+        and _in_range(r, params.get("p_from"), params.get("p_to"))
+    ]
+    week = params.get("p_bucket") == "week"
+
+    def _period(row):
+        day = _coerce(row["created_at"]).replace(hour=0, minute=0, second=0, microsecond=0)
+        return day - timedelta(days=day.weekday()) if week else day
+
+    def _counts(key, values):
+        return [{key: k, "count": n} for k, n in Counter(values).most_common()]
+
+    periods = Counter(_period(r) for r in rows)
+    return {
+        "total": len(rows),
+        "by_category": _counts("categoria_id", (r.get("categoria_id") for r in rows)),
+        "by_score": _counts("score_id", (r.get("score_id") for r in rows)),
+        "by_period": [{"period": p.isoformat(), "count": periods[p]} for p in sorted(periods)],
+    }
+
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def _search(db: "FakeSupabase", table: str, params: Dict[str, Any], weights: Dict[str, float], filters) -> List[Dict[str, Any]]:
+    # Aproximação da busca do Postgres: todos os termos presentes, rank pela frequência ponderada
+    terms = [t.lower() for t in _WORD_RE.findall(params.get("p_query") or "")]
+    hits = []
+    for row in db.tables[table]:
+        if _compare(row.get("user_id"), params["p_user_id"]) != 0:
+            continue
+        if any(params.get(f"p_{f}") is not None and _compare(row.get(f), params[f"p_{f}"]) != 0 for f in filters):
+            continue
+        words = {col: _WORD_RE.findall((row.get(col) or "").lower()) for col in weights}
+        if not terms or not all(any(t in w for w in words.values()) for t in terms):
+            continue
+        rank = sum(weights[col] * words[col].count(t) for col in weights for t in terms)
+        hits.append((round(rank, 4), _coerce(row["created_at"]), row["id"], row))
+
+    if params.get("p_rank") is not None:
+        after = (params["p_rank"], _coerce(params["p_created_at"]), params["p_id"])
+        hits = [h for h in hits if h[:3] < after]
+    hits.sort(key=lambda h: h[:3], reverse=True)
+    offset = params.get("p_offset") or 0
+    page = hits[offset:offset + (params.get("p_limit") or 20)]
+    return [{**row, "rank": rank, "preview": COMPUTED_COLUMNS["preview"](row)} for rank, _, _, row in page]
+
+
+def _rpc_search_emails(db: "FakeSupabase", params: Dict[str, Any]) -> List[Dict[str, Any]]:
+    rows = _search(db, "emails", params, {"assunto": 1.0, "conteudo": 0.4, "resposta": 0.2}, ("categoria_id", "score_id"))
+    for row in rows:
+        row.update(db.project("emails", row, "categoria:categorias(id,nome,cor),score:scores(id,classificacao)"))
+    return rows
+
+
+def _rpc_search_examples(db: "FakeSupabase", params: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return _search(db, "examples", params, {"conteudo": 1.0, "resposta": 0.4}, ("categoria_id",))
+
+
+RPC_FUNCTIONS = {
+    "email_stats": _rpc_email_stats,
+    "search_emails": _rpc_search_emails,
+    "search_examples": _rpc_search_examples,
+}
+
+
+class FakeRpc:
+    def __init__(self, db: "FakeSupabase", name: str, params: Dict[str, Any]):
+        self.db, self.name, self.params = db, name, params
+
+    def execute(self) -> FakeResponse:
+        fn = RPC_FUNCTIONS.get(self.name)
+        if fn is None:
+            raise APIError({"message": f"function {self.name} does not exist", "code": "PGRST202"})
+        with self.db.lock:
+            return FakeResponse(fn(self.db, self.params))
+
+
+class FakeSupabase:
+    """Substituto de `supabase.Client` com tabelas em memória (thread-safe)."""
+
+    def __init__(self):
+        self.tables: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        self._ids: Dict[str, int] = defaultdict(int)
+        self.lock = threading.RLock()
+
+    def table(self, name: str) -> FakeQuery:
+        return FakeQuery(self, name)
+
+    def rpc(self, name: str, params: Optional[Dict[str, Any]] = None) -> FakeRpc:
+        return FakeRpc(self, name, params or {})
+
+    def next_id(self, table: str) -> Any:
+        if table in UUID_TABLES:
+            return str(uuid.uuid4())
+        self._ids[table] += 1
+        return self._ids[table]
+
+    def project(self, table: str, row: Dict[str, Any], columns: str) -> Dict[str, Any]:
+        out: Dict[str, Any] = {}
+        for col in _split_top_level(columns):
+            col = col.strip()
+            if col == "*":
+                out.update(row)
+            elif "(" in col:
+                # alias:tabela(colunas) resolvido pela coluna <alias>_id
+                head, inner = col[:-1].split("(", 1)
+                alias, _, target = head.partition(":")
+                target = target or alias
+                fk = row.get(f"{alias}_id")
+                ref = next((r for r in self.tables[target] if _compare(r.get("id"), fk) == 0), None)
+                out[alias] = self.project(target, ref, inner) if ref is not None else None
+            elif col in COMPUTED_COLUMNS:
+                out[col] = COMPUTED_COLUMNS[col](row)
+            else:
+                out[col] = row.get(col)
+        return out
@@ -0,0 +1,244 @@
+"""
+Suíte de benchmarks reproduzível, sem Supabase nem OpenAI reais.
+
+Sobe dois processos locais:
+  - benchmarks.fake_openai: chat completions falso com latência/jitter
+  - benchmarks.serve: a API com as tabelas em memória
+cria um usuário com categorias, exemplos e e-mails, e roda cada cenário
+com concorrência fixa, medindo latência (p50/p95/p99) e throughput.
+
+O resultado (com o commit atual) vai para um JSON, para comparar execuções:
+    python -m benchmarks.harness --concurrency 16 --duration 15 \
+        --llm-latency-ms 400 --llm-jitter-ms 150 --output bench-results.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List
+
+import httpx
+
+from benchmarks.common import percentiles
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+EMAIL_TEMPLATE = (
+    "Olá, tudo bem?\n\nGostaria de saber o status do pedido {n}. "
+    "O prazo informado já passou e ainda não recebi nenhuma atualização.\n\nObrigado."
+)
+
+CATEGORIES = [
+    ("Financeiro", "Boletos, cobranças e reembolsos"),
+    ("Suporte", "Problemas técnicos e dúvidas de uso"),
+    ("Outros", "Assuntos que não se encaixam nas demais"),
+]
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def start_process(module: str, *args: str, env: Dict[str, str]) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, "-m", module, *args],
+        cwd=BACKEND_DIR,
+        env={**os.environ, **env},
+    )
+
+
+async def wait_ready(url: str, timeout: float = 30.0) -> None:
+    deadline = time.perf_counter() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.perf_counter() < deadline:
+            try:
+                await client.get(url)
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.2)
+    raise RuntimeError(f"Serviço não respondeu a tempo: {url}")
+
+
+async def seed(client: httpx.AsyncClient, args) -> Dict[str, str]:
+    """Cria usuário, categorias, exemplos e e-mails pela própria API."""
+    user = {"name": "Bench", "email": "bench@example.com", "password": "bench-password"}
+    resp = await client.post("/auth/register", json=user)
+    resp.raise_for_status()
+    resp = await client.post("/auth/token", data={"username": user["email"], "password": user["password"]})
+    resp.raise_for_status()
+    headers = {"Authorization": f"Bearer {resp.json()['access_token']}"}
+
+    category_ids = []
+    for nome, descricao in CATEGORIES:
+        resp = await client.post("/categories/", json={"nome": nome, "descricao": descricao}, headers=headers)
+        resp.raise_for_status()
+        category_ids.append(resp.json()["id"])
+
+    for i in range(args.seed_examples):
+        payload = {
+            "conteudo": EMAIL_TEMPLATE.format(n=f"EX-{i}"),
+            "resposta": "Vamos verificar o pedido e retornamos em breve.",
+            "categoria_id": category_ids[i % len(category_ids)],
+        }
+        resp = await client.post("/examples/", json=payload, headers=headers)
+        resp.raise_for_status()
+
+    # E-mails criados em lote (passam pelo LLM falso)
+    for start in range(0, args.seed_emails, 20):
+        batch = [EMAIL_TEMPLATE.format(n=f"SEED-{i}") for i in range(start, min(start + 20, args.seed_emails))]
+        resp = await client.post("/emails/batch", data={"conteudos": batch}, headers=headers)
+        resp.raise_for_status()
+
+    return {"headers": headers, "email": user["email"], "password": user["password"]}
+
+
+def scenarios(ctx: Dict) -> Dict[str, Callable[[httpx.AsyncClient, int], Awaitable[httpx.Response]]]:
+    headers = ctx["headers"]
+    login = {"username": ctx["email"], "password": ctx["password"]}
+    # Conteúdo único por requisição: sem hits no cache de respostas
+    run_id = int(time.time())
+
+    return {
+        "auth_login": lambda c, i: c.post("/auth/token", data=login),
+        "auth_me": lambda c, i: c.get("/auth/me", headers=headers),
+        "categories_list": lambda c, i: c.get("/categories/", headers=headers),
+        "examples_list": lambda c, i: c.get("/examples/?page_size=20", headers=headers),
+        "emails_list": lambda c, i: c.get("/emails/?page_size=20", headers=headers),
+        "emails_list_summary": lambda c, i: c.get("/emails/?page_size=50&view=summary", headers=headers),
+        "emails_stats": lambda c, i: c.get("/emails/stats?bucket=week", headers=headers),
+        "emails_search": lambda c, i: c.get("/emails/?q=pedido%20prazo&page_size=20", headers=headers),
+        "emails_create": lambda c, i: c.post(
+            "/emails/",
+            data={"conteudo": EMAIL_TEMPLATE.format(n=f"{run_id}-{i}")},
+            headers=headers,
+        ),
+    }
+
+
+async def run_scenario(
+    client: httpx.AsyncClient,
+    request: Callable[[httpx.AsyncClient, int], Awaitable[httpx.Response]],
+    concurrency: int,
+    duration: float,
+) -> Dict:
+    latencies: List[float] = []
+    errors: Dict[str, int] = {}
+    counter = iter(range(10 ** 9))
+    deadline = time.perf_counter() + duration
+
+    async def worker():
+        while time.perf_counter() < deadline:
+            i = next(counter)
+            start = time.perf_counter()
+            try:
+                resp = await request(client, i)
+                status = resp.status_code
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            elapsed = time.perf_counter() - start
+            if isinstance(status, int) and status < 400:
+                latencies.append(elapsed)
+            else:
+                errors[str(status)] = errors.get(str(status), 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - started
+    return {
+        **percentiles(latencies),
+        "throughput_rps": len(latencies) / wall if wall else 0.0,
+        "errors": errors,
+    }
+
+
+async def main(args) -> Dict:
+    app_url = f"http://127.0.0.1:{args.app_port}"
+    openai_url = f"http://127.0.0.1:{args.openai_port}"
+    env = {
+        "OPENAI_BASE_URL": f"{openai_url}/v1",
+        "RESPONSE_CACHE_ENABLED": "true" if args.response_cache else "false",
+        "LOCAL_CLASSIFIER_MODE": args.local_classifier_mode,
+        "JOB_DB_PATH": str(BACKEND_DIR / "bench-jobs.sqlite3"),
+    }
+    procs = [
+        start_process(
+            "benchmarks.fake_openai",
+            "--port", str(args.openai_port),
+            "--latency-ms", str(args.llm_latency_ms),
+            "--jitter-ms", str(args.llm_jitter_ms),
+            "--seed", str(args.seed),
+            env=env,
+        ),
+        start_process("benchmarks.serve", "--port", str(args.app_port), env=env),
+    ]
+    try:
+        await wait_ready(f"{openai_url}/docs")
+        await wait_ready(f"{app_url}/health")
+
+        limits = httpx.Limits(max_connections=args.concurrency + 10)
+        async with httpx.AsyncClient(base_url=app_url, limits=limits, timeout=120) as client:
+            ctx = await seed(client, args)
+            available = scenarios(ctx)
+            selected = args.scenarios or list(available)
+            results = {}
+            for name in selected:
+                results[name] = await run_scenario(client, available[name], args.concurrency, args.duration)
+                print(f"{name}: {json.dumps(results[name])}", file=sys.stderr)
+    finally:
+        for proc in procs:
+            proc.terminate()
+        for proc in procs:
+            proc.wait(timeout=10)
+
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "concurrency": args.concurrency,
+            "duration_s": args.duration,
+            "llm_latency_ms": args.llm_latency_ms,
+            "llm_jitter_ms": args.llm_jitter_ms,
+            "response_cache": args.response_cache,
+            "local_classifier_mode": args.local_classifier_mode,
+            "seed_examples": args.seed_examples,
+            "seed_emails": args.seed_emails,
+        },
+        "scenarios": results,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=15.0, help="segundos por cenário")
+    parser.add_argument("--scenarios", type=lambda s: [x for x in s.split(",") if x], default=None)
+    parser.add_argument("--llm-latency-ms", type=float, default=400.0)
+    parser.add_argument("--llm-jitter-ms", type=float, default=150.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--seed-examples", type=int, default=30)
+    parser.add_argument("--seed-emails", type=int, default=200)
+    parser.add_argument("--response-cache", action="store_true")
+    parser.add_argument("--local-classifier-mode", default="off")
+    parser.add_argument("--app-port", type=int, default=8900)
+    parser.add_argument("--openai-port", type=int, default=8901)
+    parser.add_argument("--output", help="arquivo JSON para salvar o resultado")
+    args = parser.parse_args()
+
+    result = asyncio.run(main(args))
+    text = json.dumps(result, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
@@ -0,0 +1,48 @@
+"""
+Sobe a API com o Supabase substituído pela camada em memória
+(benchmarks.fake_supabase). O OpenAI é apontado por OPENAI_BASE_URL
+(ex.: para benchmarks.fake_openai).
+
+Uso:
+    OPENAI_BASE_URL=http://127.0.0.1:8901/v1 python -m benchmarks.serve --port 8900
+"""
+import argparse
+import os
+
+import uvicorn
+
+from benchmarks.fake_supabase import FakeSupabase
+
+# Valores mínimos para get_settings(); nada aqui aponta para serviços reais
+BENCH_ENV = {
+    "SUPABASE_URL": "http://supabase.invalid",
+    "SUPABASE_SERVICE_ROLE_KEY": "bench",
+    "JWT_SECRET_KEY": "bench-secret",
+    "OPENAI_API_KEY": "bench",
+    "JOB_WORKERS": "0",
+}
+
+
+def build_app():
+    for key, value in BENCH_ENV.items():
+        os.environ.setdefault(key, value)
+
+    # Todas as rotas (e os workers) obtêm o cliente via get_supabase_client,
+    # que chama create_client uma única vez
+    import app.db.supabase as db
+
+    fake = FakeSupabase()
+    db.create_client = lambda url, key: fake
+
+    from app.main import app
+
+    return app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    args = parser.parse_args()
+
+    uvicorn.run(build_app(), host=args.host, port=args.port, log_level="warning")
@@ -11,3 +11,166 @@ create table if not exists public.emails (
   created_at timestamptz not null default now(),
   updated_at timestamptz not null default now()
 );
+
+-- Tokens consumidos na geração de cada e-mail (prompt / resposta do modelo)
+alter table public.emails add column if not exists prompt_tokens integer;
+alter table public.emails add column if not exists completion_tokens integer;
+
+-- Job da fila (POST /emails/jobs) que gravou o e-mail: nova tentativa não duplica a linha
+alter table public.emails add column if not exists job_id text;
+create unique index if not exists emails_job_id_key on public.emails (job_id) where job_id is not null;
+
+-- Padrões extras de limpeza (regex) definidos por cada usuário
+create table if not exists public.padroes_limpeza (
+  id bigserial primary key,
+  user_id uuid not null,
+  padrao text not null,
+  descricao text,
+  created_at timestamptz not null default now()
+);
+create index if not exists padroes_limpeza_user_idx on public.padroes_limpeza (user_id);
+
+-- Paginação por cursor (keyset) em (created_at, id) por usuário
+create index if not exists emails_user_created_id_idx on public.emails (user_id, created_at desc, id desc);
+create index if not exists examples_user_created_id_idx on public.examples (user_id, created_at desc, id desc);
+
+-- Prévia do conteúdo para listagens leves (coluna calculada `preview` no PostgREST)
+create or replace function public.preview(public.emails) returns text
+  language sql stable as $$ select left($1.conteudo, 200) $$;
+create or replace function public.preview(public.examples) returns text
+  language sql stable as $$ select left($1.conteudo, 200) $$;
+
+-- Chaves estrangeiras usadas pelo PostgREST para embutir categoria/score (expand=)
+do $$
+begin
+  if not exists (select 1 from pg_constraint where conname = 'emails_categoria_id_fkey') then
+    alter table public.emails add constraint emails_categoria_id_fkey
+      foreign key (categoria_id) references public.categorias (id) on delete set null;
+  end if;
+  if not exists (select 1 from pg_constraint where conname = 'emails_score_id_fkey') then
+    alter table public.emails add constraint emails_score_id_fkey
+      foreign key (score_id) references public.scores (id) on delete set null;
+  end if;
+end $$;
+
+-- Estatísticas do dashboard agregadas no banco (GET /emails/stats)
+create or replace function public.email_stats(
+  p_user_id uuid,
+  p_from timestamptz default null,
+  p_to timestamptz default null,
+  p_bucket text default 'day'
+) returns jsonb
+  language sql stable as $$
+  with base as (
+    select categoria_id, score_id, created_at
+    from public.emails
+    where user_id = p_user_id
+      and (p_from is null or created_at >= p_from)
+      and (p_to is null or created_at < p_to)
+  )
+  select jsonb_build_object(
+    'total', (select count(*) from base),
+    'by_category', coalesce((
+      select jsonb_agg(jsonb_build_object('categoria_id', categoria_id, 'count', n) order by n desc)
+      from (select categoria_id, count(*) as n from base group by categoria_id) s
+    ), '[]'::jsonb),
+    'by_score', coalesce((
+      select jsonb_agg(jsonb_build_object('score_id', score_id, 'count', n) order by n desc)
+      from (select score_id, count(*) as n from base group by score_id) s
+    ), '[]'::jsonb),
+    'by_period', coalesce((
+      select jsonb_agg(jsonb_build_object('period', period, 'count', n) order by period)
+      from (
+        select date_trunc(case when p_bucket = 'week' then 'week' else 'day' end, created_at) as period,
+               count(*) as n
+        from base group by 1
+      ) s
+    ), '[]'::jsonb)
+  )
+$$;
+
+-- Busca textual (q= em GET /emails/ e GET /examples/): tsvector em português,
+-- índice GIN por usuário e funções com ordem por relevância e keyset em (rank, created_at, id)
+create extension if not exists btree_gin;
+
+alter table public.emails add column if not exists busca tsvector
+  generated always as (
+    setweight(to_tsvector('portuguese', coalesce(assunto, '')), 'A') ||
+    setweight(to_tsvector('portuguese', coalesce(conteudo, '')), 'B') ||
+    setweight(to_tsvector('portuguese', coalesce(resposta, '')), 'C')
+  ) stored;
+create index if not exists emails_busca_idx on public.emails using gin (user_id, busca);
+
+alter table public.examples add column if not exists busca tsvector
+  generated always as (
+    setweight(to_tsvector('portuguese', coalesce(conteudo, '')), 'A') ||
+    setweight(to_tsvector('portuguese', coalesce(resposta, '')), 'B')
+  ) stored;
+create index if not exists examples_busca_idx on public.examples using gin (user_id, busca);
+
+create or replace function public.search_emails(
+  p_user_id uuid,
+  p_query text,
+  p_limit int default 20,
+  p_offset int default 0,
+  p_rank real default null,
+  p_created_at timestamptz default null,
+  p_id bigint default null,
+  p_categoria_id bigint default null,
+  p_score_id bigint default null
+) returns setof jsonb
+  language sql stable as $$
+  with hits as (
+    select e.*, ts_rank(e.busca, tsq) as rank
+    from public.emails e, websearch_to_tsquery('portuguese', p_query) as tsq
+    where e.user_id = p_user_id
+      and e.busca @@ tsq
+      and (p_categoria_id is null or e.categoria_id = p_categoria_id)
+      and (p_score_id is null or e.score_id = p_score_id)
+  ),
+  page as (
+    select * from hits
+    where p_rank is null or (rank, created_at, id) < (p_rank, p_created_at, p_id)
+    order by rank desc, created_at desc, id desc
+    offset p_offset
+    limit p_limit
+  )
+  -- Categoria/score embutidos só para as linhas da página (expand=)
+  select (to_jsonb(p) - 'busca') || jsonb_build_object(
+           'preview', left(p.conteudo, 200),
+           'categoria', case when c.id is null then null
+                             else jsonb_build_object('id', c.id, 'nome', c.nome, 'cor', c.cor) end,
+           'score', case when s.id is null then null
+                         else jsonb_build_object('id', s.id, 'classificacao', s.classificacao) end
+         )
+  from page p
+  left join public.categorias c on c.id = p.categoria_id
+  left join public.scores s on s.id = p.score_id
+  order by p.rank desc, p.created_at desc, p.id desc
+$$;
+
+create or replace function public.search_examples(
+  p_user_id uuid,
+  p_query text,
+  p_limit int default 20,
+  p_offset int default 0,
+  p_rank real default null,
+  p_created_at timestamptz default null,
+  p_id bigint default null,
+  p_categoria_id bigint default null
+) returns setof jsonb
+  language sql stable as $$
+  with hits as (
+    select x.*, ts_rank(x.busca, tsq) as rank
+    from public.examples x, websearch_to_tsquery('portuguese', p_query) as tsq
+    where x.user_id = p_user_id
+      and x.busca @@ tsq
+      and (p_categoria_id is null or x.categoria_id = p_categoria_id)
+  )
+  select (to_jsonb(h) - 'busca') || jsonb_build_object('preview', left(h.conteudo, 200))
+  from hits h
+  where p_rank is null or (rank, created_at, id) < (p_rank, p_created_at, p_id)
+  order by rank desc, created_at desc, id desc
+  offset p_offset
+  limit p_limit
+$$;